@@ -1,10 +1,28 @@
 from . import options_analysis
 from . import market_data
 from . import market_analysis
+from . import screener
+from . import predictions
+from . import strategies
+from . import profiling
+from .lazy import load
 
 # Expose all tools lists for easy import
 market_data_tools = market_data.tools
 market_data_router = market_data.tool_call_router
 options_analysis_tools = options_analysis.tools
+options_analysis_router = options_analysis.tool_call_router
 market_analysis_tools = market_analysis.tools
-market_analysis_router = market_analysis.tool_call_router
\ No newline at end of file
+market_analysis_router = market_analysis.tool_call_router
+screener_tools = screener.tools
+screener_router = screener.tool_call_router
+predictions_tools = predictions.tools
+predictions_router = predictions.tool_call_router
+strategies_tools = strategies.tools
+strategies_router = strategies.tool_call_router
+profiling_tools = profiling.tools
+profiling_router = profiling.tool_call_router
+
+def warm_up() -> None:
+    """Imports the heavy dependencies of the tools ahead of the first request."""
+    load("numpy", "pandas", "yfinance", f"{__name__}.indicators", f"{__name__}.rolling", f"{__name__}.portfolio_risk", f"{__name__}.resample", f"{__name__}.backtest")
@@ -0,0 +1,171 @@
+import itertools
+import numpy as np
+from .indicators import compute_indicators
+
+# Parameters of each strategy and their default grid
+STRATEGIES = {
+    "sma_cross": {"fast": [5, 10, 20], "slow": [50, 100, 200]},
+    "ema_cross": {"fast": [5, 10, 20], "slow": [50, 100, 200]},
+    "rsi": {"window": [14], "lower": [20, 25, 30], "upper": [65, 70, 75, 80]},
+    "bollinger": {"window": [10, 20, 50], "num_std": [1.5, 2.0, 2.5]},
+}
+# Parameters that are indicator windows, whose series are computed once per distinct value
+WINDOW_PARAMS = ("fast", "slow", "window")
+METRICS = ("total_return", "max_drawdown", "sharpe", "trades", "exposure")
+MAX_COMBINATIONS = 10000
+# Elements of each (combinations, symbols, bars) array held in memory per chunk (8 MB of float64)
+MAX_CHUNK_ELEMENTS = 1_000_000
+TRADING_DAYS = 252
+
+
+def parameter_grid(strategy: str, grid: dict | None = None) -> tuple[list[str], np.ndarray]:
+    """Every valid combination of a strategy's parameters.
+    Args:
+        strategy (str): A key of STRATEGIES.
+        grid (dict, optional): Values to try per parameter, overriding the defaults.
+    Returns:
+        tuple[list[str], np.ndarray]: Parameter names and a (combinations, parameters) array.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy}. Strategies: {', '.join(STRATEGIES)}")
+    grid = grid or {}
+    unknown = [name for name in grid if name not in STRATEGIES[strategy]]
+    if unknown:
+        raise ValueError(f"Unknown parameters for {strategy}: {', '.join(unknown)}. Parameters: {', '.join(STRATEGIES[strategy])}")
+    names = list(STRATEGIES[strategy])
+    values = []
+    for name in names:
+        options = sorted({float(value) for value in grid.get(name, STRATEGIES[strategy][name])})
+        if not options:
+            raise ValueError(f"Provide at least one value for {name}")
+        if name in WINDOW_PARAMS and any(value < 2 or value != int(value) for value in options):
+            raise ValueError(f"{name} must be whole numbers of bars from 2")
+        values.append(options)
+    combos = np.array(list(itertools.product(*values)), dtype=np.float64).reshape(-1, len(names))
+    # Crossovers need a faster average, RSI bands an entry below the exit
+    if "fast" in names:
+        combos = combos[combos[:, names.index("fast")] < combos[:, names.index("slow")]]
+    if "lower" in names:
+        combos = combos[combos[:, names.index("lower")] < combos[:, names.index("upper")]]
+    if len(combos) == 0:
+        raise ValueError(f"No valid parameter combinations for {strategy}")
+    if len(combos) > MAX_COMBINATIONS:
+        raise ValueError(f"{len(combos)} parameter combinations exceed the limit of {MAX_COMBINATIONS}")
+    return names, combos
+
+
+def indicator_stacks(close: np.ndarray, strategy: str, names: list[str], combos: np.ndarray) -> dict[str, np.ndarray]:
+    """Indicator series of every distinct window in the grid, stacked along the first axis.
+    Args:
+        close (np.ndarray): (symbols, T) aligned closes, leading NaNs before a symbol's first bar.
+        strategy (str): A key of STRATEGIES.
+        names (list[str]): Parameter names from parameter_grid.
+        combos (np.ndarray): (combinations, parameters) from parameter_grid.
+    Returns:
+        dict[str, np.ndarray]: "windows" (W,) and (W, symbols, T) series: "average" for
+        crossovers, "rsi" for RSI, "middle" and "deviation" for Bollinger bands.
+    """
+    columns = [names.index(name) for name in WINDOW_PARAMS if name in names]
+    windows = np.unique(combos[:, columns]).astype(int)
+    stacks: dict[str, list] = {}
+    for window in windows:
+        if strategy in ("sma_cross", "ema_cross"):
+            kind = "SMA" if strategy == "sma_cross" else "EMA"
+            values = compute_indicators(close, indicators=[kind], params={f"{kind.lower()}_window": int(window)})
+            stacks.setdefault("average", []).append(values[kind])
+        elif strategy == "rsi":
+            values = compute_indicators(close, indicators=["RSI"], params={"rsi_window": int(window)})
+            stacks.setdefault("rsi", []).append(values["RSI"])
+        else:
+            # One standard deviation apart, so every num_std shares the window's bands
+            values = compute_indicators(close, indicators=["BB"], params={"bb_window": int(window), "bb_dev": 1.0})
+            stacks.setdefault("middle", []).append(values["BB_MID"])
+            stacks.setdefault("deviation", []).append(values["BB_HIGH"] - values["BB_MID"])
+    return {"windows": windows, **{name: np.stack(series) for name, series in stacks.items()}}
+
+
+def chunk_combinations(symbols: int, bars: int) -> int:
+    """Combinations per chunk so a chunk's arrays hold at most MAX_CHUNK_ELEMENTS elements."""
+    return max(1, MAX_CHUNK_ELEMENTS // max(1, symbols * bars))
+
+
+def _hold(entry: np.ndarray, exit: np.ndarray) -> np.ndarray:
+    """1 from each entry signal until the next exit signal, else 0, along the last axis."""
+    events = entry | exit
+    last = np.where(events, np.arange(entry.shape[-1]), 0)
+    np.maximum.accumulate(last, axis=-1, out=last)
+    # Before the first event `last` is 0, where entry is False unless it is the first event
+    return np.take_along_axis(entry, last, axis=-1).astype(np.int8)
+
+
+def positions(strategy: str, arrays: dict, names: list[str], combos: np.ndarray, allow_short: bool = False) -> np.ndarray:
+    """Position held after each bar's close for a chunk of combinations, without look-ahead.
+
+    Crossovers are long while the fast average is above the slow one, and
+    short below it when allowed. RSI buys below `lower` and sells above
+    `upper`. Bollinger buys below the lower band and sells at the middle band.
+    Shorts mirror the long rules.
+    Args:
+        strategy (str): A key of STRATEGIES.
+        arrays (dict): "close" (symbols, T) and the indicator_stacks.
+        names (list[str]): Parameter names from parameter_grid.
+        combos (np.ndarray): (P, parameters) combinations of this chunk.
+        allow_short (bool): Take short positions on the opposite signals.
+    Returns:
+        np.ndarray: (P, symbols, T) positions of -1, 0 or 1, as int8.
+    """
+    windows = arrays["windows"]
+    def stack(name: str, parameter: str) -> np.ndarray:
+        return arrays[name][np.searchsorted(windows, combos[:, names.index(parameter)].astype(int))]
+    def value(parameter: str) -> np.ndarray:
+        return combos[:, names.index(parameter), np.newaxis, np.newaxis]
+
+    # Comparisons with NaN (not enough history) are False, so there is no position yet
+    if strategy in ("sma_cross", "ema_cross"):
+        fast, slow = stack("average", "fast"), stack("average", "slow")
+        long = (fast > slow).astype(np.int8)
+        return long - (fast < slow).astype(np.int8) if allow_short else long
+    if strategy == "rsi":
+        rsi = stack("rsi", "window")
+        below, above = rsi < value("lower"), rsi > value("upper")
+        long = _hold(below, above)
+        return long - _hold(above, below) if allow_short else long
+    close = arrays["close"][np.newaxis]
+    middle, deviation = stack("middle", "window"), stack("deviation", "window") * value("num_std")
+    long = _hold(close < middle - deviation, close >= middle)
+    return long - _hold(close > middle + deviation, close <= middle) if allow_short else long
+
+
+def evaluate(position: np.ndarray, returns: np.ndarray, cost: float = 0.0) -> np.ndarray:
+    """Performance of positions over the bars each symbol traded.
+
+    The position taken at a bar's close earns the next bar's return. Each
+    change of position costs `cost` times its size.
+    Args:
+        position (np.ndarray): (P, symbols, T) positions.
+        returns (np.ndarray): (symbols, T) simple returns of each bar, NaN where the symbol has no return.
+        cost (float): Cost per unit traded as a fraction, e.g. 0.0005 for 5 basis points.
+    Returns:
+        np.ndarray: (P, symbols, len(METRICS)) total return, maximum drawdown, annualized
+        Sharpe ratio, number of trades and fraction of bars with a position.
+    """
+    valid = ~np.isnan(returns)
+    held = np.zeros(position.shape, dtype=np.float64)
+    held[..., 1:] = position[..., :-1]
+    traded = np.abs(np.diff(position, axis=-1, prepend=0).astype(np.float64))
+    strategy_returns = held * np.where(valid, returns, 0.0) - cost * traded
+    equity = np.cumprod(1.0 + strategy_returns, axis=-1)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    days = np.maximum(valid.sum(axis=-1), 1)
+    mean = strategy_returns.sum(axis=-1) / days
+    variance = (np.where(valid, strategy_returns - mean[..., np.newaxis], 0.0) ** 2).sum(axis=-1) / np.maximum(days - 1, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(variance > 0, mean / np.sqrt(variance) * np.sqrt(TRADING_DAYS), 0.0)
+        drawdown = (1.0 - equity / peak).max(axis=-1)
+    return np.stack([
+        equity[..., -1] - 1.0,
+        drawdown,
+        sharpe,
+        (traded > 0).sum(axis=-1),
+        ((held != 0) & valid).sum(axis=-1) / days,
+    ], axis=-1)
@@ -0,0 +1,271 @@
+import asyncio
+import datetime
+import os
+import time
+from .lazy import lazy_import
+from .upstream import upstream, INTERACTIVE, BACKGROUND
+from .quotes import fetch_quote
+from .trading_calendar import calendar_for, NEW_YORK
+yf = lazy_import("yfinance")
+
+# Minutes after the close before the day's bars are final
+SETTLE_MINUTES = 15
+# Option expiries are listed again each morning
+OPTIONS_REFRESH = datetime.time(9, 0)
+
+# Seconds quotes and price histories stay fresh while the market is open
+QUOTE_TTL = float(os.getenv("MCP_CACHE_QUOTE_TTL", "60"))
+HISTORY_TTL = float(os.getenv("MCP_CACHE_HISTORY_TTL", "60"))
+CHAIN_TTL = float(os.getenv("MCP_CACHE_CHAIN_TTL", "60"))
+# Hard limit in seconds past expiry for serving an expired quote or history while it is refreshed
+QUOTE_MAX_STALE = float(os.getenv("MCP_CACHE_QUOTE_MAX_STALE", "300"))
+HISTORY_MAX_STALE = float(os.getenv("MCP_CACHE_HISTORY_MAX_STALE", "900"))
+MAX_STALE = {"quote": QUOTE_MAX_STALE, "history": HISTORY_MAX_STALE}
+MAX_ENTRIES = int(os.getenv("MCP_CACHE_MAX_ENTRIES", "1000"))
+# Seconds between prefetch rounds, 0 disables prefetching
+PREFETCH_INTERVAL = float(os.getenv("MCP_PREFETCH_INTERVAL", "30"))
+# Upstream requests per minute the prefetcher may spend
+PREFETCH_BUDGET = float(os.getenv("MCP_PREFETCH_BUDGET", "60"))
+# Decayed request count from which an entry is kept warm
+PREFETCH_MIN_SCORE = float(os.getenv("MCP_PREFETCH_MIN_SCORE", "3"))
+# Seconds for the request count of an entry to halve
+SCORE_HALF_LIFE = 3600.0
+
+
+def market_expiry(now: float, live_ttl: float, symbol: str) -> float:
+    """Expiry of market data of symbol fetched at `now`.
+
+    Prices change while the session is open and until its bars have settled,
+    so data fetched then lives `live_ttl` seconds. Data fetched after that,
+    including over weekends and holidays, is final until the next open.
+    Symbols without a known calendar, such as crypto, currencies and foreign
+    listings, may trade at any time and always live `live_ttl` seconds.
+    """
+    calendar = calendar_for(symbol)
+    if calendar is None:
+        return now + live_ttl
+    local = datetime.datetime.fromtimestamp(now, calendar.zone)
+    session = calendar.session(local.date())
+    if session is not None:
+        open_at, close_at = session
+        if local < open_at:
+            return open_at.timestamp()
+        if local < close_at + datetime.timedelta(minutes=SETTLE_MINUTES):
+            # Expire once settled, so the next fetch is kept until the next open
+            return min(now + live_ttl, close_at.timestamp() + SETTLE_MINUTES * 60)
+    open_at, _ = calendar.next_session(local.date() + datetime.timedelta(days=1))
+    return open_at.timestamp()
+
+
+def morning_expiry(now: float, symbol: str) -> float:
+    """OPTIONS_REFRESH on the next trading day of symbol's exchange after `now`.
+
+    Symbols without a known calendar refresh every day at OPTIONS_REFRESH in New York.
+    """
+    calendar = calendar_for(symbol)
+    zone = calendar.zone if calendar is not None else NEW_YORK
+    local = datetime.datetime.fromtimestamp(now, zone)
+    day = local.date()
+    if datetime.datetime.combine(day, OPTIONS_REFRESH, zone) <= local:
+        day += datetime.timedelta(days=1)
+    if calendar is not None:
+        day = calendar.next_session(day)[0].date()
+    return datetime.datetime.combine(day, OPTIONS_REFRESH, zone).timestamp()
+
+
+def _history(symbol: str, period: str, interval: str):
+    history = yf.Ticker(symbol).history(period=period, interval=interval)
+    if history.empty:
+        raise ValueError(f"No price history found for {symbol} with period {period} and interval {interval}")
+    return history
+
+
+def _options(symbol: str) -> tuple[str, ...]:
+    return tuple(yf.Ticker(symbol).options)
+
+
+def _chain(symbol: str, expiration: str):
+    chain = yf.Ticker(symbol).option_chain(expiration)
+    if chain.calls is None:
+        raise ValueError(f"No options chain found for {symbol} expiring {expiration}")
+    return chain
+
+
+# Per kind: blocking fetch (symbol, *params), expiry (fetched_at, symbol) of its result and upstream requests per fetch
+KINDS = {
+    "quote": (fetch_quote, lambda now, symbol: market_expiry(now, QUOTE_TTL, symbol), 1),
+    "history": (_history, lambda now, symbol: market_expiry(now, HISTORY_TTL, symbol), 1),
+    "options": (_options, morning_expiry, 1),
+    # A new Ticker lists the expirations before it requests the chain
+    "chain": (_chain, lambda now, symbol: market_expiry(now, CHAIN_TTL, symbol), 2),
+}
+
+
+class CacheEntry:
+    __slots__ = ("value", "fetched_at", "expires_at")
+
+    def __init__(self, value, fetched_at: float, expires_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+
+class UpstreamCache:
+    """Quotes, price histories, option expiries and chains keyed by (kind, symbol, *params).
+
+    Every request adds to a per-key score that halves each SCORE_HALF_LIFE, so
+    the score approximates recent request frequency. The prefetch loop
+    refreshes the highest scoring entries shortly before they expire, at
+    background priority and within PREFETCH_BUDGET requests per minute, so hot
+    symbols are served from memory instead of waiting on Yahoo.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: dict[tuple, CacheEntry] = {}
+        self.scores: dict[tuple, tuple[float, float]] = {}
+        self._refreshing: dict[tuple, asyncio.Task] = {}
+        self._revalidations: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    def score(self, key: tuple, now: float) -> float:
+        score, at = self.scores.get(key, (0.0, now))
+        return score * 0.5 ** ((now - at) / SCORE_HALF_LIFE)
+
+    def _touch(self, key: tuple, now: float) -> None:
+        self.scores[key] = (self.score(key, now) + 1.0, now)
+
+    def _evict(self, now: float) -> None:
+        """Drops the coldest tenth of the keys once max_entries is exceeded."""
+        if len(self.scores) <= self.max_entries and len(self.entries) <= self.max_entries:
+            return
+        keys = sorted(self.scores.keys() | self.entries.keys(), key=lambda key: self.score(key, now))
+        for key in keys[:len(keys) - int(self.max_entries * 0.9)]:
+            self.scores.pop(key, None)
+            self.entries.pop(key, None)
+
+    async def get(self, kind: str, symbol: str, *params, priority: int = INTERACTIVE):
+        """The cached value, fetched from Yahoo when missing or expired.
+        Args:
+            kind (str): "quote", "history" (params: period, interval), "options" or "chain" (params: expiration).
+            symbol (str): The stock symbol.
+            *params: Parameters of the fetch.
+            priority (int): Upstream priority class of a fetch.
+        Returns:
+            The QuoteRecord, history DataFrame, tuple of expiration dates or option chain
+            with calls, puts and underlying. Shared, do not modify.
+        """
+        key = (kind, symbol, *params)
+        now = time.time()
+        self._touch(key, now)
+        entry = self.entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            self.hits += 1
+            return entry.value
+        self.misses += 1
+        return await self.refresh(key, priority)
+
+    async def serve(self, kind: str, symbol: str, *params, max_stale: float | None = None, require_fresh: bool = False, priority: int = INTERACTIVE):
+        """Like get, but an expired value is returned at once while one background fetch refreshes it.
+        Args:
+            kind (str): "quote" or "history" (params: period, interval).
+            symbol (str): The stock symbol.
+            *params: Parameters of the fetch.
+            max_stale (float, optional): Seconds past expiry a value may be served. Capped by MAX_STALE of the kind.
+            require_fresh (bool): Never serve an expired value.
+            priority (int): Upstream priority class of a fetch.
+        Returns:
+            tuple: The value, its age in seconds and whether it was expired.
+        """
+        key = (kind, symbol, *params)
+        now = time.time()
+        self._touch(key, now)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self.hits += 1
+                return entry.value, now - entry.fetched_at, False
+            limit = MAX_STALE.get(kind, 0.0) if max_stale is None else min(max_stale, MAX_STALE.get(kind, 0.0))
+            if not require_fresh and now - entry.expires_at <= limit:
+                self.stale_hits += 1
+                self.revalidate(key, priority)
+                return entry.value, now - entry.fetched_at, True
+        self.misses += 1
+        value = await self.refresh(key, priority)
+        return value, 0.0, False
+
+    def revalidate(self, key: tuple, priority: int = INTERACTIVE) -> None:
+        """Starts a refresh of key in the background unless one is in flight."""
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self.refresh(key, priority))
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidated)
+
+    def _revalidated(self, task: asyncio.Task) -> None:
+        self._revalidations.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background refresh failed: {task.exception()}")
+
+    async def refresh(self, key: tuple, priority: int = INTERACTIVE):
+        """Fetches one entry and stores it. Concurrent calls share one fetch.
+
+        The fetch runs in its own task and every caller awaits it shielded, so
+        cancelling any caller, the one that started it included, leaves it
+        running for the others.
+        """
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, priority))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda done: self._fetched(key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: tuple, priority: int):
+        kind, symbol, *params = key
+        fetch, expiry, cost = KINDS[kind]
+        value = await upstream.call(fetch, symbol, *params, priority=priority, cost=cost)
+        now = time.time()
+        self.entries[key] = CacheEntry(value, now, expiry(now, symbol))
+        self._evict(now)
+        return value
+
+    def _fetched(self, key: tuple, task: asyncio.Task) -> None:
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+        if not task.cancelled():
+            task.exception() # Retrieved here so a fetch whose callers all left is not logged as unhandled
+
+    def due(self, lead: float, limit: int) -> list[tuple]:
+        """Hot keys that expire within `lead` seconds, highest score first."""
+        now = time.time()
+        candidates = []
+        for key, entry in self.entries.items():
+            if entry.expires_at - now > lead or key in self._refreshing:
+                continue
+            score = self.score(key, now)
+            if score >= PREFETCH_MIN_SCORE:
+                candidates.append((score, key))
+        candidates.sort(reverse=True)
+        return [key for _, key in candidates[:limit]]
+
+    async def prefetch_loop(self, interval: float = PREFETCH_INTERVAL, budget: float = PREFETCH_BUDGET) -> None:
+        """Refreshes hot entries ahead of expiry every `interval` seconds, until cancelled."""
+        per_round = max(1, int(budget * interval / 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            keys = self.due(lead=interval, limit=per_round)
+            results = await asyncio.gather(*[self.refresh(key, BACKGROUND) for key in keys], return_exceptions=True)
+            failed = [key for key, result in zip(keys, results) if isinstance(result, Exception)]
+            self.prefetched += len(keys) - len(failed)
+            if failed:
+                print(f"Prefetch failed for {len(failed)} of {len(keys)} entries, e.g. {failed[0]}: {results[keys.index(failed[0])]}")
+
+    def snapshot(self) -> dict:
+        return {"entries": len(self.entries), "hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses, "prefetched": self.prefetched}
+
+
+upstream_cache = UpstreamCache()
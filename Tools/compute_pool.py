@@ -0,0 +1,225 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .lazy import lazy_import
+from .profiling import span
+np = lazy_import("numpy")
+
+# Number of processes used for CPU-bound analytics, defaults to one per core
+COMPUTE_WORKERS = int(os.getenv("MCP_COMPUTE_WORKERS", "0")) or (os.cpu_count() or 1)
+# Seconds a single job may run before it is cancelled
+JOB_TIMEOUT = float(os.getenv("MCP_JOB_TIMEOUT", "60"))
+# Jobs whose estimated work, in element operations, is below this are computed
+# in process, where the round trip to a worker would cost more than the work itself
+INLINE_MAX_ELEMENTS = int(os.getenv("MCP_INLINE_MAX_ELEMENTS", "50000"))
+
+_pool: ProcessPoolExecutor | None = None
+# Cancellation flag of the job running in this worker process
+_cancel_flag: shared_memory.SharedMemory | None = None
+# Cancellation flag of the job running in process on this thread
+_inline_cancel: contextvars.ContextVar[threading.Event | None] = contextvars.ContextVar("inline_cancel", default=None)
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was cancelled or timed out."""
+
+def get_pool() -> ProcessPoolExecutor:
+    """Returns the shared process pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        # Forking a process that already runs threads and an event loop is unsafe
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        _pool = ProcessPoolExecutor(max_workers=COMPUTE_WORKERS, mp_context=context)
+    return _pool
+
+async def run_in_pool(fn, *args):
+    """Runs a picklable top-level function on the process pool.
+    Args:
+        fn: Module level function to execute in a worker process.
+        *args: Picklable arguments for fn.
+    Returns:
+        The return value of fn.
+    """
+    loop = asyncio.get_running_loop()
+    with span("compute"):
+        return await loop.run_in_executor(get_pool(), fn, *args)
+
+class SharedArrays:
+    """NumPy arrays placed in shared memory so worker jobs read them without pickling.
+
+    Inputs are copied in once and can be read by any number of jobs; outputs are
+    allocated empty and written by the jobs in place. Use as a context manager so
+    the segments are always unlinked.
+    """
+
+    def __init__(self, inputs: dict | None = None, outputs: dict | None = None):
+        self.segments: list[shared_memory.SharedMemory] = []
+        self.refs: dict[str, tuple[str, tuple, str]] = {}
+        self.arrays: dict = {}
+        for name, array in (inputs or {}).items():
+            array = np.ascontiguousarray(array)
+            self._allocate(name, array.shape, array.dtype)[...] = array
+        for name, (shape, dtype) in (outputs or {}).items():
+            self._allocate(name, tuple(shape), np.dtype(dtype))
+
+    def _allocate(self, name: str, shape: tuple, dtype):
+        dtype = np.dtype(dtype)
+        segment = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self.segments.append(segment)
+        self.refs[name] = (segment.name, shape, dtype.str)
+        self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        return self.arrays[name]
+
+    def __getitem__(self, name: str):
+        return self.arrays[name]
+
+    def close(self) -> None:
+        self.arrays.clear()
+        for segment in self.segments:
+            try:
+                segment.close()
+            except BufferError:
+                pass # A caller still holds a view, the mapping goes away with it
+            segment.unlink()
+        self.segments.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def check_cancelled() -> None:
+    """Called by job functions between chunks of work to stop early once cancelled."""
+    if _cancel_flag is not None and _cancel_flag.buf[0]:
+        raise JobCancelled("Job was cancelled")
+    inline = _inline_cancel.get()
+    if inline is not None and inline.is_set():
+        raise JobCancelled("Job was cancelled")
+
+def _run_job(fn, refs: dict, cancel_name: str, args: tuple):
+    """Worker side of run_job: attaches the shared arrays and runs fn."""
+    global _cancel_flag
+    segments = []
+    arrays = {}
+    try:
+        _cancel_flag = shared_memory.SharedMemory(name=cancel_name, track=False)
+    except FileNotFoundError:
+        raise JobCancelled("Job was cancelled before it started")
+    try:
+        for name, (segment_name, shape, dtype) in refs.items():
+            try:
+                segment = shared_memory.SharedMemory(name=segment_name, track=False)
+            except FileNotFoundError:
+                raise JobCancelled("Job inputs were released before it started")
+            segments.append(segment)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+        check_cancelled()
+        return fn(arrays, *args)
+    finally:
+        arrays.clear()
+        for segment in segments:
+            try:
+                segment.close()
+            except BufferError:
+                pass # A view is still referenced, the mapping goes away with it
+        _cancel_flag.close()
+        _cancel_flag = None
+
+async def run_job(fn, *args, shared: SharedArrays | None = None, timeout: float | None = JOB_TIMEOUT):
+    """Runs fn(arrays, *args) on the process pool with a timeout and cancellation.
+
+    If the job times out, or the awaiting task is cancelled (e.g. the MCP client
+    disconnected), a queued job is dropped and a running job is told to stop at
+    its next check_cancelled() call.
+    Args:
+        fn: Module level function taking a dict of shared arrays and *args.
+        *args: Small picklable arguments for fn.
+        shared (SharedArrays, optional): Arrays the job reads and writes.
+        timeout (float, optional): Seconds before the job is cancelled.
+    Returns:
+        The return value of fn.
+    """
+    cancel_flag = shared_memory.SharedMemory(create=True, size=1)
+    cancel_flag.buf[0] = 0
+    future = get_pool().submit(_run_job, fn, shared.refs if shared else {}, cancel_flag.name, args)
+    try:
+        with span("compute"):
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{fn.__name__} did not finish within {timeout:g}s")
+    finally:
+        if not future.done():
+            cancel_flag.buf[0] = 1
+            future.cancel()
+        cancel_flag.close()
+        cancel_flag.unlink()
+
+async def run_sharded(fn, shards: list[tuple], inputs: dict, outputs: dict | None = None, timeout: float | None = JOB_TIMEOUT, work: int | None = None):
+    """Runs fn(arrays, *shard) for every shard over the same inputs and outputs.
+
+    Small jobs run in process, on a thread so the event loop keeps serving,
+    with the same timeout and cancellation as pool jobs. Larger ones are placed in shared memory once and the shards run in parallel
+    on the pool; if one shard fails or the caller is cancelled, the remaining
+    shards are cancelled too.
+    Args:
+        fn: Module level function taking a dict of arrays and the shard arguments.
+        shards (list[tuple]): Arguments of each job, e.g. row ranges.
+        inputs (dict): Arrays read by the jobs.
+        outputs (dict, optional): name -> (shape, dtype) of arrays written by the jobs.
+        timeout (float, optional): Seconds before each job is cancelled.
+        work (int, optional): Element operations of all the shards together, for jobs
+            whose work grows faster than their arrays. Defaults to the elements of
+            the inputs and outputs.
+    Returns:
+        tuple[list, dict]: Return values of the shards and copies of the outputs.
+    """
+    outputs = outputs or {}
+    if work is None:
+        work = sum(np.asarray(array).size for array in inputs.values())
+        work += sum(int(np.prod(shape)) for shape, _ in outputs.values())
+    if work <= INLINE_MAX_ELEMENTS:
+        arrays = dict(inputs)
+        arrays.update({name: np.empty(shape, dtype=dtype) for name, (shape, dtype) in outputs.items()})
+        cancelled = threading.Event()
+
+        def run_inline() -> list:
+            _inline_cancel.set(cancelled)
+            return [fn(arrays, *shard) for shard in shards]
+
+        try:
+            with span("compute"):
+                results = await asyncio.wait_for(asyncio.to_thread(run_inline), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{fn.__name__} did not finish within {timeout:g}s")
+        finally:
+            cancelled.set() # Stops the thread at its next check_cancelled() once the caller left
+        return results, {name: arrays[name] for name in outputs}
+    with SharedArrays(inputs, outputs) as shared:
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(run_job(fn, *shard, shared=shared, timeout=timeout)) for shard in shards]
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+        return [task.result() for task in tasks], {name: shared[name].copy() for name in outputs}
+
+def chunked(items: list, chunks: int) -> list[list]:
+    """Splits items into at most `chunks` contiguous, evenly sized parts."""
+    chunks = max(1, min(chunks, len(items)))
+    size, extra = divmod(len(items), chunks)
+    parts, start = [], 0
+    for index in range(chunks):
+        end = start + size + (1 if index < extra else 0)
+        parts.append(items[start:end])
+        start = end
+    return parts
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
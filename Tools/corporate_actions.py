@@ -0,0 +1,288 @@
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from .lazy import lazy_import
+from .upstream import upstream, INTERACTIVE, BULK, BACKGROUND
+yf = lazy_import("yfinance")
+
+# SQLite file holding the store, shared by all worker processes on a node
+ACTIONS_DB = os.getenv("MCP_ACTIONS_DB", "corporate_actions.sqlite3")
+# Seconds before a symbol's actions are fetched again
+ACTIONS_TTL = float(os.getenv("MCP_ACTIONS_TTL", str(24 * 3600)))
+# Seconds between scheduled refreshes of stale symbols, 0 disables them
+REFRESH_INTERVAL = float(os.getenv("MCP_ACTIONS_REFRESH_INTERVAL", "3600"))
+# Seconds before a symbol whose fetch failed is tried again, doubled per consecutive failure up to the TTL
+RETRY_AFTER = float(os.getenv("MCP_ACTIONS_RETRY_AFTER", "300"))
+MAX_CONCURRENT_REFRESHES = 8
+KINDS = ["dividend", "split", "earnings"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    symbol TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    date TEXT NOT NULL,
+    value REAL,
+    details TEXT,
+    PRIMARY KEY (symbol, kind, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS actions_by_date ON actions (kind, date, symbol);
+CREATE TABLE IF NOT EXISTS refreshes (
+    symbol TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL,
+    error TEXT,
+    failures INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL
+) WITHOUT ROWID;
+"""
+# Columns added to refreshes after the first release, for stores created before them
+REFRESH_COLUMNS = {"failures": "INTEGER NOT NULL DEFAULT 0", "retry_at": "REAL"}
+
+
+def _records(series_or_frame, kind: str) -> list[tuple]:
+    """Converts a yfinance dividends, splits or earnings_dates result into (date, value, details) rows."""
+    rows = []
+    if series_or_frame is None or series_or_frame.empty:
+        return rows
+    if kind == "earnings":
+        for timestamp, row in series_or_frame.iterrows():
+            details = {column: (None if isinstance(value, float) and math.isnan(value) else value) for column, value in row.items()}
+            rows.append((timestamp.strftime("%Y-%m-%d"), details.get("Reported EPS"), json.dumps(details)))
+    else:
+        for timestamp, value in series_or_frame.items():
+            rows.append((timestamp.strftime("%Y-%m-%d"), float(value), None))
+    return rows
+
+
+class CorporateActionsStore:
+    """Dividends, splits and earnings dates of many symbols in a local SQLite file.
+
+    Rows are indexed by (kind, date, symbol), so "earnings in the next 14 days
+    across 300 symbols" is one index range scan rather than 300 upstream calls.
+    A symbol is fetched from Yahoo when it is first queried and again once its
+    data is older than ACTIONS_TTL, either on query or by the scheduled refresh.
+    A symbol whose fetch failed is not fetched again before its retry time,
+    so a delisted or mistyped symbol costs one upstream call per backoff
+    rather than one per query.
+    """
+
+    def __init__(self, path: str = ACTIONS_DB, ttl: float = ACTIONS_TTL, retry_after: float = RETRY_AFTER):
+        self.path = path
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL") # Readers in other workers do not block the writer
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(refreshes)")}
+            for column, definition in REFRESH_COLUMNS.items():
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE refreshes ADD COLUMN {column} {definition}")
+            self._connection = connection
+        return self._connection
+
+    def _execute(self, fn):
+        with self._lock:
+            return fn(self.connection)
+
+    def stale_symbols(self, symbols: list[str] | None = None) -> list[str]:
+        """Symbols never fetched or fetched more than ttl seconds ago and not waiting to retry a failure.
+        All tracked symbols when None."""
+        now = time.time()
+        cutoff = now - self.ttl
+        def query(connection):
+            known = {
+                symbol: refreshed_at < cutoff and (retry_at is None or retry_at <= now)
+                for symbol, refreshed_at, retry_at in connection.execute("SELECT symbol, refreshed_at, retry_at FROM refreshes")
+            }
+            if symbols is None:
+                return [symbol for symbol, stale in known.items() if stale]
+            return [symbol for symbol in symbols if known.get(symbol, True)]
+        return self._execute(query)
+
+    def failing_symbols(self, symbols: list[str]) -> dict[str, str]:
+        """Last fetch errors of the symbols waiting to retry a failed fetch."""
+        now = time.time()
+        def query(connection):
+            self._select_symbols(connection, symbols)
+            return dict(connection.execute(
+                "SELECT symbol, error FROM refreshes WHERE retry_at > ? AND symbol IN (SELECT symbol FROM query_symbols)", (now,)
+            ).fetchall())
+        return self._execute(query)
+
+    @staticmethod
+    def _select_symbols(connection: sqlite3.Connection, symbols: list[str]) -> None:
+        # A temporary table rather than "IN (?, ...)", which is limited to SQLite's
+        # maximum number of parameters (32766, or 999 in older builds). Committed so
+        # the connection does not keep a read snapshot open and miss other workers' writes.
+        with connection:
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS query_symbols (symbol TEXT PRIMARY KEY) WITHOUT ROWID")
+            connection.execute("DELETE FROM query_symbols")
+            connection.executemany("INSERT OR IGNORE INTO query_symbols (symbol) VALUES (?)", [(symbol,) for symbol in symbols])
+
+    def _fetch(self, symbol: str) -> tuple[dict[str, list[tuple]], list[str]]:
+        ticker = yf.Ticker(symbol)
+        fetched, errors = {}, []
+        for kind, attribute in (("dividend", "dividends"), ("split", "splits"), ("earnings", "earnings_dates")):
+            try:
+                fetched[kind] = _records(getattr(ticker, attribute), kind)
+            except Exception as e:
+                # e.g. ETFs have no earnings dates; keep the other kinds
+                errors.append(f"{kind}: {e}")
+        if not fetched:
+            raise ValueError("; ".join(errors))
+        return fetched, errors
+
+    def _write(self, symbol: str, fetched: dict[str, list[tuple]], errors: list[str]) -> None:
+        def write(connection):
+            with connection:
+                for kind, rows in fetched.items():
+                    if kind == "earnings":
+                        # Only recent and upcoming earnings are returned, so older rows are kept
+                        # and rows from the earliest returned date on are replaced (dates can move)
+                        if rows:
+                            connection.execute(
+                                "DELETE FROM actions WHERE symbol = ? AND kind = ? AND date >= ?",
+                                (symbol, kind, min(row[0] for row in rows)),
+                            )
+                    else:
+                        connection.execute("DELETE FROM actions WHERE symbol = ? AND kind = ?", (symbol, kind))
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO actions (symbol, kind, date, value, details) VALUES (?, ?, ?, ?, ?)",
+                        [(symbol, kind, *row) for row in rows],
+                    )
+                connection.execute(
+                    "INSERT OR REPLACE INTO refreshes (symbol, refreshed_at, error, failures, retry_at) VALUES (?, ?, ?, 0, NULL)",
+                    (symbol, time.time(), "; ".join(errors) or None),
+                )
+        self._execute(write)
+
+    def _record_failure(self, symbol: str, error: str) -> None:
+        """Keeps the symbol's rows and refresh time and sets when its fetch is tried again."""
+        def write(connection):
+            with connection:
+                row = connection.execute("SELECT failures FROM refreshes WHERE symbol = ?", (symbol,)).fetchone()
+                failures = (row[0] if row else 0) + 1
+                retry_at = time.time() + min(self.retry_after * 2 ** (failures - 1), self.ttl)
+                if row:
+                    connection.execute(
+                        "UPDATE refreshes SET error = ?, failures = ?, retry_at = ? WHERE symbol = ?",
+                        (error, failures, retry_at, symbol),
+                    )
+                else:
+                    connection.execute(
+                        "INSERT INTO refreshes (symbol, refreshed_at, error, failures, retry_at) VALUES (?, 0, ?, ?, ?)",
+                        (symbol, error, failures, retry_at),
+                    )
+        self._execute(write)
+
+    async def refresh(self, symbol: str, priority: int = INTERACTIVE) -> None:
+        """Fetches one symbol's actions and replaces its rows. Concurrent calls share one fetch.
+
+        The fetch runs in its own task and every caller awaits it shielded, so
+        cancelling any caller, the one that started it included, leaves it
+        running for the others.
+        """
+        task = self._refreshing.get(symbol)
+        if task is None:
+            task = asyncio.create_task(self._refresh(symbol, priority))
+            self._refreshing[symbol] = task
+            task.add_done_callback(lambda done: self._refreshed(symbol, done))
+        await asyncio.shield(task)
+
+    async def _refresh(self, symbol: str, priority: int) -> None:
+        # Dividends, splits and earnings dates are three upstream requests
+        try:
+            fetched, errors = await upstream.call(self._fetch, symbol, priority=priority, cost=3)
+        except Exception as e:
+            await asyncio.to_thread(self._record_failure, symbol, str(e))
+            raise
+        await asyncio.to_thread(self._write, symbol, fetched, errors)
+
+    def _refreshed(self, symbol: str, task: asyncio.Task) -> None:
+        if self._refreshing.get(symbol) is task:
+            del self._refreshing[symbol]
+        if not task.cancelled():
+            task.exception() # Retrieved here so a fetch whose callers all left is not logged as unhandled
+
+    async def ensure_fresh(self, symbols: list[str], max_concurrency: int = MAX_CONCURRENT_REFRESHES, priority: int | None = None) -> dict[str, str]:
+        """Refreshes the symbols that are missing or stale.
+        Args:
+            symbols (list[str]): Symbols to check.
+            max_concurrency (int): Maximum number of refreshes in flight.
+            priority (int, optional): Upstream priority class. Defaults to bulk for several symbols.
+        Returns:
+            dict[str, str]: Error messages keyed by symbol for refreshes that failed,
+                now or recently enough that they are not tried again yet.
+        """
+        stale = await asyncio.to_thread(self.stale_symbols, symbols)
+        if priority is None:
+            priority = BULK if len(stale) > 1 else INTERACTIVE
+        semaphore = asyncio.Semaphore(max_concurrency)
+        errors = {}
+
+        async def refresh(symbol: str):
+            async with semaphore:
+                try:
+                    await self.refresh(symbol, priority)
+                except Exception as e:
+                    errors[symbol] = str(e)
+
+        await asyncio.gather(*[refresh(symbol) for symbol in stale])
+        waiting = await asyncio.to_thread(self.failing_symbols, [symbol for symbol in symbols if symbol not in errors])
+        return {**waiting, **errors}
+
+    def query(self, kinds: list[str], start: str, end: str, symbols: list[str] | None = None, descending: bool = False) -> list[dict]:
+        """Actions with start <= date <= end, ordered by date then symbol.
+        Args:
+            kinds (list[str]): Any of "dividend", "split", "earnings".
+            start (str): First date, "YYYY-MM-DD".
+            end (str): Last date, "YYYY-MM-DD".
+            symbols (list[str], optional): Restrict to these symbols.
+            descending (bool): Newest first.
+        Returns:
+            list[dict]: symbol, kind, date, value and details of each action.
+        """
+        sql = f"SELECT symbol, kind, date, value, details FROM actions WHERE kind IN ({','.join('?' * len(kinds))}) AND date BETWEEN ? AND ?"
+        params = [*kinds, start, end]
+        if symbols is not None:
+            sql += " AND symbol IN (SELECT symbol FROM query_symbols)"
+        sql += f" ORDER BY date {'DESC' if descending else 'ASC'}, symbol"
+        def select(connection):
+            if symbols is not None:
+                self._select_symbols(connection, symbols)
+            return connection.execute(sql, params).fetchall()
+        rows = self._execute(select)
+        return [
+            {"symbol": symbol, "kind": kind, "date": date, "value": value, "details": json.loads(details) if details else None}
+            for symbol, kind, date, value, details in rows
+        ]
+
+    async def refresh_loop(self, interval: float = REFRESH_INTERVAL) -> None:
+        """Refreshes every stale tracked symbol every `interval` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                stale = await asyncio.to_thread(self.stale_symbols)
+                errors = await self.ensure_fresh(stale, priority=BACKGROUND)
+                if errors:
+                    print(f"Corporate actions refresh failed for {len(errors)} symbols: {', '.join(sorted(errors))}")
+            except Exception as e:
+                print(f"Corporate actions refresh failed: {e}")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+corporate_actions = CorporateActionsStore()
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from .lazy import lazy_import
+from .upstream import INTERACTIVE, BULK
+from .cache import upstream_cache
+from .trading_calendar import calendar_for
+pd = lazy_import("pandas")
+resample_engine = lazy_import(f"{__package__}.resample")
+
+MAX_CONCURRENT_FETCHES = 8
+
+async def fetch_history(symbol: str, period: str = "1y", interval: str = "1d", priority: int = INTERACTIVE):
+    """Fetches the price history of a symbol without blocking the event loop, served from the cache while fresh.
+    Args:
+        symbol (str): The stock symbol (e.g., "AAPL").
+        period (str): yfinance period, e.g. "1mo", "1y", "max".
+        interval (str): yfinance bar interval, e.g. "1m", "60m", "1d".
+        priority (int): Upstream priority class of the request.
+    Returns:
+        pd.DataFrame: OHLCV history indexed by timestamp. Shared with the cache, do not modify.
+    """
+    return await upstream_cache.get("history", symbol, period, interval, priority=priority)
+
+def bar_source(symbol: str, period: str, interval: str) -> tuple[str, str]:
+    """(period, interval) to obtain bars from: a fresh cached history that covers them, else the download to make.
+
+    Cached bars are reused when they span at least the period at an interval
+    the requested one can be aggregated from, so changing the interval or
+    shortening the period needs no upstream call. Otherwise intraday bars are
+    downloaded at the finest interval Yahoo serves for the period.
+    """
+    now = time.time()
+    candidates = [
+        (key[2], key[3]) for key, entry in list(upstream_cache.entries.items())
+        if key[0] == "history" and key[1] == symbol and entry.expires_at > now
+        and resample_engine.can_derive(key[3], interval) and resample_engine.covers(key[2], period)
+    ]
+    if candidates:
+        # Least data to aggregate: the coarsest interval, then the shortest period
+        return min(candidates, key=lambda source: (-resample_engine.INTRADAY_MINUTES.get(source[1], 1440), resample_engine.period_days(source[0])))
+    return period, resample_engine.base_interval(period, interval)
+
+async def fetch_bars(symbol: str, period: str = "1y", interval: str = "1d", priority: int = INTERACTIVE):
+    """Like fetch_history, but derives the bars locally from finer or longer cached bars when possible.
+    Args:
+        symbol (str): The stock symbol.
+        period (str): yfinance period.
+        interval (str): Bar interval, e.g. "5m", "60m", "1d".
+        priority (int): Upstream priority class of a download.
+    Returns:
+        pd.DataFrame: OHLCV history indexed by timestamp. May be shared with the cache, do not modify.
+    """
+    source_period, source_interval = bar_source(symbol, period, interval)
+    history = await fetch_history(symbol, source_period, source_interval, priority)
+    if (source_period, source_interval) == (period, interval):
+        return history
+    return resample_engine.derive(history, period, interval, source_interval, calendar_for(symbol))
+
+async def serve_bars(symbol: str, period: str, interval: str, max_stale: float | None = None, require_fresh: bool = False):
+    """fetch_bars with the stale-while-revalidate serving of UpstreamCache.serve.
+    Returns:
+        tuple[pd.DataFrame, float, bool]: The bars, their age in seconds and whether they were expired.
+    """
+    source_period, source_interval = bar_source(symbol, period, interval)
+    history, age, stale = await upstream_cache.serve(
+        "history", symbol, source_period, source_interval, max_stale=max_stale, require_fresh=require_fresh
+    )
+    if (source_period, source_interval) != (period, interval):
+        history = resample_engine.derive(history, period, interval, source_interval, calendar_for(symbol))
+    return history, age, stale
+
+async def fetch_histories(symbols: list[str], period: str = "1y", interval: str = "1d", max_concurrency: int = MAX_CONCURRENT_FETCHES, priority: int | None = None):
+    """Fetches the price history of many symbols concurrently.
+    Args:
+        symbols (list[str]): Stock symbols to fetch.
+        period (str): yfinance period.
+        interval (str): yfinance bar interval.
+        max_concurrency (int): Maximum number of fetches in flight.
+        priority (int, optional): Upstream priority class. Defaults to bulk for several symbols.
+    Returns:
+        tuple[dict, dict]: Histories keyed by symbol, and error messages keyed by symbol.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if priority is None:
+        priority = BULK if len(symbols) > 1 else INTERACTIVE
+    semaphore = asyncio.Semaphore(max_concurrency)
+    histories, errors = {}, {}
+
+    async def fetch(symbol: str):
+        async with semaphore:
+            try:
+                histories[symbol] = await fetch_history(symbol, period, interval, priority)
+            except Exception as e:
+                errors[symbol] = str(e)
+
+    await asyncio.gather(*[fetch(symbol) for symbol in symbols])
+    return histories, errors
+
+def align_columns(histories: dict, column: str = "Close", fill: bool = True):
+    """Aligns one column of several histories on their shared timestamps.
+    Args:
+        histories (dict): DataFrames keyed by symbol.
+        column (str): Column to extract, e.g. "Close".
+        fill (bool): Forward fill gaps, e.g. a holiday on one of two exchanges.
+    Returns:
+        pd.DataFrame: One column per symbol, outer joined on dates.
+    """
+    columns = {}
+    for symbol, history in histories.items():
+        series = history[column]
+        if series.index.tz is not None:
+            # Symbols listed on different exchanges carry different time zones
+            series = series.tz_localize(None)
+        columns[symbol] = series
+    frame = pd.DataFrame(columns).sort_index()
+    return frame.ffill() if fill else frame
+
+def align_returns(histories: dict, symbols: list[str]):
+    """Simple returns of several symbols, each over its own trading days, on a shared index.
+
+    Returns are taken before aligning so a holiday on one exchange does not
+    create a gap or a zero return in the other series.
+    Args:
+        histories (dict): DataFrames keyed by symbol.
+        symbols (list[str]): Symbols to include, in column order.
+    Returns:
+        pd.DataFrame: One column of returns per symbol, NaN where a symbol did not trade.
+    """
+    returns = {symbol: histories[symbol].assign(Close=histories[symbol]["Close"].pct_change()) for symbol in symbols}
+    return align_columns(returns, "Close", fill=False)[symbols]
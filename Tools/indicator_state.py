@@ -0,0 +1,254 @@
+import asyncio
+import copy
+import math
+from collections import OrderedDict, deque
+from .lazy import lazy_import
+indicator_engine = lazy_import(f"{__package__}.indicators")
+
+NAN = float("nan")
+
+# Bars fetched to bring existing state up to date, per bar interval
+RECENT_PERIODS = {
+    "1m": "1d", "2m": "1d", "5m": "1d", "15m": "5d", "30m": "5d",
+    "60m": "5d", "90m": "5d", "1h": "5d", "1d": "1mo", "5d": "3mo",
+    "1wk": "3mo", "1mo": "1y", "3mo": "2y",
+}
+MAX_STATES = 2048
+
+
+class RunningEMA:
+    """EMA (pandas ewm adjust=False) updated one value at a time."""
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        self.value = x if self.count == 0 else self.value + self.alpha * (x - self.value)
+        self.count += 1
+        return self.current()
+
+    def current(self) -> float:
+        return self.value if self.count >= self.min_periods else NAN
+
+
+class RunningWindow:
+    """Mean and population standard deviation of the last `window` values.
+
+    Uses the sliding form of Welford's update so adding one value and dropping
+    the oldest is O(1) without the cancellation of raw sums of squares.
+    """
+    __slots__ = ("window", "values", "mean", "m2")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: float) -> None:
+        self.values.append(x)
+        if len(self.values) <= self.window:
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+            return
+        old = self.values.popleft()
+        old_mean = self.mean
+        self.mean += (x - old) / self.window
+        self.m2 = max(0.0, self.m2 + (x - old) * (x - self.mean + old - old_mean))
+
+    def ready(self) -> bool:
+        return len(self.values) == self.window
+
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.window)
+
+
+class RunningExtreme:
+    """Rolling max (or min) over a window using a monotonic deque, O(1) amortized."""
+    __slots__ = ("window", "sign", "items", "index")
+
+    def __init__(self, window: int, maximum: bool):
+        self.window = window
+        self.sign = 1.0 if maximum else -1.0
+        self.items = deque()
+        self.index = 0
+
+    def update(self, x: float) -> None:
+        keyed = self.sign * x
+        while self.items and self.items[-1][1] <= keyed:
+            self.items.pop()
+        self.items.append((self.index, keyed))
+        if self.items[0][0] <= self.index - self.window:
+            self.items.popleft()
+        self.index += 1
+
+    def current(self) -> float:
+        return self.sign * self.items[0][1] if self.index >= self.window else NAN
+
+
+class IndicatorState:
+    """Rolling indicator state of one symbol and bar interval.
+
+    Every accumulator is updated in O(1) per bar and produces the same values as
+    indicators.compute_indicators over the same bars.
+    """
+
+    def __init__(self, params: dict | None = None):
+        p = {**indicator_engine.DEFAULT_PARAMS, **(params or {})}
+        self.params = p
+        self.last_timestamp = None
+        self.last_close = NAN
+        self.bars = 0
+        self.ema_fast = RunningEMA(2.0 / (p["macd_fast"] + 1), p["macd_fast"])
+        self.ema_slow = RunningEMA(2.0 / (p["macd_slow"] + 1), p["macd_slow"])
+        self.macd_signal = RunningEMA(2.0 / (p["macd_signal"] + 1), p["macd_signal"])
+        self.ema = RunningEMA(2.0 / (p["ema_window"] + 1), p["ema_window"])
+        self.avg_up = RunningEMA(1.0 / p["rsi_window"], p["rsi_window"])
+        self.avg_down = RunningEMA(1.0 / p["rsi_window"], p["rsi_window"])
+        self.bands = RunningWindow(p["bb_window"])
+        self.sma = RunningWindow(p["sma_window"])
+        self.true_ranges = []
+        self.atr = NAN
+        self.highest = RunningExtreme(p["stoch_window"], maximum=True)
+        self.lowest = RunningExtreme(p["stoch_window"], maximum=False)
+        self.stoch_k = deque(maxlen=p["stoch_smooth"])
+        self.values: dict[str, float] = {}
+
+    def update(self, timestamp, high: float, low: float, close: float) -> dict[str, float]:
+        """Applies one completed bar and returns the indicator values after it."""
+        p = self.params
+        first = self.bars == 0
+        diff = 0.0 if first else close - self.last_close
+        rsi_up = self.avg_up.update(diff if diff > 0 else 0.0)
+        rsi_down = self.avg_down.update(-diff if diff < 0 else 0.0)
+        if math.isnan(rsi_down):
+            rsi = NAN
+        else:
+            rsi = 100.0 if rsi_down == 0 else 100.0 - 100.0 / (1.0 + rsi_up / rsi_down)
+
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        macd = fast - slow
+        signal = NAN if math.isnan(macd) else self.macd_signal.update(macd)
+        ema = self.ema.update(close)
+
+        self.bands.update(close)
+        middle = self.bands.mean if self.bands.ready() else NAN
+        deviation = self.bands.std() if self.bands.ready() else NAN
+        self.sma.update(close)
+        sma = self.sma.mean if self.sma.ready() else NAN
+
+        true_range = high - low if first else max(high - low, abs(high - self.last_close), abs(low - self.last_close))
+        window = p["atr_window"]
+        if len(self.true_ranges) < window:
+            self.true_ranges.append(true_range)
+            if len(self.true_ranges) == window:
+                self.atr = sum(self.true_ranges) / window
+        else:
+            self.atr += (true_range - self.atr) / window
+
+        self.highest.update(high)
+        self.lowest.update(low)
+        highest, lowest = self.highest.current(), self.lowest.current()
+        if math.isnan(highest) or highest == lowest:
+            stoch_k = NAN
+        else:
+            stoch_k = 100.0 * (close - lowest) / (highest - lowest)
+        self.stoch_k.append(stoch_k)
+        stoch_d = sum(self.stoch_k) / len(self.stoch_k) if len(self.stoch_k) == self.stoch_k.maxlen else NAN
+
+        self.bars += 1
+        self.last_close = close
+        self.last_timestamp = timestamp
+        self.values = {
+            "RSI": rsi,
+            "MACD": macd,
+            "MACD_SIGNAL": signal,
+            "MACD_HIST": macd - signal,
+            "BB_HIGH": middle + p["bb_dev"] * deviation,
+            "BB_MID": middle,
+            "BB_LOW": middle - p["bb_dev"] * deviation,
+            "SMA": sma,
+            "EMA": ema,
+            "ATR": self.atr,
+            "STOCH_K": stoch_k,
+            "STOCH_D": stoch_d,
+        }
+        return self.values
+
+    def peek(self, timestamp, high: float, low: float, close: float) -> dict[str, float]:
+        """Values if a still forming bar were applied, without committing it."""
+        return copy.deepcopy(self).update(timestamp, high, low, close)
+
+
+class IndicatorStateStore:
+    """Indicator state per (symbol, interval, period, params), least recently used first out."""
+
+    def __init__(self, max_states: int = MAX_STATES):
+        self.max_states = max_states
+        self.states: OrderedDict[tuple, IndicatorState] = OrderedDict()
+        self.locks: dict[tuple, asyncio.Lock] = {}
+        self.full_recomputes = 0
+        self.incremental_updates = 0
+
+    def invalidate(self, symbol: str | None = None) -> None:
+        for key in list(self.states):
+            if symbol is None or key[0] == symbol:
+                del self.states[key]
+
+    async def latest(self, symbol: str, interval: str, period: str, params: dict | None, fetch) -> tuple[dict[str, float], bool]:
+        """Latest indicator values of a symbol, updating its state in place.
+
+        The newest bar may still be forming, so it is only peeked at; every bar
+        before it is committed. State is rebuilt from the full period when it is
+        missing, when the recent bars no longer overlap it, or when the committed
+        close was revised (e.g. dividend adjustment).
+        Args:
+            symbol (str): The stock symbol.
+            interval (str): Bar interval, e.g. "1d".
+            period (str): History used to build state from scratch.
+            params (dict | None): Indicator window overrides.
+            fetch: async callable (symbol, period, interval) returning an OHLC DataFrame.
+        Returns:
+            tuple[dict, bool]: Latest values and whether a full recomputation was needed.
+        """
+        key = (symbol, interval, period, tuple(sorted((params or {}).items())))
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            state = self.states.get(key)
+            bars = None
+            if state is not None:
+                recent = await fetch(symbol, RECENT_PERIODS.get(interval, period), interval)
+                if state.last_timestamp in recent.index and math.isclose(
+                    float(recent.at[state.last_timestamp, "Close"]), state.last_close, rel_tol=1e-9
+                ):
+                    bars = recent[recent.index > state.last_timestamp]
+                    self.incremental_updates += 1
+                else:
+                    state = None
+            full = state is None
+            if full:
+                bars = await fetch(symbol, period, interval)
+                state = IndicatorState(params)
+                self.full_recomputes += 1
+            self.states[key] = state
+            self.states.move_to_end(key)
+            while len(self.states) > self.max_states:
+                evicted, _ = self.states.popitem(last=False)
+                self.locks.pop(evicted, None)
+
+            rows = list(zip(bars.index, bars["High"].to_numpy(), bars["Low"].to_numpy(), bars["Close"].to_numpy()))
+            for timestamp, high, low, close in rows[:-1]:
+                state.update(timestamp, float(high), float(low), float(close))
+            if rows:
+                timestamp, high, low, close = rows[-1]
+                return state.peek(timestamp, float(high), float(low), float(close)), full
+            return dict(state.values), full
+
+
+indicator_states = IndicatorStateStore()
@@ -0,0 +1,252 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Supported indicator names and the output series each one produces
+INDICATOR_OUTPUTS = {
+    "RSI": ["RSI"],
+    "MACD": ["MACD", "MACD_SIGNAL", "MACD_HIST"],
+    "BB": ["BB_HIGH", "BB_MID", "BB_LOW"],
+    "SMA": ["SMA"],
+    "EMA": ["EMA"],
+    "ATR": ["ATR"],
+    "STOCH": ["STOCH_K", "STOCH_D"],
+}
+
+DEFAULT_PARAMS = {
+    "rsi_window": 14,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "bb_window": 20,
+    "bb_dev": 2.0,
+    "sma_window": 20,
+    "ema_window": 20,
+    "atr_window": 14,
+    "stoch_window": 14,
+    "stoch_smooth": 3,
+}
+
+# Keeps decay**-k below ~1e130 inside a block of the closed form EMA
+_MAX_BLOCK_LOG_GROWTH = 300.0
+
+
+def _as_2d(values) -> np.ndarray:
+    array = np.asarray(values, dtype=np.float64)
+    return array[np.newaxis, :] if array.ndim == 1 else array
+
+
+def _valid_counts(values: np.ndarray) -> np.ndarray:
+    """Number of valid observations seen so far, per row and time step."""
+    return np.cumsum(~np.isnan(values), axis=1)
+
+
+def _backfill_leading(values: np.ndarray) -> np.ndarray:
+    """Replaces the leading NaNs of each row with its first valid value.
+
+    An EMA started on the first valid value stays constant over the padding,
+    so rows of different lengths can share one vectorized recursion.
+    """
+    valid = ~np.isnan(values)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+    filled = values.copy()
+    leading = np.arange(values.shape[1])[np.newaxis, :] < first[:, np.newaxis]
+    filled[leading] = np.broadcast_to(values[np.arange(values.shape[0]), first][:, np.newaxis], values.shape)[leading]
+    return filled
+
+
+def ema_rows(values: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """Recursive EMA (pandas ewm adjust=False) of many rows in one vectorized pass.
+
+    Uses the closed form ema_j = d^(j+1) * (s + alpha * sum_i x_i / d^(i+1)) over
+    blocks short enough that d^-j cannot overflow, carrying the state between blocks.
+    Args:
+        values (np.ndarray): (rows, T) inputs without NaNs.
+        alphas (np.ndarray): (rows,) smoothing factor per row.
+    Returns:
+        np.ndarray: (rows, T) smoothed values.
+    """
+    rows, length = values.shape
+    out = np.empty_like(values)
+    if length == 0:
+        return out
+    alphas = np.asarray(alphas, dtype=np.float64).reshape(rows, 1)
+    decay = 1.0 - alphas
+    log_decay = -np.log(np.where(decay > 0, decay, 1.0))
+    block = int(_MAX_BLOCK_LOG_GROWTH / max(float(log_decay.max()), 1e-12))
+    block = max(1, min(block, length))
+    state = values[:, :1]
+    for start in range(0, length, block):
+        segment = values[:, start:start + block]
+        powers = decay ** np.arange(1, segment.shape[1] + 1)[np.newaxis, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scaled = np.cumsum(segment / powers, axis=1)
+            smoothed = powers * state + alphas * powers * scaled
+        # alpha == 1 gives decay == 0: the EMA is the input itself
+        smoothed = np.where(decay == 0, segment, smoothed)
+        out[:, start:start + segment.shape[1]] = smoothed
+        state = smoothed[:, -1:]
+    return out
+
+
+def _ema_many(series: list[np.ndarray], alphas: list[float], min_periods: list[int]) -> list[np.ndarray]:
+    """Runs every requested EMA over stacked rows so they share one recursion."""
+    if not series:
+        return []
+    rows = [s.shape[0] for s in series]
+    stacked = np.vstack([_backfill_leading(s) for s in series])
+    row_alphas = np.concatenate([np.full(n, a) for n, a in zip(rows, alphas)])
+    smoothed = ema_rows(np.nan_to_num(stacked), row_alphas)
+    results = []
+    offset = 0
+    for original, n, periods in zip(series, rows, min_periods):
+        part = smoothed[offset:offset + n]
+        part[_valid_counts(original) < periods] = np.nan
+        results.append(part)
+        offset += n
+    return results
+
+
+def _rolling(values: np.ndarray, window: int) -> np.ndarray:
+    """(rows, T - window + 1, window) view of trailing windows."""
+    return sliding_window_view(values, window, axis=1)
+
+
+def _pad_front(values: np.ndarray, length: int) -> np.ndarray:
+    pad = np.full((values.shape[0], length - values.shape[1]), np.nan)
+    return np.concatenate([pad, values], axis=1)
+
+
+def compute_indicators(close, high=None, low=None, indicators=("RSI", "MACD", "BB"), params: dict | None = None) -> dict[str, np.ndarray]:
+    """Computes technical indicators for one or many symbols in one pass.
+
+    Every exponential average (MACD fast/slow, RSI and ATR Wilder averages, EMA)
+    is evaluated in a single stacked recursion, so an EMA shared by several
+    indicators is only computed once. Conventions follow the `ta` package.
+    Args:
+        close: (T,) closes of one symbol, or (symbols, T) aligned closes. Leading
+            NaNs mark a symbol with a shorter history.
+        high, low: Same shape as close, required for ATR and STOCH.
+        indicators: Names from INDICATOR_OUTPUTS.
+        params (dict, optional): Overrides for DEFAULT_PARAMS.
+    Returns:
+        dict[str, np.ndarray]: Output series keyed by name, shaped like close.
+    """
+    one_dimensional = np.asarray(close).ndim == 1
+    close = _as_2d(close)
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    wanted = [name.upper() for name in indicators]
+    unknown = [name for name in wanted if name not in INDICATOR_OUTPUTS]
+    if unknown:
+        raise ValueError(f"Unsupported indicators: {', '.join(unknown)}. Supported: {', '.join(INDICATOR_OUTPUTS)}")
+    needs_range = any(name in wanted for name in ("ATR", "STOCH"))
+    if needs_range:
+        if high is None or low is None:
+            raise ValueError("ATR and STOCH require high and low prices")
+        high, low = _as_2d(high), _as_2d(low)
+    length = close.shape[1]
+    out: dict[str, np.ndarray] = {}
+
+    # Exponential averages, keyed so identical (input, alpha) pairs are shared
+    ema_requests: dict[tuple, tuple[np.ndarray, float, int]] = {}
+    def request_ema(key: tuple, series: np.ndarray, alpha: float, min_periods: int) -> tuple:
+        ema_requests.setdefault(key, (series, alpha, min_periods))
+        return key
+
+    if "MACD" in wanted:
+        fast = request_ema(("close", p["macd_fast"]), close, 2.0 / (p["macd_fast"] + 1), p["macd_fast"])
+        slow = request_ema(("close", p["macd_slow"]), close, 2.0 / (p["macd_slow"] + 1), p["macd_slow"])
+    if "EMA" in wanted:
+        ema_key = request_ema(("close", p["ema_window"]), close, 2.0 / (p["ema_window"] + 1), p["ema_window"])
+    if "RSI" in wanted:
+        diff = np.diff(close, axis=1, prepend=np.nan)
+        up = np.where(diff > 0, diff, 0.0)
+        down = np.where(diff < 0, -diff, 0.0)
+        # Keep the padding before a symbol's first close out of the averages
+        up[np.isnan(close)] = np.nan
+        down[np.isnan(close)] = np.nan
+        up_key = request_ema(("up", p["rsi_window"]), up, 1.0 / p["rsi_window"], p["rsi_window"])
+        down_key = request_ema(("down", p["rsi_window"]), down, 1.0 / p["rsi_window"], p["rsi_window"])
+    if "ATR" in wanted:
+        window = p["atr_window"]
+        previous_close = np.concatenate([np.full((close.shape[0], 1), np.nan), close[:, :-1]], axis=1)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+        # Wilder's ATR is seeded with the mean of the first `window` true ranges
+        seeded = true_range.copy()
+        seed_index = np.argmax(_valid_counts(true_range) >= window, axis=1)
+        has_seed = _valid_counts(true_range)[:, -1] >= window
+        seed_mean = _pad_front(np.mean(_rolling(true_range, window), axis=2), length) if length >= window else np.full_like(true_range, np.nan)
+        rows = np.arange(close.shape[0])
+        before_seed = np.arange(length)[np.newaxis, :] < seed_index[:, np.newaxis]
+        seeded[before_seed] = np.nan
+        seeded[rows[has_seed], seed_index[has_seed]] = seed_mean[rows[has_seed], seed_index[has_seed]]
+        seeded[~has_seed] = np.nan
+        atr_key = request_ema(("atr", window), seeded, 1.0 / window, 1)
+
+    requests = list(ema_requests.values())
+    smoothed = dict(zip(ema_requests, _ema_many(
+        [series for series, _, _ in requests],
+        [alpha for _, alpha, _ in requests],
+        [periods for _, _, periods in requests],
+    )))
+
+    if "RSI" in wanted:
+        up_avg, down_avg = smoothed[up_key], smoothed[down_key]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + up_avg / down_avg)
+        out["RSI"] = np.where(down_avg == 0, 100.0, rsi)
+    if "MACD" in wanted:
+        macd = smoothed[fast] - smoothed[slow]
+        signal = _ema_many([macd], [2.0 / (p["macd_signal"] + 1)], [p["macd_signal"]])[0]
+        out["MACD"] = macd
+        out["MACD_SIGNAL"] = signal
+        out["MACD_HIST"] = macd - signal
+    if "EMA" in wanted:
+        out["EMA"] = smoothed[ema_key]
+    if "ATR" in wanted:
+        out["ATR"] = smoothed[atr_key]
+
+    # Rolling window indicators share one window view per window length
+    views: dict[int, np.ndarray] = {}
+    def rolling_mean(window: int) -> np.ndarray:
+        if length < window:
+            return np.full_like(close, np.nan)
+        if window not in views:
+            views[window] = _rolling(close, window)
+        return _pad_front(views[window].mean(axis=2), length)
+
+    if "BB" in wanted:
+        window = p["bb_window"]
+        middle = rolling_mean(window)
+        deviation = _pad_front(views[window].std(axis=2), length) if length >= window else np.full_like(close, np.nan)
+        out["BB_MID"] = middle
+        out["BB_HIGH"] = middle + p["bb_dev"] * deviation
+        out["BB_LOW"] = middle - p["bb_dev"] * deviation
+    if "SMA" in wanted:
+        out["SMA"] = rolling_mean(p["sma_window"])
+    if "STOCH" in wanted:
+        window, smooth = p["stoch_window"], p["stoch_smooth"]
+        if length >= window:
+            lowest = _pad_front(_rolling(low, window).min(axis=2), length)
+            highest = _pad_front(_rolling(high, window).max(axis=2), length)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                stoch_k = 100.0 * (close - lowest) / (highest - lowest)
+        else:
+            stoch_k = np.full_like(close, np.nan)
+        stoch_d = _pad_front(_rolling(stoch_k, smooth).mean(axis=2), length) if length >= smooth else np.full_like(close, np.nan)
+        out["STOCH_K"] = stoch_k
+        out["STOCH_D"] = stoch_d
+
+    result = {}
+    for name in wanted:
+        for key in INDICATOR_OUTPUTS[name]:
+            result[key] = out[key][0] if one_dimensional else out[key]
+    return result
+
+
+def last_valid(series: np.ndarray) -> np.ndarray | float:
+    """Last non-NaN value of each row (or of a 1-D series)."""
+    array = _as_2d(series)
+    valid = ~np.isnan(array)
+    index = array.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    values = np.where(valid.any(axis=1), array[np.arange(array.shape[0]), index], np.nan)
+    return float(values[0]) if np.asarray(series).ndim == 1 else values
@@ -0,0 +1,31 @@
+import importlib
+import importlib.util
+import sys
+import types as pytypes
+
+def lazy_import(name: str) -> pytypes.ModuleType:
+    """Returns a module that is only executed on first attribute access.
+
+    Keeps heavy dependencies (yfinance, pandas, ta, ...) out of the import path
+    of the server so tool schemas can be registered without loading them.
+    Args:
+        name (str): Absolute module name, e.g. "yfinance".
+    Returns:
+        ModuleType: The (possibly not yet loaded) module.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+def load(*names: str) -> None:
+    """Forces the given modules to be fully imported, e.g. from a warm-up hook."""
+    for name in names:
+        dir(lazy_import(name))
@@ -1,10 +1,20 @@
-import yfinance as yf
+import asyncio
+import json
 import mcp.types as types
-import pandas as pd
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
-from ta.trend import MACD
 from mcp.server.lowlevel import Server
+from .lazy import lazy_import
+from .history import fetch_bars, fetch_histories, align_columns, align_returns
+from .indicator_state import indicator_states
+from .compute_pool import run_sharded, chunked, check_cancelled, COMPUTE_WORKERS
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+indicator_engine = lazy_import(f"{__package__}.indicators")
+rolling_engine = lazy_import(f"{__package__}.rolling")
+risk_engine = lazy_import(f"{__package__}.portfolio_risk")
+
+VAR_METHODS = ["historical", "monte_carlo", "both"]
+
 tools = [
     types.Tool(
             name="calculate-all-volatility",
@@ -32,23 +42,48 @@ tools = [
     types.Tool(
             name="get-technical-indicators",
             description=(
-                "Fetches technical indicators like RSI, MACD, and Bollinger Bands for a given stock symbol."
+                "Fetches technical indicators like RSI, MACD, Bollinger Bands, SMA, EMA, ATR and stochastics for one or many stock symbols."
             ),
             inputSchema={
                 "type": "object",
-                "required": ["symbol"],
+                "anyOf": [{"required": ["symbol"]}, {"required": ["symbols"]}],
                 "properties": {
                     "symbol": {
                         "type": "string",
                         "description": "The stock symbol to analyze (e.g., 'AAPL')",
                     },
+                    "symbols": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Several stock symbols to analyze at once. Used instead of 'symbol'.",
+                    },
                     "indicators": {
                         "type": "array",
                         "items": {"type": "string"},
                         "description": (
                             "A list of technical indicators to fetch. "
-                            "Supported indicators: 'RSI', 'MACD', 'BB'. "
-                            "Defaults to all if not provided."
+                            "Supported indicators: 'RSI', 'MACD', 'BB', 'SMA', 'EMA', 'ATR', 'STOCH'. "
+                            "Defaults to 'RSI', 'MACD' and 'BB' if not provided."
+                        ),
+                    },
+                    "output": {
+                        "type": "string",
+                        "enum": ["last", "series"],
+                        "description": "Return only the latest value ('last', default) or the full series ('series').",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "History used for the calculation (e.g., '6mo', '1y'). Defaults to '1y'.",
+                    },
+                    "interval": {
+                        "type": "string",
+                        "description": "Bar interval (e.g., '5m', '1h', '1d'). Defaults to '1d'.",
+                    },
+                    "params": {
+                        "type": "object",
+                        "description": (
+                            "Optional window overrides: rsi_window, macd_fast, macd_slow, macd_signal, bb_window, "
+                            "bb_dev, sma_window, ema_window, atr_window, stoch_window, stoch_smooth."
                         ),
                     },
                 },
@@ -83,16 +118,21 @@ tools = [
     types.Tool(
             name="get-risk-metrics",
             description=(
-                "Calculates risk metrics like Beta, Volatility, and Sharpe Ratio for a given stock symbol compared to a benchmark index."
+                "Calculates risk metrics like Beta, Volatility, and Sharpe Ratio for one or many stock symbols compared to a benchmark index."
             ),
             inputSchema={
                 "type": "object",
-                "required": ["symbol"],
+                "anyOf": [{"required": ["symbol"]}, {"required": ["symbols"]}],
                 "properties": {
                     "symbol": {
                         "type": "string",
                         "description": "The stock symbol to analyze (e.g., 'AAPL')",
                     },
+                    "symbols": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Several stock symbols to analyze at once. Used instead of 'symbol'.",
+                    },
                     "benchmark": {
                         "type": "string",
                         "description": (
@@ -108,6 +148,131 @@ tools = [
                     },
                 },
             }
+    ),
+    types.Tool(
+            name="calculate-rolling-correlations",
+            description=(
+                "Calculates rolling correlation and covariance series of daily returns for every pair of the given stock symbols."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["symbols_list"],
+                "properties": {
+                    "symbols_list": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "A list of at least two stock symbols (e.g., ['AAPL', 'MSFT', 'GOOGL']).",
+                    },
+                    "windows": {
+                        "type": "array",
+                        "items": {"type": "integer", "minimum": 2},
+                        "description": "Rolling window lengths in trading days. Defaults to [20, 60, 252].",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "The history used for the calculation (e.g., '1y', '2y'). Defaults to '2y'.",
+                    },
+                    "output": {
+                        "type": "string",
+                        "enum": ["last", "series"],
+                        "description": "Return the full series ('series', default) or only the latest values ('last').",
+                    },
+                },
+            }
+    ),
+    types.Tool(
+            name="get-rolling-beta",
+            description=(
+                "Calculates rolling beta, correlation and covariance series of one or many stock symbols against a benchmark index."
+            ),
+            inputSchema={
+                "type": "object",
+                "anyOf": [{"required": ["symbol"]}, {"required": ["symbols"]}],
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "The stock symbol to analyze (e.g., 'AAPL')",
+                    },
+                    "symbols": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Several stock symbols to analyze at once. Used instead of 'symbol'.",
+                    },
+                    "benchmark": {
+                        "type": "string",
+                        "description": "The benchmark index symbol (e.g., 'SPY'). Defaults to 'SPY' if not provided.",
+                    },
+                    "windows": {
+                        "type": "array",
+                        "items": {"type": "integer", "minimum": 2},
+                        "description": "Rolling window lengths in trading days. Defaults to [20, 60, 252].",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "The history used for the calculation (e.g., '1y', '2y'). Defaults to '2y'.",
+                    },
+                    "output": {
+                        "type": "string",
+                        "enum": ["last", "series"],
+                        "description": "Return the full series ('series', default) or only the latest values ('last').",
+                    },
+                },
+            }
+    ),
+    types.Tool(
+            name="calculate-portfolio-var",
+            description=(
+                "Calculates portfolio Value-at-Risk and Expected Shortfall (CVaR) of weighted holdings "
+                "using historical simulation and seeded Monte Carlo simulation."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["holdings"],
+                "properties": {
+                    "holdings": {
+                        "type": "object",
+                        "additionalProperties": {"type": "number"},
+                        "description": (
+                            "Fraction of the portfolio value held in each symbol, e.g. {'AAPL': 0.6, 'MSFT': 0.4}. "
+                            "Negative for short positions."
+                        ),
+                    },
+                    "portfolio_value": {
+                        "type": "number",
+                        "description": "Portfolio value used to report VaR in currency. Optional.",
+                    },
+                    "confidence_levels": {
+                        "type": "array",
+                        "items": {"type": "number", "exclusiveMinimum": 0, "exclusiveMaximum": 1},
+                        "description": "Confidence levels. Defaults to [0.95, 0.99].",
+                    },
+                    "horizon_days": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Holding period in trading days. Defaults to 1.",
+                    },
+                    "method": {
+                        "type": "string",
+                        "enum": VAR_METHODS,
+                        "description": "Simulation method. Defaults to 'both'.",
+                    },
+                    "paths": {
+                        "type": "integer",
+                        "minimum": 1000,
+                        "maximum": 10000000,
+                        "description": "Number of Monte Carlo paths. Defaults to 100000.",
+                    },
+                    "seed": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Seed of the Monte Carlo simulation, for reproducible results. Defaults to 42.",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "The history used for the calculation (e.g., '1y', '2y'). Defaults to '1y'.",
+                    },
+                },
+            }
     )
 ]
 async def tool_call_router(name: str, args: dict,app: Server) -> list[types.ContentBlock]:
@@ -117,6 +282,10 @@ async def tool_call_router(name: str, args: dict,app: Server) -> list[types.Cont
     raise ValueError(f"Tool {name} not found")
 async def calculate_all_volatility(app, args:dict) -> list[types.ContentBlock]:
     """Calculates the standard deviation of returns for a given stock symbol over multiple periods.
+
+    The 1 day (1 minute bars) and 5 day (60 minute bars) windows are derived
+    from one download of 1 minute bars, and the daily windows from one
+    download of 5 years of daily bars.
     Args:
         args (dict): A dictionary containing the following
             - symbol (str): The stock symbol to analyze (e.g., "AAPL").
@@ -125,25 +294,19 @@ async def calculate_all_volatility(app, args:dict) -> list[types.ContentBlock]:
         list[type.ContentBlock]: A list containing a single ContentBlock with the volatility information.
     """
     ctx = app.request_context
-    symbol = args.get("sysmbol", "").upper()
+    symbol = args.get("symbol", "").upper()
     period = args.get("period","")
 
     if not symbol:
-        return [types.ContentBlock(text="Please provide a valid stock symbol.")]
+        return [types.TextContent(type="text", text="Please provide a valid stock symbol.")]
 
     try:
-        ticker = yf.Ticker(symbol)
         response_data = {}
-        periods = ["1d","5d","1mo","3mo","6mo","1y","2y","5y"]
-        for period in periods:
-            if period=='1d':
-                history = ticker.history(period=period,interval="1m").sort_values(by="Datetime")
-            elif period=='5d':
-                history = ticker.history(period=period,interval='60m').sort_values(by="Datetime")
-            else:
-                history = ticker.history(period=period).sort_values(by="Date")
-            history["returns"] = history["Close"].pct_change()*100
-            response_data[period] = history.std(axis=0).iloc[-1]
+        # Longest window first, so the shorter ones are derived from its cached bars
+        windows = [("5y", "1d"), ("2y", "1d"), ("1y", "1d"), ("6mo", "1d"), ("3mo", "1d"), ("1mo", "1d"), ("5d", "60m"), ("1d", "1m")]
+        for period, interval in windows:
+            history = await fetch_bars(symbol, period, interval)
+            response_data[period] = float(history["Close"].pct_change().std() * 100)
 
         #Work in progress as values are added
         response_msg = (
@@ -159,7 +322,7 @@ async def calculate_all_volatility(app, args:dict) -> list[types.ContentBlock]:
         )
         
     except Exception as e:
-        error_msg = f"Error fetching data fro {symbol} with period {period}: {str(e)}"
+        error_msg = f"Error fetching data for {symbol} with period {period}: {str(e)}"
         await ctx.session.send_log_message(
             level="error",
             data=error_msg,
@@ -172,55 +335,79 @@ async def calculate_all_volatility(app, args:dict) -> list[types.ContentBlock]:
 
 async def get_technical_indicators(app, args:dict) -> list[types.ContentBlock]:
     """
-    Fetches technical indicators for a given stock symbol.
+    Fetches technical indicators for one or many stock symbols.
     Args:
         args (dict): A dictionary containing the following keys:
             - symbol (str): The stock symbol to analyze (e.g., "AAPL").
+            - symbols (list, optional): Several stock symbols, used instead of symbol.
             - indicators (list, optional): A list of technical indicators to fetch. Defaults to ["RSI", "MACD", "BB"].
+            - output (str, optional): "last" for the latest values or "series" for full series. Defaults to "last".
+            - period (str, optional): The history used for the calculation. Defaults to "1y".
+            - interval (str, optional): The bar interval. Defaults to "1d".
+            - params (dict, optional): Window overrides for the indicator engine.
     Returns:
         list[type.ContentBlock]: A list containing a single ContentBlock with the technical indicators information.
     """
     ctx = app.request_context
-    symbol = args.get("symbol", "").upper()
+    symbols = args.get("symbols") or [args.get("symbol", "")]
+    symbols = [symbol.upper() for symbol in symbols if symbol]
     indicators = args.get("indicators", ["RSI", "MACD", "BB"])
     if indicators is None or not isinstance(indicators, list) or len(indicators) == 0:
         indicators = ["RSI", "MACD", "BB"]
-    if not symbol:
-        return [types.ContentBlock(text="Please provide a valid stock symbol.")]
+    output = args.get("output", "last")
+    period = args.get("period", "1y")
+    interval = args.get("interval", "1d")
+    params = args.get("params")
+    if not symbols:
+        return [types.TextContent(type="text", text="Please provide a valid stock symbol.")]
 
     try:
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="1y")
-        response_data = {}
-
-        if "RSI" in indicators:
-            rsi_indicator = RSIIndicator(history['Close'], window=14)
-            history['RSI'] = rsi_indicator.rsi()
-            response_data["RSI"] = history['RSI'].iloc[-1]
-
-        if "MACD" in indicators:
-            macd_indicator = MACD(history['Close'])
-            history['MACD'] = macd_indicator.macd()
-            history['Signal Line'] = macd_indicator.macd_signal()
-            response_data["MACD"] = (history['MACD'].iloc[-1], history['Signal Line'].iloc[-1])
-
-        if "BB" in indicators:
-            bb_indicator = BollingerBands(history['Close'], window=20, window_dev=2)
-            history['BB_High'] = bb_indicator.bollinger_hband()
-            history['BB_Low'] = bb_indicator.bollinger_lband()
-            response_data["BB"] = (history['BB_High'].iloc[-1], history['BB_Low'].iloc[-1])
-
-        response_msg = f"Technical Indicators for {symbol}:\n"
-        if "RSI" in response_data:
-            response_msg += f"RSI: {response_data['RSI']:.2f}\n"
-        if "MACD" in response_data:
-            macd, signal = response_data["MACD"]
-            response_msg += f"MACD: {macd:.2f}, Signal Line: {signal:.2f}\n"
-        if "BB" in response_data:
-            bb_high, bb_low = response_data["BB"]
-            response_msg += f"Bollinger Bands - High: {bb_high:.2f}, Low: {bb_low:.2f}\n"
+        if output == "series":
+            histories, errors = await fetch_histories(symbols, period=period, interval=interval)
+            if not histories:
+                raise ValueError("; ".join(errors.values()))
+            fetched = [symbol for symbol in symbols if symbol in histories]
+            closes = align_columns(histories, "Close")[fetched]
+            highs = align_columns(histories, "High")[fetched]
+            lows = align_columns(histories, "Low")[fetched]
+            values = indicator_engine.compute_indicators(
+                closes.to_numpy().T, highs.to_numpy().T, lows.to_numpy().T,
+                indicators=indicators, params=params,
+            )
+            dates = closes.index.strftime("%Y-%m-%d %H:%M" if interval[-1] in "mh" else "%Y-%m-%d").tolist()
+            series = {}
+            for row, symbol in enumerate(fetched):
+                start = int(closes[symbol].notna().argmax())
+                series[symbol] = {"Date": dates[start:]}
+                for name, array in values.items():
+                    series[symbol][name] = [None if np.isnan(v) else round(float(v), 4) for v in array[row, start:]]
+            response_msg = f"Technical Indicators for {', '.join(fetched)} over {period}:\n{json.dumps(series)}"
+        else:
+            # Latest values come from rolling per-symbol state, updated with new bars only
+            wanted = [name.upper() for name in indicators]
+            unknown = [name for name in wanted if name not in indicator_engine.INDICATOR_OUTPUTS]
+            if unknown:
+                raise ValueError(f"Unsupported indicators: {', '.join(unknown)}")
+            results = await asyncio.gather(*[
+                indicator_states.latest(symbol, interval, period, params, fetch_bars) for symbol in symbols
+            ], return_exceptions=True)
+            errors = {}
+            response_msg = ""
+            for symbol, result in zip(symbols, results):
+                if isinstance(result, Exception):
+                    errors[symbol] = str(result)
+                    continue
+                latest, _ = result
+                response_msg += f"Technical Indicators for {symbol}:\n"
+                selected = {key: latest[key] for name in wanted for key in indicator_engine.INDICATOR_OUTPUTS[name]}
+                for line in format_indicator_lines(selected):
+                    response_msg += line + "\n"
+            if len(errors) == len(symbols):
+                raise ValueError("; ".join(errors.values()))
+        for symbol, error in errors.items():
+            response_msg += f"Error fetching data for {symbol}: {error}\n"
     except Exception as e:
-        error_msg = f"Error fetching data for {symbol}: {str(e)}"
+        error_msg = f"Error fetching data for {', '.join(symbols)}: {str(e)}"
         await ctx.session.send_log_message(
             level="error",
             data=error_msg,
@@ -230,6 +417,56 @@ async def get_technical_indicators(app, args:dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text=error_msg)]
     return [types.TextContent(type="text", text=response_msg)]
 
+def format_indicator_lines(latest: dict) -> list[str]:
+    """Formats the latest indicator values as one line per indicator."""
+    lines = []
+    if "RSI" in latest:
+        lines.append(f"RSI: {latest['RSI']:.2f}")
+    if "MACD" in latest:
+        lines.append(f"MACD: {latest['MACD']:.2f}, Signal Line: {latest['MACD_SIGNAL']:.2f}")
+    if "BB_HIGH" in latest:
+        lines.append(f"Bollinger Bands - High: {latest['BB_HIGH']:.2f}, Low: {latest['BB_LOW']:.2f}")
+    if "SMA" in latest:
+        lines.append(f"SMA: {latest['SMA']:.2f}")
+    if "EMA" in latest:
+        lines.append(f"EMA: {latest['EMA']:.2f}")
+    if "ATR" in latest:
+        lines.append(f"ATR: {latest['ATR']:.2f}")
+    if "STOCH_K" in latest:
+        lines.append(f"Stochastic %K: {latest['STOCH_K']:.2f}, %D: {latest['STOCH_D']:.2f}")
+    return lines
+
+def correlation_kernel(arrays: dict, row_start: int, row_end: int, block: int = 64) -> None:
+    """Pairwise complete Pearson correlations for rows [row_start, row_end) of the matrix.
+
+    Matches DataFrame.corr(): each pair uses the dates where both series have
+    values. Runs in a worker process and writes into arrays["corr"].
+    Args:
+        arrays (dict): "values" (T, N) with NaN gaps and the "corr" (N, N) output.
+        row_start (int): First row of the output computed by this job.
+        row_end (int): Row after the last one computed by this job.
+        block (int): Rows computed between cancellation checks.
+    """
+    values = arrays["values"]
+    # Centering does not change correlations but limits cancellation in the sums
+    centered = values - np.nanmean(values, axis=0)
+    valid = (~np.isnan(centered)).astype(np.float64)
+    x = np.nan_to_num(centered)
+    x2 = x * x
+    for start in range(row_start, row_end, block):
+        check_cancelled()
+        end = min(start + block, row_end)
+        xi, vi, x2i = x[:, start:end], valid[:, start:end], x2[:, start:end]
+        count = vi.T @ valid
+        sum_i, sum_j = xi.T @ valid, vi.T @ x
+        sum_ii, sum_jj = x2i.T @ valid, vi.T @ x2
+        sum_ij = xi.T @ x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = count * sum_ij - sum_i * sum_j
+            variance = (count * sum_ii - sum_i ** 2) * (count * sum_jj - sum_j ** 2)
+            corr = covariance / np.sqrt(variance)
+        arrays["corr"][start:end] = np.where(count > 1, np.clip(corr, -1.0, 1.0), np.nan)
+
 async def calculate_correlations(app, args:dict) -> list[types.ContentBlock]:
     """
     Calculates the correlation matrix for a list of stock symbols over a specified period.
@@ -246,16 +483,21 @@ async def calculate_correlations(app, args:dict) -> list[types.ContentBlock]:
     period = args.get("period", "1y")
     try:
         if not stock_symbols or not isinstance(stock_symbols, list):
-            return [types.ContentBlock(text="Please provide a valid list of stock symbols.")]
-
-        data = {}
-        for symbol in stock_symbols:
-            ticker = yf.Ticker(symbol)
-            history = ticker.history(period=period)
-            data[symbol] = history['Close']
+            return [types.TextContent(type="text", text="Please provide a valid list of stock symbols.")]
 
-        df = pd.DataFrame(data)
-        correlation_matrix = df.corr()
+        histories, errors = await fetch_histories(stock_symbols, period=period)
+        if errors:
+            raise ValueError("; ".join(f"{symbol}: {error}" for symbol, error in errors.items()))
+        symbols = list(dict.fromkeys(stock_symbols))
+        df = align_columns(histories, "Close", fill=False)[symbols]
+        shards = [(part[0], part[-1] + 1) for part in chunked(list(range(len(symbols))), COMPUTE_WORKERS)]
+        _, outputs = await run_sharded(
+            correlation_kernel, shards,
+            inputs={"values": df.to_numpy(dtype=float)},
+            outputs={"corr": ((len(symbols), len(symbols)), "float64")},
+            work=df.size * len(symbols),
+        )
+        correlation_matrix = pd.DataFrame(outputs["corr"], index=symbols, columns=symbols)
 
         response_msg = f"Correlation Matrix for {', '.join(stock_symbols)} over {period}:\n"
         response_msg += correlation_matrix.to_string()
@@ -271,57 +513,374 @@ async def calculate_correlations(app, args:dict) -> list[types.ContentBlock]:
         )
         return [types.TextContent(type="text", text=error_msg)]
 
+def risk_kernel(arrays: dict, column_start: int, column_end: int) -> None:
+    """Beta, annualized volatility and Sharpe ratio for columns [column_start, column_end).
+
+    Beta uses the dates where both the symbol and the benchmark have returns;
+    volatility and Sharpe use all of the symbol's returns. Runs in a worker
+    process and writes one row per symbol into arrays["metrics"].
+    Args:
+        arrays (dict): "returns" (T, N), "benchmark" (T,) and the "metrics" (N, 3) output.
+        column_start (int): First symbol column computed by this job.
+        column_end (int): Column after the last one computed by this job.
+    """
+    check_cancelled()
+    returns = arrays["returns"][:, column_start:column_end]
+    benchmark = arrays["benchmark"][:, np.newaxis]
+    both = ~np.isnan(returns) & ~np.isnan(benchmark)
+    count = both.sum(axis=0)
+    r = np.where(both, returns, 0.0)
+    b = np.where(both, benchmark, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_r, mean_b = r.sum(axis=0) / count, b.sum(axis=0) / count
+        covariance = (np.where(both, (r - mean_r) * (b - mean_b), 0.0)).sum(axis=0) / (count - 1)
+        benchmark_variance = (np.where(both, (b - mean_b) ** 2, 0.0)).sum(axis=0) / (count - 1)
+        beta = covariance / benchmark_variance
+        deviation = np.nanstd(returns, axis=0, ddof=1)
+        volatility = deviation * (252 ** 0.5)  # Annualized volatility
+        sharpe_ratio = (np.nanmean(returns, axis=0) * 252) / volatility
+    arrays["metrics"][column_start:column_end] = np.column_stack([beta, volatility, sharpe_ratio])
+
 async def get_risk_metrics(app, args:dict) -> list[types.ContentBlock]:
     """
-    Calculates risk metrics for a given stock symbol compared to a benchmark index.
+    Calculates risk metrics for one or many stock symbols compared to a benchmark index.
     Args:
         args (dict): A dictionary containing the following
             - symbol (str): The stock symbol to analyze (e.g., "AAPL").
+            - symbols (list, optional): Several stock symbols, used instead of symbol.
             - benchmark (str, optional): The benchmark index symbol. Defaults to "SPY".
             - period (str, optional): The time period for the analysis. Defaults to "1y".
     Returns:
         list[type.ContentBlock]: A list containing a single ContentBlock with the risk metrics information.
     """
     ctx = app.request_context
-    symbol = args.get("symbol", "").upper()
+    symbols = args.get("symbols") or [args.get("symbol", "")]
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols if symbol))
     benchmark = args.get("benchmark", "SPY").upper()
     period = args.get("period", "1y")
 
-    if not symbol:
-        return [types.ContentBlock(text="Please provide a valid stock symbol.")]
+    if not symbols:
+        return [types.TextContent(type="text", text="Please provide a valid stock symbol.")]
 
     try:
-        ticker = yf.Ticker(symbol)
-        benchmark_ticker = yf.Ticker(benchmark)
+        histories, errors = await fetch_histories(symbols + [benchmark], period=period)
+        if benchmark in errors:
+            raise ValueError(errors[benchmark])
+        fetched = [symbol for symbol in symbols if symbol in histories]
+        if not fetched:
+            raise ValueError("; ".join(errors.values()))
+        returns = align_returns(histories, fetched + [benchmark])
+        shards = [(part[0], part[-1] + 1) for part in chunked(list(range(len(fetched))), COMPUTE_WORKERS)]
+        _, outputs = await run_sharded(
+            risk_kernel, shards,
+            inputs={"returns": returns[fetched].to_numpy(dtype=float), "benchmark": returns[benchmark].to_numpy(dtype=float)},
+            outputs={"metrics": ((len(fetched), 3), "float64")},
+        )
 
-        history = ticker.history(period=period)
-        benchmark_history = benchmark_ticker.history(period=period)
+        response_msg = ""
+        for symbol, (beta, volatility, sharpe_ratio) in zip(fetched, outputs["metrics"]):
+            response_msg += (
+                f"Risk Metrics for {symbol} compared to {benchmark} over {period}:\n"
+                f"Beta: {beta:.2f}\n"
+                f"Annualized Volatility: {volatility:.2f}\n"
+                f"Sharpe Ratio: {sharpe_ratio:.2f}\n"
+            )
+        for symbol, error in errors.items():
+            response_msg += f"Error fetching data for {symbol}: {error}\n"
 
-        history['Returns'] = history['Close'].pct_change()
-        benchmark_history['Benchmark Returns'] = benchmark_history['Close'].pct_change()
+    except Exception as e:
+        error_msg = f"Error fetching data for {', '.join(symbols)} or {benchmark}: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="get_risk_metrics",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
 
-        merged_data = history[['Returns']].join(benchmark_history[['Benchmark Returns']], how='inner').dropna()
+    return [types.TextContent(type="text", text=response_msg)]
 
-        beta = merged_data['Returns'].cov(merged_data['Benchmark Returns']) / merged_data['Benchmark Returns'].var()
-        volatility = history['Returns'].std() * (252 ** 0.5)  # Annualized volatility
-        sharpe_ratio = (history['Returns'].mean() * 252) / (history['Returns'].std() * (252 ** 0.5))
 
-        response_msg = (
-            f"Risk Metrics for {symbol} compared to {benchmark} over {period}:\n"
-            f"Beta: {beta:.2f}\n"
-            f"Annualized Volatility: {volatility:.2f}\n"
-            f"Sharpe Ratio: {sharpe_ratio:.2f}\n"
+def rolling_kernel(arrays: dict, pair_start: int, pair_end: int, windows: list[int]) -> None:
+    """Rolling correlation, covariance and beta for pairs [pair_start, pair_end).
+
+    Runs in a worker process for large inputs and writes into the "corr", "cov"
+    and "beta" (windows, T, pairs) outputs.
+    Args:
+        arrays (dict): "returns" (T, N), "left" and "right" (pairs,) column indexes and the outputs.
+        pair_start (int): First pair computed by this job.
+        pair_end (int): Pair after the last one computed by this job.
+        windows (list[int]): Window lengths, one output slice each.
+    """
+    returns = arrays["returns"]
+    x = returns[:, arrays["left"][pair_start:pair_end]]
+    y = returns[:, arrays["right"][pair_start:pair_end]]
+    for index, window in enumerate(windows):
+        check_cancelled()
+        stats = rolling_engine.rolling_comoments(x, y, window)
+        for name in rolling_engine.ROLLING_STATS:
+            arrays[name][index, :, pair_start:pair_end] = stats[name]
+
+async def rolling_statistics(histories: dict, symbols: list[str], pairs: list[tuple[str, str]], windows: list[int]):
+    """Rolling statistics of the daily returns of each (left, right) pair.
+    Args:
+        histories (dict): DataFrames keyed by symbol.
+        symbols (list[str]): Symbols used by the pairs.
+        pairs (list[tuple]): (left, right) symbols; beta is the slope of left on right.
+        windows (list[int]): Window lengths in rows.
+    Returns:
+        tuple[pd.Index, dict]: Dates and the "corr", "cov" and "beta" (windows, T, pairs) arrays.
+    """
+    returns = align_returns(histories, symbols)
+    column = {symbol: index for index, symbol in enumerate(symbols)}
+    shards = [(part[0], part[-1] + 1, windows) for part in chunked(list(range(len(pairs))), COMPUTE_WORKERS)]
+    shape = (len(windows), len(returns), len(pairs))
+    _, outputs = await run_sharded(
+        rolling_kernel, shards,
+        inputs={
+            "returns": returns.to_numpy(dtype=float),
+            "left": np.array([column[left] for left, _ in pairs], dtype=np.int64),
+            "right": np.array([column[right] for _, right in pairs], dtype=np.int64),
+        },
+        outputs={name: (shape, "float64") for name in rolling_engine.ROLLING_STATS},
+    )
+    return returns.index, outputs
+
+def format_rolling_statistics(dates, outputs: dict, labels: list[str], windows: list[int], names: list[str], output: str) -> str:
+    """Formats rolling statistics as JSON series per pair, or as the latest value lines."""
+    if output == "series":
+        dates = dates.strftime("%Y-%m-%d").tolist()
+        series = {}
+        for pair, label in enumerate(labels):
+            values = {f"{name}_{window}": outputs[name][index, :, pair] for index, window in enumerate(windows) for name in names}
+            ready = np.any([~np.isnan(array) for array in values.values()], axis=0)
+            start = int(ready.argmax()) if ready.any() else len(dates)
+            series[label] = {"Date": dates[start:]}
+            for key, array in values.items():
+                series[label][key] = [None if np.isnan(v) else round(float(v), 6) for v in array[start:]]
+        return json.dumps(series)
+    titles = {"corr": "Correlation", "cov": "Covariance", "beta": "Beta"}
+    lines = []
+    for pair, label in enumerate(labels):
+        lines.append(f"{label}:")
+        for index, window in enumerate(windows):
+            latest = {name: indicator_engine.last_valid(outputs[name][index, :, pair]) for name in names}
+            lines.append(f"{window}-day " + ", ".join(
+                f"{titles[name]}: {'n/a' if np.isnan(value) else f'{value:.6f}' if name == 'cov' else f'{value:.2f}'}"
+                for name, value in latest.items()
+            ))
+    return "\n".join(lines)
+
+def validate_windows(windows) -> list[int]:
+    windows = windows or rolling_engine.DEFAULT_WINDOWS
+    if not isinstance(windows, list) or any(not isinstance(window, int) or window < 2 for window in windows):
+        raise ValueError("windows must be a list of integers of at least 2")
+    return sorted(set(windows))
+
+async def calculate_rolling_correlations(app, args: dict) -> list[types.ContentBlock]:
+    """
+    Calculates rolling correlation and covariance series for every pair of the given symbols.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - symbols_list (list): At least two stock symbols (e.g., ["AAPL", "MSFT"]).
+            - windows (list, optional): Window lengths in trading days. Defaults to [20, 60, 252].
+            - period (str, optional): The history used for the calculation. Defaults to "2y".
+            - output (str, optional): "series" for full series or "last" for the latest values. Defaults to "series".
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with the rolling statistics.
+    """
+    ctx = app.request_context
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in args.get("symbols_list") or [] if symbol))
+    period = args.get("period", "2y")
+    output = args.get("output", "series")
+    if len(symbols) < 2:
+        return [types.TextContent(type="text", text="Please provide at least two stock symbols.")]
+
+    try:
+        windows = validate_windows(args.get("windows"))
+        histories, errors = await fetch_histories(symbols, period=period)
+        if errors:
+            raise ValueError("; ".join(f"{symbol}: {error}" for symbol, error in errors.items()))
+        pairs = [(left, right) for i, left in enumerate(symbols) for right in symbols[i + 1:]]
+        dates, outputs = await rolling_statistics(histories, symbols, pairs, windows)
+        response_msg = f"Rolling correlations of daily returns for {', '.join(symbols)} over {period}:\n"
+        response_msg += format_rolling_statistics(
+            dates, outputs, [f"{left}/{right}" for left, right in pairs], windows, ["corr", "cov"], output
         )
+    except Exception as e:
+        error_msg = f"Error calculating rolling correlations: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="calculate_rolling_correlations",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
 
+async def get_rolling_beta(app, args: dict) -> list[types.ContentBlock]:
+    """
+    Calculates rolling beta, correlation and covariance series of one or many symbols against a benchmark.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - symbol (str): The stock symbol to analyze (e.g., "AAPL").
+            - symbols (list, optional): Several stock symbols, used instead of symbol.
+            - benchmark (str, optional): The benchmark index symbol. Defaults to "SPY".
+            - windows (list, optional): Window lengths in trading days. Defaults to [20, 60, 252].
+            - period (str, optional): The history used for the calculation. Defaults to "2y".
+            - output (str, optional): "series" for full series or "last" for the latest values. Defaults to "series".
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with the rolling statistics.
+    """
+    ctx = app.request_context
+    symbols = args.get("symbols") or [args.get("symbol", "")]
+    benchmark = args.get("benchmark", "SPY").upper()
+    symbols = [symbol for symbol in dict.fromkeys(symbol.upper() for symbol in symbols if symbol) if symbol != benchmark]
+    period = args.get("period", "2y")
+    output = args.get("output", "series")
+    if not symbols:
+        return [types.TextContent(type="text", text="Please provide a valid stock symbol.")]
+
+    try:
+        windows = validate_windows(args.get("windows"))
+        histories, errors = await fetch_histories(symbols + [benchmark], period=period)
+        if benchmark in errors:
+            raise ValueError(errors[benchmark])
+        fetched = [symbol for symbol in symbols if symbol in histories]
+        if not fetched:
+            raise ValueError("; ".join(errors.values()))
+        dates, outputs = await rolling_statistics(histories, fetched + [benchmark], [(symbol, benchmark) for symbol in fetched], windows)
+        response_msg = f"Rolling statistics of daily returns against {benchmark} over {period}:\n"
+        response_msg += format_rolling_statistics(
+            dates, outputs, [f"{symbol}/{benchmark}" for symbol in fetched], windows, ["beta", "corr", "cov"], output
+        )
+        for symbol, error in errors.items():
+            response_msg += f"\nError fetching data for {symbol}: {error}"
     except Exception as e:
-        error_msg = f"Error fetching data for {symbol} or {benchmark}: {str(e)}"
+        error_msg = f"Error calculating rolling beta for {', '.join(symbols)} against {benchmark}: {str(e)}"
         await ctx.session.send_log_message(
             level="error",
             data=error_msg,
-            logger="get_risk_metrics",
+            logger="get_rolling_beta",
             related_request_id=ctx.request_id
         )
         return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
+
+def monte_carlo_kernel(arrays: dict, row: int, chunk_start: int, chunk_end: int, chunk_paths: int, paths: int, horizon: int, seed: int) -> None:
+    """Simulates portfolio returns for chunks [chunk_start, chunk_end) of the paths.
+
+    Runs in a worker process for large simulations. Only one chunk of draws
+    and the largest losses so far are held in memory at a time; the largest
+    losses are written to row `row` of arrays["worst"], NaN padded.
+    Args:
+        arrays (dict): "mean" (N,), "factor" (N, N), "weights" (N,) and the "worst" (jobs, tail) output.
+        row (int): Row of this job in the output.
+        chunk_start (int): First chunk simulated by this job.
+        chunk_end (int): Chunk after the last one simulated by this job.
+        chunk_paths (int): Paths per chunk; the last chunk may be shorter.
+        paths (int): Paths of the whole simulation.
+        horizon (int): Holding period in days.
+        seed (int): Seed of the whole simulation.
+    """
+    output = arrays["worst"][row]
+    worst = np.empty(0)
+    for chunk in range(chunk_start, chunk_end):
+        check_cancelled()
+        start = chunk * chunk_paths
+        end = min(start + chunk_paths, paths)
+        returns = risk_engine.simulate_chunk(
+            arrays["mean"], arrays["factor"], arrays["weights"], horizon, end - start, seed, chunk
+        )
+        worst = risk_engine.keep_worst(worst, -returns, len(output))
+    output[:] = np.nan
+    output[:len(worst)] = worst
+
+async def calculate_portfolio_var(app, args: dict) -> list[types.ContentBlock]:
+    """
+    Calculates portfolio Value-at-Risk and Expected Shortfall of weighted holdings.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - holdings (dict): Fraction of the portfolio value per symbol (e.g., {"AAPL": 0.6, "MSFT": 0.4}).
+            - portfolio_value (float, optional): Value used to report VaR in currency.
+            - confidence_levels (list, optional): Confidence levels. Defaults to [0.95, 0.99].
+            - horizon_days (int, optional): Holding period in trading days. Defaults to 1.
+            - method (str, optional): "historical", "monte_carlo" or "both". Defaults to "both".
+            - paths (int, optional): Number of Monte Carlo paths. Defaults to 100000.
+            - seed (int, optional): Seed of the Monte Carlo simulation. Defaults to 42.
+            - period (str, optional): The history used for the calculation. Defaults to "1y".
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with VaR and CVaR per method and confidence level.
+    """
+    ctx = app.request_context
+    holdings = {symbol.upper(): float(weight) for symbol, weight in (args.get("holdings") or {}).items()}
+    portfolio_value = args.get("portfolio_value")
+    confidences = sorted(set(args.get("confidence_levels") or risk_engine.DEFAULT_CONFIDENCES))
+    horizon = int(args.get("horizon_days", 1))
+    method = args.get("method", "both")
+    paths = int(args.get("paths", 100000))
+    seed = int(args.get("seed", 42))
+    period = args.get("period", "1y")
+    if not holdings:
+        return [types.TextContent(type="text", text="Please provide holdings with a weight per stock symbol.")]
 
+    try:
+        if method not in VAR_METHODS:
+            raise ValueError(f"Unknown method {method}. Options: {', '.join(VAR_METHODS)}")
+        if seed < 0:
+            raise ValueError(f"Seed must be a non-negative integer, got {seed}")
+        symbols = list(holdings)
+        histories, errors = await fetch_histories(symbols, period=period)
+        if errors:
+            raise ValueError("; ".join(f"{symbol}: {error}" for symbol, error in errors.items()))
+        # Scenarios need a return for every holding, so days where one did not trade are dropped
+        returns = align_returns(histories, symbols).dropna().to_numpy(dtype=float)
+        if len(returns) < horizon + 1:
+            raise ValueError(f"Only {len(returns)} days of returns shared by all holdings over {period}")
+        weights = np.array([holdings[symbol] for symbol in symbols])
+
+        def describe(risks: list[tuple[float, float]]) -> str:
+            lines = ""
+            for confidence, (var, cvar) in zip(confidences, risks):
+                lines += f"{confidence:.1%} VaR: {var:.2%}, CVaR: {cvar:.2%}"
+                if portfolio_value:
+                    lines += f" (VaR ${var * portfolio_value:,.2f}, CVaR ${cvar * portfolio_value:,.2f})"
+                lines += "\n"
+            return lines
+
+        book = ", ".join(f"{symbol} {weight:.2%}" for symbol, weight in holdings.items()) if len(holdings) <= 10 else f"{len(holdings)} holdings"
+        response_msg = (
+            f"Portfolio VaR for {book} "
+            f"over {horizon} day{'s' if horizon > 1 else ''}, from {len(returns)} days of returns over {period}:\n"
+        )
+        if method in ("historical", "both"):
+            scenarios = risk_engine.horizon_returns(returns, weights, horizon)
+            response_msg += f"Historical simulation ({len(scenarios)} scenarios):\n"
+            response_msg += describe(risk_engine.tail_risk(scenarios, confidences))
+        if method in ("monte_carlo", "both"):
+            log_returns = np.log1p(returns)
+            factor = risk_engine.covariance_factor(np.cov(log_returns, rowvar=False).reshape(len(symbols), len(symbols)))
+            chunk_paths = risk_engine.chunk_paths(len(symbols))
+            chunks = -(-paths // chunk_paths)
+            parts = chunked(list(range(chunks)), COMPUTE_WORKERS)
+            shards = [(row, part[0], part[-1] + 1, chunk_paths, paths, horizon, seed) for row, part in enumerate(parts)]
+            # Each job keeps only the losses that can decide VaR and CVaR
+            tail = risk_engine.tail_size(paths, confidences)
+            _, outputs = await run_sharded(
+                monte_carlo_kernel, shards,
+                inputs={"mean": log_returns.mean(axis=0), "factor": factor, "weights": weights},
+                outputs={"worst": ((len(shards), tail), "float64")},
+                work=paths * horizon * len(symbols) ** 2,
+            )
+            response_msg += f"Monte Carlo simulation ({paths} paths, seed {seed}):\n"
+            response_msg += describe(risk_engine.tail_risk(-outputs["worst"].ravel(), confidences, scenarios=paths))
+    except Exception as e:
+        error_msg = f"Error calculating portfolio VaR for {', '.join(holdings)}: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="calculate_portfolio_var",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
     return [types.TextContent(type="text", text=response_msg)]
-    
\ No newline at end of file
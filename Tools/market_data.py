@@ -1,7 +1,19 @@
-import yfinance as yf
+import asyncio
+import datetime
+import json
 import mcp.types as types
-import pandas as pd
 from mcp.server.lowlevel import Server
+from .lazy import lazy_import
+from .corporate_actions import corporate_actions, KINDS
+from .upstream import INTERACTIVE, BULK
+from .cache import upstream_cache
+from .history import serve_bars
+from .screener import load_universe
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+
+MAX_CONCURRENT_CHAINS = 8
+CHAIN_COLUMNS = ["contractSymbol", "strike", "lastPrice", "bid", "ask", "volume", "openInterest", "impliedVolatility", "inTheMoney"]
 tools = [
     types.Tool(
                 name="get-stock-price-data",
@@ -16,6 +28,16 @@ tools = [
                             "type": "string",
                             "description": "Stock ticker symbol to fetch data for",
                         },
+                        "require_fresh": {
+                            "type": "boolean",
+                            "default": False,
+                            "description": "Wait for data from Yahoo instead of getting an expired cached value at once, default false.",
+                        },
+                        "max_staleness": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Seconds past its refresh time a cached value may be, capped by the server limit.",
+                        },
                     },
                 }
             ),
@@ -43,6 +65,24 @@ tools = [
                                 """
                             ),
                         },
+                        "interval": {
+                            "type": "string",
+                            "default": "1d",
+                            "description": (
+                                "Bar interval, e.g. '1m', '5m', '15m', '30m', '1h' or '1d', default is '1d'. "
+                                "Intraday bars of a timeframe are derived from one download of its finest bars."
+                            ),
+                        },
+                        "require_fresh": {
+                            "type": "boolean",
+                            "default": False,
+                            "description": "Wait for data from Yahoo instead of getting an expired cached value at once, default false.",
+                        },
+                        "max_staleness": {
+                            "type": "integer",
+                            "minimum": 0,
+                            "description": "Seconds past its refresh time a cached value may be, capped by the server limit.",
+                        },
                     },
                 }
             ),
@@ -98,6 +138,73 @@ tools = [
                 },
             }
         ),
+        types.Tool(
+            name="get-options-chains",
+            description=(
+                "Fetches calls and puts of many tickers and expirations at once, filtered by moneyness, volume and open interest, "
+                "e.g. to scan a watchlist for liquid near the money options"
+            ),
+            inputSchema={
+                "type": "object",
+                "anyOf": [{"required": ["tickers"]}, {"required": ["universe_file"]}],
+                "properties": {
+                    "tickers": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Stock ticker symbols to scan (e.g., ['AAPL', 'MSFT'])",
+                    },
+                    "universe_file": {
+                        "type": "string",
+                        "description": "Name of a locally stored symbol list, e.g. 'dow30'. Combined with 'tickers' when both are given.",
+                    },
+                    "nearest_expirations": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "default": 1,
+                        "description": "Number of nearest expirations per ticker, default is 1. Ignored when a date range is given.",
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "First expiration date in 'YYYY-MM-DD' format. Selects expirations by date range, defaults to today.",
+                    },
+                    "end_date": {
+                        "type": "string",
+                        "description": "Last expiration date in 'YYYY-MM-DD' format. Selects expirations by date range, defaults to 30 days after start_date.",
+                    },
+                    "option_types": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["call", "put"]},
+                        "description": "Sides to return, default is both.",
+                    },
+                    "min_moneyness": {
+                        "type": "number",
+                        "default": 0.9,
+                        "description": "Lowest strike as a fraction of the underlying price, default is 0.9",
+                    },
+                    "max_moneyness": {
+                        "type": "number",
+                        "default": 1.1,
+                        "description": "Highest strike as a fraction of the underlying price, default is 1.1",
+                    },
+                    "min_volume": {
+                        "type": "integer",
+                        "default": 0,
+                        "description": "Lowest traded volume of a contract, default is 0",
+                    },
+                    "min_open_interest": {
+                        "type": "integer",
+                        "default": 0,
+                        "description": "Lowest open interest of a contract, default is 0",
+                    },
+                    "max_strikes": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "default": 10,
+                        "description": "Contracts per side and expiration, nearest the money first, default is 10",
+                    },
+                },
+            }
+        ),
         types.Tool(
             name="get-dividend-history",
             description=(
@@ -136,6 +243,41 @@ tools = [
                     },
                 },
             }
+        ),
+        types.Tool(
+            name="get-corporate-actions",
+            description=(
+                "Finds dividends (ex-dividend dates), stock splits and earnings dates between two dates across many tickers, "
+                "e.g. all earnings in the next 14 days across a watchlist"
+            ),
+            inputSchema={
+                "type": "object",
+                "anyOf": [{"required": ["tickers"]}, {"required": ["universe_file"]}],
+                "properties": {
+                    "tickers": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Stock ticker symbols to search (e.g., ['AAPL', 'MSFT'])",
+                    },
+                    "universe_file": {
+                        "type": "string",
+                        "description": "Name of a locally stored symbol list, e.g. 'dow30'. Combined with 'tickers' when both are given.",
+                    },
+                    "kinds": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": KINDS},
+                        "description": "Kinds of actions to return: 'dividend', 'split', 'earnings'. Defaults to all.",
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "First date in 'YYYY-MM-DD' format. Defaults to today.",
+                    },
+                    "end_date": {
+                        "type": "string",
+                        "description": "Last date in 'YYYY-MM-DD' format. Defaults to 14 days after start_date.",
+                    },
+                },
+            }
         )
 ]
 async def tool_call_router(name: str,args:dict,app:Server) -> list[types.ContentBlock]:
@@ -144,11 +286,19 @@ async def tool_call_router(name: str,args:dict,app:Server) -> list[types.Content
             return await globals()[tool.name.replace("-", "_")](app, args)
     raise ValueError(f"Tool {name} not found")
 
+def freshness_line(age: float, stale: bool) -> str:
+    """Age of a served value, flagging values served past their refresh time."""
+    if stale:
+        return f"Data age: {age:.0f}s (past its refresh time, an update is in progress)"
+    return f"Data age: {age:.0f}s"
+
 async def get_stock_price_data(app,args: dict) -> list[types.ContentBlock]:
     """Fetches the current stock price and related data for a given ticker.
     Args:
         args (dict): Dictionary containing 'ticker'.
             - ticker (str): Stock ticker symbol to fetch data for.
+            - require_fresh (bool): Do not serve an expired cached quote, default false.
+            - max_staleness (int): Seconds past expiry a cached quote may be served.
     Returns:
         list[types.ContentBlock]: List of content blocks with stock data.
     """
@@ -158,20 +308,19 @@ async def get_stock_price_data(app,args: dict) -> list[types.ContentBlock]:
     ticker = args["ticker"].upper()
     
     try:
-        stock_data = yf.Ticker(ticker).info
-        if not stock_data:
-            raise ValueError(f"No data found for ticker: {ticker}")
+        quote, age, stale = await upstream_cache.serve(
+            "quote", ticker, max_stale=args.get("max_staleness"), require_fresh=args.get("require_fresh", False)
+        )
         
-        price = stock_data.get("currentPrice", "N/A")
-        market = stock_data.get("market", "N/A")
-        market_cap = stock_data.get("marketCap", "N/A")
-        volume = stock_data.get("volume", "N/A")
-        sector = stock_data.get("sector", "N/A")
+        price = "N/A" if quote.price is None else quote.price
+        market_cap = "N/A" if quote.market_cap is None else quote.market_cap
+        volume = "N/A" if quote.volume is None else quote.volume
         
         response_msg = (
             f"Current price for {ticker}: ${price}\n"
             f"Market Cap: ${market_cap}\n"
-            f"Volume: {volume}"
+            f"Volume: {volume}\n"
+            f"{freshness_line(age, stale)}"
         )
         
         await ctx.session.send_log_message(
@@ -199,24 +348,29 @@ async def get_stock_price_period(app,args:dict) -> list[types.ContentBlock]:
         args (dict): Dictionary containing 'ticker' and 'timeframe'.
             - ticker (str): Stock ticker symbol to fetch data for.
             - timeframe (str): Timeframe for the stock price, default is "1d".
+            - interval (str): Bar interval, default is "1d".
+            - require_fresh (bool): Do not serve an expired cached history, default false.
+            - max_staleness (int): Seconds past expiry a cached history may be served.
     Returns:
         list[types.ContentBlock]: List of content blocks with stock price data.
     """
     ctx = app.request_context
     ticker = args.get("ticker", "").upper()
     timeframe = args.get("timeframe", "1d")
+    interval = args.get("interval", "1d")
     
     if not ticker:
         return [types.TextContent(type="text", text="Ticker symbol is required.")]
     
     try:
-        stock_data = yf.Ticker(ticker).history(period=timeframe)
-        if stock_data.empty:
-            raise ValueError(f"No data found for ticker: {ticker} with timeframe: {timeframe}")
+        stock_data, age, stale = await serve_bars(
+            ticker, timeframe, interval, max_stale=args.get("max_staleness"), require_fresh=args.get("require_fresh", False)
+        )
         stock_data_json = stock_data.to_json(orient="records")
         latest_price = stock_data["Close"].iloc[-1]
         response_msg = (
-            f"Latest price for {ticker} ({timeframe}): ${latest_price}\n"
+            f"Latest price for {ticker} ({timeframe}, {interval} bars): ${latest_price}\n"
+            f"{freshness_line(age, stale)}\n"
             f"Data: {stock_data_json}"
         )
         await ctx.session.send_log_message(
@@ -229,7 +383,7 @@ async def get_stock_price_period(app,args:dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text=response_msg)]
     
     except Exception as e:
-        error_msg = f"Error fetching data for {ticker} with timeframe {timeframe}: {str(e)}"
+        error_msg = f"Error fetching data for {ticker} with timeframe {timeframe} and interval {interval}: {str(e)}"
         await ctx.session.send_log_message(
             level="error",
             data=error_msg,
@@ -252,7 +406,7 @@ async def get_options_dates(app, args: dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text="Ticker symbol is required.")]
     
     try:
-        options_dates = yf.Ticker(ticker).options
+        options_dates = await upstream_cache.get("options", ticker)
         if not options_dates:
             raise ValueError(f"No options dates found for ticker: {ticker}")
         
@@ -295,13 +449,13 @@ async def get_options_chain(app, args: dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text="Ticker symbol is required.")]
     
     try:
-        options_dates = yf.Ticker(ticker).options
+        options_dates = await upstream_cache.get("options", ticker)
         if not options_dates:
             raise ValueError(f"No options chain found for ticker: {ticker}")
         if not expiration_date or expiration_date not in options_dates:
             return [types.TextContent(type="text", text=f"Expiration date {expiration_date} not found for {ticker}. Available dates: {', '.join(options_dates)}")]
 
-        options_chain = yf.Ticker(ticker).option_chain(expiration_date)
+        options_chain = await upstream_cache.get("chain", ticker, expiration_date)
         if options_type == "call":
             options_data = options_chain.calls
         elif options_type == "put":
@@ -330,7 +484,7 @@ async def get_options_chain(app, args: dict) -> list[types.ContentBlock]:
         )
         return [types.TextContent(type="text", text=error_msg)]
 async def get_dividend_history(app, args: dict) -> list[types.ContentBlock]:
-    """Fetches the dividend history for a given ticker.
+    """Fetches the dividend history for a given ticker from the corporate actions store.
     Args:
         args (dict): Dictionary containing 'ticker' and 'years_back'.
             - ticker (str): Stock ticker symbol to fetch dividend history for.
@@ -346,19 +500,16 @@ async def get_dividend_history(app, args: dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text="Ticker symbol is required.")]
     
     try:
-        dat = yf.Ticker(ticker)
-        dividends = dat.dividends
-        if dividends.empty:
-            raise ValueError(f"No dividend history found for ticker: {ticker}")
-        
-        # Filter dividends based on years_back
-        recent_dividends = dividends[dividends.index.year >= (pd.Timestamp.now().year - years_back)]
-        if recent_dividends.empty:
+        errors = await corporate_actions.ensure_fresh([ticker])
+        if ticker in errors:
+            raise ValueError(errors[ticker])
+        start = f"{datetime.date.today().year - years_back}-01-01"
+        dividends = await asyncio.to_thread(corporate_actions.query, ["dividend"], start, "9999-12-31", [ticker])
+        if not dividends:
             raise ValueError(f"No dividends found for the last {years_back} years for ticker: {ticker}")
-        recent_dividends = recent_dividends.reset_index()
-        recent_dividends["Date"] = recent_dividends["Date"].dt.strftime("%Y-%m-%d")
+        recent_dividends = [{"Date": action["date"], "Dividends": action["value"]} for action in dividends]
         
-        response_msg = f"Dividend history for {ticker} over the last {years_back} years:\n{recent_dividends.to_json(orient='records')}"
+        response_msg = f"Dividend history for {ticker} over the last {years_back} years:\n{json.dumps(recent_dividends)}"
         await ctx.session.send_log_message(
             level="info",
             data=response_msg,
@@ -379,7 +530,7 @@ async def get_dividend_history(app, args: dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text=error_msg)]
 
 async def get_earnings_calendar(app, args: dict) -> list[types.ContentBlock]:
-    """Fetches the earnings calendar for a given ticker.
+    """Fetches the earnings calendar for a given ticker from the corporate actions store.
     Args:
         args (dict): Dictionary containing 'ticker'.
             - ticker (str): Stock ticker symbol to fetch earnings calendar for.
@@ -393,12 +544,14 @@ async def get_earnings_calendar(app, args: dict) -> list[types.ContentBlock]:
         return [types.TextContent(type="text", text="Ticker symbol is required.")]
     
     try:
-        earnings_calendar = yf.Ticker(ticker).earnings_dates
-        if earnings_calendar.empty:
+        errors = await corporate_actions.ensure_fresh([ticker])
+        if ticker in errors:
+            raise ValueError(errors[ticker])
+        earnings = await asyncio.to_thread(corporate_actions.query, ["earnings"], "0000-01-01", "9999-12-31", [ticker], descending=True)
+        if not earnings:
             raise ValueError(f"No earnings calendar found for ticker: {ticker}")
-        earnings_calendar = earnings_calendar.reset_index()
-        earnings_calendar["Earnings Date"] = earnings_calendar["Earnings Date"].dt.strftime("%Y-%m-%d")
-        response_msg = f"Earnings calendar for {ticker}:\n{earnings_calendar.to_json(orient='records')}"
+        earnings_calendar = [{"Earnings Date": action["date"], **(action["details"] or {})} for action in earnings]
+        response_msg = f"Earnings calendar for {ticker}:\n{json.dumps(earnings_calendar)}"
         await ctx.session.send_log_message(
             level="info",
             data=response_msg,
@@ -418,3 +571,159 @@ async def get_earnings_calendar(app, args: dict) -> list[types.ContentBlock]:
         )
         return [types.TextContent(type="text", text=error_msg)]
 
+async def get_corporate_actions(app, args: dict) -> list[types.ContentBlock]:
+    """Finds dividends, splits and earnings dates between two dates across many tickers.
+    Args:
+        args (dict): Dictionary containing the following keys:
+            - tickers (list, optional): Stock ticker symbols to search.
+            - universe_file (str, optional): Name of a stored symbol list, e.g. "dow30".
+            - kinds (list, optional): Any of "dividend", "split", "earnings". Defaults to all.
+            - start_date (str, optional): First date in 'YYYY-MM-DD' format. Defaults to today.
+            - end_date (str, optional): Last date in 'YYYY-MM-DD' format. Defaults to 14 days after start_date.
+    Returns:
+        list[types.ContentBlock]: List of content blocks with the actions ordered by date.
+    """
+    ctx = app.request_context
+    kinds = args.get("kinds") or KINDS
+    try:
+        tickers = [ticker.upper() for ticker in args.get("tickers") or []]
+        if args.get("universe_file"):
+            tickers += load_universe(args["universe_file"])
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return [types.TextContent(type="text", text="Please provide tickers or a universe_file.")]
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            raise ValueError(f"Unknown kinds {', '.join(unknown)}. Kinds: {', '.join(KINDS)}")
+        start = datetime.date.fromisoformat(args["start_date"]) if args.get("start_date") else datetime.date.today()
+        end = datetime.date.fromisoformat(args["end_date"]) if args.get("end_date") else start + datetime.timedelta(days=14)
+
+        errors = await corporate_actions.ensure_fresh(tickers)
+        actions = await asyncio.to_thread(corporate_actions.query, kinds, start.isoformat(), end.isoformat(), tickers)
+        response_msg = (
+            f"{len(actions)} corporate actions ({', '.join(kinds)}) for {len(tickers)} tickers "
+            f"from {start.isoformat()} to {end.isoformat()}:\n{json.dumps(actions)}"
+        )
+        if errors:
+            response_msg += f"\nFailed to refresh {len(errors)} tickers: {', '.join(sorted(errors))}"
+    except Exception as e:
+        error_msg = f"Error fetching corporate actions: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="get_corporate_actions",
+            related_request_id=ctx.request_id,
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
+
+def select_expirations(expirations: tuple[str, ...], nearest: int, start: datetime.date | None, end: datetime.date | None) -> list[str]:
+    """The nearest upcoming expirations, or all of them within [start, end] when a range is given."""
+    if start is not None or end is not None:
+        start = start or datetime.date.today()
+        end = end or start + datetime.timedelta(days=30)
+        return [expiration for expiration in expirations if start.isoformat() <= expiration <= end.isoformat()]
+    today = datetime.date.today().isoformat()
+    return [expiration for expiration in expirations if expiration >= today][:nearest]
+
+def filter_contracts(contracts, spot: float, min_moneyness: float, max_moneyness: float, min_volume: int, min_open_interest: int, max_strikes: int) -> list[dict]:
+    """Contracts within the moneyness, volume and open interest limits, at most max_strikes nearest the money, by strike."""
+    if contracts is None or contracts.empty:
+        return []
+    moneyness = contracts["strike"] / spot
+    keep = (
+        moneyness.between(min_moneyness, max_moneyness)
+        & (contracts["volume"].fillna(0) >= min_volume)
+        & (contracts["openInterest"].fillna(0) >= min_open_interest)
+    )
+    selected = contracts.loc[keep, CHAIN_COLUMNS].assign(moneyness=moneyness[keep].round(4))
+    selected = selected.iloc[(selected["moneyness"] - 1.0).abs().to_numpy().argsort(kind="stable")[:max_strikes]]
+    return json.loads(selected.sort_values("strike").to_json(orient="records"))
+
+async def get_options_chains(app, args: dict) -> list[types.ContentBlock]:
+    """Fetches filtered calls and puts of many tickers and expirations.
+
+    Each (ticker, expiration) chain is fetched once, under a concurrency cap,
+    and both sides come from that fetch and the cache, so asking for puts
+    after calls costs no upstream request.
+    Args:
+        args (dict): Dictionary containing the following keys:
+            - tickers (list, optional): Stock ticker symbols to scan.
+            - universe_file (str, optional): Name of a stored symbol list, e.g. "dow30".
+            - nearest_expirations (int, optional): Nearest expirations per ticker. Defaults to 1.
+            - start_date (str, optional): First expiration date of a date range.
+            - end_date (str, optional): Last expiration date of a date range.
+            - option_types (list, optional): "call" and/or "put". Defaults to both.
+            - min_moneyness (float, optional): Lowest strike / underlying price. Defaults to 0.9.
+            - max_moneyness (float, optional): Highest strike / underlying price. Defaults to 1.1.
+            - min_volume (int, optional): Lowest contract volume. Defaults to 0.
+            - min_open_interest (int, optional): Lowest open interest. Defaults to 0.
+            - max_strikes (int, optional): Contracts per side and expiration. Defaults to 10.
+    Returns:
+        list[types.ContentBlock]: List of content blocks with the chains by ticker and expiration.
+    """
+    ctx = app.request_context
+    option_types = args.get("option_types") or ["call", "put"]
+    nearest = int(args.get("nearest_expirations", 1))
+    filters = (
+        float(args.get("min_moneyness", 0.9)), float(args.get("max_moneyness", 1.1)),
+        int(args.get("min_volume", 0)), int(args.get("min_open_interest", 0)), int(args.get("max_strikes", 10)),
+    )
+    try:
+        tickers = [ticker.upper() for ticker in args.get("tickers") or []]
+        if args.get("universe_file"):
+            tickers += load_universe(args["universe_file"])
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return [types.TextContent(type="text", text="Please provide tickers or a universe_file.")]
+        start = datetime.date.fromisoformat(args["start_date"]) if args.get("start_date") else None
+        end = datetime.date.fromisoformat(args["end_date"]) if args.get("end_date") else None
+        priority = BULK if len(tickers) > 1 else INTERACTIVE
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHAINS)
+        results, errors = {}, {}
+
+        async def chain(symbol: str, expiration: str):
+            async with semaphore:
+                options_chain = await upstream_cache.get("chain", symbol, expiration, priority=priority)
+                spot = (options_chain.underlying or {}).get("regularMarketPrice")
+                if spot is None:
+                    spot = (await upstream_cache.get("quote", symbol, priority=priority)).price
+            sides = {"call": "calls", "put": "puts"}
+            return float(spot), {
+                sides[option_type]: filter_contracts(getattr(options_chain, sides[option_type]), spot, *filters)
+                for option_type in option_types
+            }
+
+        async def scan(symbol: str):
+            try:
+                async with semaphore:
+                    expirations = await upstream_cache.get("options", symbol, priority=priority)
+                selected = select_expirations(expirations, nearest, start, end)
+                if not selected:
+                    raise ValueError("No expirations in the requested range")
+                chains = await asyncio.gather(*[chain(symbol, expiration) for expiration in selected])
+                results[symbol] = {
+                    "spot": chains[0][0],
+                    "expirations": {expiration: sides for expiration, (_, sides) in zip(selected, chains)},
+                }
+            except Exception as e:
+                errors[symbol] = str(e)
+
+        await asyncio.gather(*[scan(symbol) for symbol in tickers])
+        results = {symbol: results[symbol] for symbol in tickers if symbol in results}
+        contracts = sum(len(rows) for result in results.values() for sides in result["expirations"].values() for rows in sides.values())
+        response_msg = (
+            f"Option chains for {len(results)} tickers ({contracts} contracts after filters):\n{json.dumps(results)}"
+        )
+        if errors:
+            response_msg += f"\nFailed for {len(errors)} tickers: " + "; ".join(f"{symbol}: {error}" for symbol, error in sorted(errors.items()))
+    except Exception as e:
+        error_msg = f"Error fetching option chains: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="get_options_chains",
+            related_request_id=ctx.request_id,
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
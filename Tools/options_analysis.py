@@ -1,52 +1,215 @@
-import yfinance as yf
+import asyncio
+import math
 import mcp.types as types
-import pandas as pd
+from mcp.server.lowlevel import Server
+from .lazy import lazy_import
+from .compute_pool import run_sharded, chunked, check_cancelled, COMPUTE_WORKERS
+from .cache import upstream_cache
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
-tools = [
+GREEK_COLUMNS = ["theoretical_price", "delta", "gamma", "theta", "vega", "rho"]
 
+tools = [
+    types.Tool(
+            name="calculate-greeks",
+            description=(
+                "Calculates Black-Scholes Greeks for an option, or for every strike of an expiration when no strike is given."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["symbol", "expiration"],
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "The stock symbol (e.g., 'AAPL')",
+                    },
+                    "strike": {
+                        "type": "number",
+                        "description": "The option strike price. Omit to calculate the whole chain.",
+                    },
+                    "expiration": {
+                        "type": "string",
+                        "description": "The option expiration date in 'YYYY-MM-DD' format",
+                    },
+                    "option_type": {
+                        "type": "string",
+                        "default": "call",
+                        "description": "Type of option, 'call' or 'put'. Default is 'call'",
+                    },
+                    "risk_free_rate": {
+                        "type": "number",
+                        "default": 0.04,
+                        "description": "Annualized risk free rate as a decimal. Default is 0.04",
+                    },
+                    "dividend_yield": {
+                        "type": "number",
+                        "default": 0.0,
+                        "description": "Annualized dividend yield as a decimal. Default is 0",
+                    },
+                },
+            }
+    ),
+    types.Tool(
+            name="get-implied-volatility",
+            description=(
+                "Fetches the implied volatility of an option for a given symbol, strike and expiration."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["symbol", "strike", "expiration"],
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "The stock symbol (e.g., 'AAPL')",
+                    },
+                    "strike": {
+                        "type": "number",
+                        "description": "The option strike price",
+                    },
+                    "expiration": {
+                        "type": "string",
+                        "description": "The option expiration date in 'YYYY-MM-DD' format",
+                    },
+                    "option_type": {
+                        "type": "string",
+                        "default": "call",
+                        "description": "Type of option, 'call' or 'put'. Default is 'call'",
+                    },
+                },
+            }
+    ),
 ]
 
+async def tool_call_router(name: str, args: dict, app: Server) -> list[types.ContentBlock]:
+    for tool in tools:
+        if tool.name == name:
+            return await globals()[tool.name.replace("-", "_")](app, args)
+    raise ValueError(f"Tool {name} not found")
+
+def _normal_cdf(x):
+    # erfc based, accurate to ~1e-7 (Abramowitz and Stegun 7.1.26)
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erfc = poly * np.exp(-z * z)
+    return np.where(x >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+def _normal_pdf(x):
+    return np.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+def greeks_kernel(arrays: dict, row_start: int, row_end: int, spot: float, years: float, rate: float, dividend_yield: float, is_call: bool) -> None:
+    """Black-Scholes price and Greeks for rows [row_start, row_end) of an option chain.
+
+    Runs in a worker process for large chains and writes into arrays["greeks"]
+    with the columns of GREEK_COLUMNS. Theta is per calendar day, vega and rho
+    per one percentage point.
+    Args:
+        arrays (dict): "strike" and "volatility" (K,) inputs and the "greeks" (K, 6) output.
+        row_start (int): First contract computed by this job.
+        row_end (int): Contract after the last one computed by this job.
+        spot (float): Underlying price.
+        years (float): Time to expiration in years.
+        rate (float): Risk free rate.
+        dividend_yield (float): Continuous dividend yield.
+        is_call (bool): Calls if True, puts otherwise.
+    """
+    check_cancelled()
+    strike = arrays["strike"][row_start:row_end]
+    sigma = arrays["volatility"][row_start:row_end]
+    sqrt_t = math.sqrt(years)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(spot / strike) + (rate - dividend_yield + 0.5 * sigma ** 2) * years) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    carry = math.exp(-dividend_yield * years)
+    discount = math.exp(-rate * years)
+    pdf_d1 = _normal_pdf(d1)
+    gamma = carry * pdf_d1 / (spot * sigma * sqrt_t)
+    vega = spot * carry * pdf_d1 * sqrt_t / 100.0
+    decay = -spot * carry * pdf_d1 * sigma / (2.0 * sqrt_t)
+    if is_call:
+        price = spot * carry * _normal_cdf(d1) - strike * discount * _normal_cdf(d2)
+        delta = carry * _normal_cdf(d1)
+        theta = (decay - rate * strike * discount * _normal_cdf(d2) + dividend_yield * spot * carry * _normal_cdf(d1)) / 365.0
+        rho = strike * years * discount * _normal_cdf(d2) / 100.0
+    else:
+        price = strike * discount * _normal_cdf(-d2) - spot * carry * _normal_cdf(-d1)
+        delta = carry * (_normal_cdf(d1) - 1.0)
+        theta = (decay + rate * strike * discount * _normal_cdf(-d2) - dividend_yield * spot * carry * _normal_cdf(-d1)) / 365.0
+        rho = -strike * years * discount * _normal_cdf(-d2) / 100.0
+    arrays["greeks"][row_start:row_end] = np.column_stack([price, delta, gamma, theta, vega, rho])
+
 async def calculate_greeks(app,args:dict) -> list[types.ContentBlock]:
     """Calculates the Greeks for a given option using the Black-Scholes model.
     Args:
         args (dict): A dictionary containing the following keys:
             - symbol (str): The stock symbol.
-            - strike (float): The option strike price.
+            - strike (float, optional): The option strike price. Omit to calculate the whole chain.
             - expiration (str): The option expiration date in 'YYYY-MM-DD' format.
             - option_type (str): 'call' or 'put'.
+            - risk_free_rate (float, optional): Annualized risk free rate. Defaults to 0.04.
+            - dividend_yield (float, optional): Annualized dividend yield. Defaults to 0.
     Returns:
         list[types.ContentBlock]: A list containing a single TextContent block with the Greeks.
     """
-    ctx = app.context
-    symbol = args.get("symbol")
+    ctx = app.request_context
+    symbol = args.get("symbol", "").upper()
     strike = args.get("strike")
     expiration = args.get("expiration")
     option_type = args.get("option_type", "call").lower()
+    rate = float(args.get("risk_free_rate", 0.04))
+    dividend_yield = float(args.get("dividend_yield", 0.0))
     try:
-        ticker = yf.Ticker(symbol)
-        if expiration not in ticker.options:
-            return [types.TextContent(type="text", text=f"Expiration date {expiration} not found for {symbol}. Available dates: {ticker.options}")]
-        options_chain = ticker.option_chain(expiration)
-        if option_type == "call":
-            options = options_chain.calls
-        elif option_type == "put":
-            options = options_chain.puts
-        else:
+        if option_type not in ("call", "put"):
             return [types.TextContent(type="text", text="option_type must be 'call' or 'put'.")]
-        option = options[options['strike'] == strike]
-        if option.empty:
+        expirations = await upstream_cache.get("options", symbol)
+        if expiration not in expirations:
+            return [types.TextContent(type="text", text=f"Expiration date {expiration} not found for {symbol}. Available dates: {expirations}")]
+        options_chain, history = await asyncio.gather(
+            upstream_cache.get("chain", symbol, expiration),
+            upstream_cache.get("history", symbol, "5d", "1d"),
+        )
+        options = options_chain.calls if option_type == "call" else options_chain.puts
+        if strike is not None:
+            options = options[options['strike'] == strike]
+        options = options[options['impliedVolatility'] > 0]
+        if options.empty:
             return [types.TextContent(type="text", text=f"No {option_type} option found for {symbol} with strike {strike} and expiration {expiration}.")]
-        
-        ticker.option_chain(ticker.options[0]).calls
+
+        spot = float(history["Close"].iloc[-1])
+        # Options stop trading at the 16:00 New York close on expiration day
+        expires_at = pd.Timestamp(expiration, tz="America/New_York") + pd.Timedelta(hours=16)
+        years = max((expires_at - pd.Timestamp.now(tz="America/New_York")).total_seconds(), 60.0) / (365.0 * 24 * 3600)
+        shards = [
+            (part[0], part[-1] + 1, spot, years, rate, dividend_yield, option_type == "call")
+            for part in chunked(list(range(len(options))), COMPUTE_WORKERS)
+        ]
+        _, outputs = await run_sharded(
+            greeks_kernel, shards,
+            inputs={"strike": options["strike"].to_numpy(dtype=float), "volatility": options["impliedVolatility"].to_numpy(dtype=float)},
+            outputs={"greeks": ((len(options), len(GREEK_COLUMNS)), "float64")},
+        )
+        greeks = pd.DataFrame(outputs["greeks"], columns=GREEK_COLUMNS).round(4)
+        greeks.insert(0, "impliedVolatility", options["impliedVolatility"].round(4).to_numpy())
+        greeks.insert(0, "strike", options["strike"].to_numpy())
+        response_msg = (
+            f"Black-Scholes Greeks for {symbol} {option_type}s expiring {expiration} "
+            f"(spot ${spot:.2f}, rate {rate:.2%}, dividend yield {dividend_yield:.2%}):\n"
+            f"{greeks.to_json(orient='records')}"
+        )
     except Exception as e:
         error_msg = (
             f"Error calculating Greeks for {symbol} with strike {strike} and expiration {expiration}: {e}"
         )
-        ctx.logger.error(
-            f"Error in calculate_greeks for symbol={symbol}, strike={strike}, expiration={expiration}: {e}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="calculate_greeks",
+            related_request_id=ctx.request_id,
         )
         return [types.TextContent(type="text", text=error_msg)]
-    return [types.TextContent(type="text", text="Greeks calculation not implemented yet.")]
+    return [types.TextContent(type="text", text=response_msg)]
 
 async def get_implied_volatility(app, args:dict) -> list[types.ContentBlock]:
     """Calculates the implied volatility for a given option.
@@ -59,16 +222,16 @@ async def get_implied_volatility(app, args:dict) -> list[types.ContentBlock]:
     Returns:
         list[types.ContentBlock]: A list containing a single TextContent block with the implied volatility.
     """
-    ctx = app.context
-    symbol = args.get("symbol")
+    ctx = app.request_context
+    symbol = args.get("symbol", "").upper()
     strike = args.get("strike")
     expiration = args.get("expiration")
     option_type = args.get("option_type", "call").lower()
     try:
-        ticker = yf.Ticker(symbol)
-        if expiration not in ticker.options:
-            return [types.TextContent(type="text", text=f"Expiration date {expiration} not found for {symbol}. Available dates: {ticker.options}")]
-        options_chain = ticker.option_chain(expiration)
+        expirations = await upstream_cache.get("options", symbol)
+        if expiration not in expirations:
+            return [types.TextContent(type="text", text=f"Expiration date {expiration} not found for {symbol}. Available dates: {expirations}")]
+        options_chain = await upstream_cache.get("chain", symbol, expiration)
         if option_type == "call":
             options = options_chain.calls
         elif option_type == "put":
@@ -78,14 +241,18 @@ async def get_implied_volatility(app, args:dict) -> list[types.ContentBlock]:
         option = options[options['strike'] == strike]
         if option.empty:
             return [types.TextContent(type="text", text=f"No {option_type} option found for {symbol} with strike {strike} and expiration {expiration}.")]
-        
+
         implied_vol = option['impliedVolatility'].values[0]
         response_msg = f"The implied volatility for the {option_type} option of {symbol} with strike {strike} expiring on {expiration} is {implied_vol:.2%}."
     except Exception as e:
         error_msg = (
             f"Error calculating implied volatility for {symbol} with strike {strike} and expiration {expiration}: {e}"
         )
-        ctx.logger.error(
-            f"Error in get_implied_volatility for symbol={symbol}, strike={strike}, expiration={expiration}: {e}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="get_implied_volatility",
+            related_request_id=ctx.request_id,
         )
-        return [types.TextContent(type="text", text=error_msg)]
\ No newline at end of file
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
@@ -0,0 +1,110 @@
+import math
+import numpy as np
+
+DEFAULT_CONFIDENCES = [0.95, 0.99]
+# Normal draws held in memory at once per simulation chunk (8 MB of float64)
+MAX_CHUNK_ELEMENTS = 1_000_000
+
+
+def horizon_returns(returns: np.ndarray, weights: np.ndarray, horizon: int = 1) -> np.ndarray:
+    """Historical portfolio returns over overlapping horizons.
+    Args:
+        returns (np.ndarray): (T, N) daily simple returns without gaps.
+        weights (np.ndarray): (N,) fraction of the portfolio value in each asset.
+        horizon (int): Holding period in days.
+    Returns:
+        np.ndarray: (T - horizon + 1,) portfolio returns, one per historical scenario.
+    """
+    if horizon == 1:
+        return returns @ weights
+    # Each asset compounds over the horizon before the position values are summed
+    log_growth = np.cumsum(np.log1p(returns), axis=0)
+    log_growth = np.vstack([np.zeros(returns.shape[1]), log_growth])
+    growth = np.expm1(log_growth[horizon:] - log_growth[:-horizon])
+    return growth @ weights
+
+
+def covariance_factor(covariance: np.ndarray) -> np.ndarray:
+    """Matrix L with L @ L.T == covariance, used to correlate normal draws.
+
+    Uses the Cholesky factor. A covariance estimated from fewer days than
+    assets, or from collinear assets, is only positive semi-definite; then the
+    factor comes from the eigendecomposition with negative eigenvalues clipped.
+    """
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def chunk_paths(assets: int) -> int:
+    """Paths simulated per chunk so a chunk holds at most MAX_CHUNK_ELEMENTS draws."""
+    return max(1, MAX_CHUNK_ELEMENTS // max(1, assets))
+
+
+def simulate_chunk(mean: np.ndarray, factor: np.ndarray, weights: np.ndarray, horizon: int, paths: int, seed: int, chunk: int) -> np.ndarray:
+    """Monte Carlo portfolio returns for one chunk of paths.
+
+    Daily log returns are multivariate normal with the given mean and
+    covariance factor, so horizon log returns have mean * horizon and the
+    covariance scaled by horizon. Each asset is compounded before weighting.
+    The chunk draws from its own stream seeded by (seed, chunk), so results
+    do not depend on how chunks are spread over workers.
+    Args:
+        mean (np.ndarray): (N,) mean daily log returns.
+        factor (np.ndarray): (N, N) covariance factor of daily log returns.
+        weights (np.ndarray): (N,) fraction of the portfolio value in each asset.
+        horizon (int): Holding period in days.
+        paths (int): Number of paths in this chunk.
+        seed (int): Seed of the whole simulation.
+        chunk (int): Index of this chunk.
+    Returns:
+        np.ndarray: (paths,) simulated portfolio returns.
+    """
+    rng = np.random.default_rng([seed, chunk])
+    draws = rng.standard_normal((paths, len(mean)))
+    log_returns = draws @ (factor.T * np.sqrt(horizon))
+    log_returns += mean * horizon
+    return np.expm1(log_returns, out=log_returns) @ weights
+
+
+def tail_size(scenarios: int, confidences: list[float]) -> int:
+    """Number of largest losses out of `scenarios` that determine VaR and CVaR at every confidence level."""
+    return min(scenarios, int(math.ceil((1.0 - min(confidences)) * (scenarios - 1))) + 2)
+
+
+def keep_worst(worst: np.ndarray, losses: np.ndarray, size: int) -> np.ndarray:
+    """The `size` largest values of worst and losses together, unordered."""
+    merged = np.concatenate([worst, losses])
+    if len(merged) <= size:
+        return merged
+    return np.partition(merged, len(merged) - size)[len(merged) - size:]
+
+
+def tail_risk(returns: np.ndarray, confidences: list[float], scenarios: int | None = None) -> list[tuple[float, float]]:
+    """Value-at-Risk and Expected Shortfall as positive fractions of portfolio value.
+
+    VaR is the loss quantile with linear interpolation, as np.quantile, and
+    CVaR the mean of the losses from it.
+    Args:
+        returns (np.ndarray): Simulated or historical portfolio returns, or only the
+            worst of them when scenarios is given.
+        confidences (list[float]): Confidence levels, e.g. [0.95, 0.99].
+        scenarios (int, optional): Number of scenarios `returns` are the worst of.
+            At least tail_size(scenarios, confidences) of them are needed.
+    Returns:
+        list[tuple[float, float]]: (VaR, CVaR) per confidence level.
+    """
+    losses = np.sort(-returns[~np.isnan(returns)])
+    total = len(losses) if scenarios is None else scenarios
+    # Position in the ascending losses of all scenarios minus position in `losses`
+    offset = total - len(losses)
+    results = []
+    for confidence in confidences:
+        position = confidence * (total - 1)
+        lower = int(math.floor(position))
+        upper = min(lower + 1, total - 1)
+        var = float(losses[lower - offset] + (position - lower) * (losses[upper - offset] - losses[lower - offset]))
+        results.append((var, float(losses[losses >= var].mean())))
+    return results
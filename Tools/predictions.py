@@ -0,0 +1,476 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from .lazy import lazy_import
+from .history import fetch_history
+from .compute_pool import run_job
+np = lazy_import("numpy")
+indicator_engine = lazy_import(f"{__package__}.indicators")
+
+VOLATILITY_MODELS = ["garch", "ewma"]
+PRICE_MODELS = ["ar"]
+MAX_MODELS = 1024
+TRADING_DAYS = 252
+
+tools = [
+    types.Tool(
+            name="forecast-volatility",
+            description=(
+                "Forecasts the daily volatility of a stock over the coming trading days with a GARCH(1,1) or EWMA model "
+                "fitted to its returns, and reports fit and predict times."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["symbol"],
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "The stock symbol to forecast (e.g., 'AAPL')",
+                    },
+                    "model": {
+                        "type": "string",
+                        "enum": VOLATILITY_MODELS,
+                        "description": "'garch' for GARCH(1,1) or 'ewma' for an exponentially weighted model. Defaults to 'garch'.",
+                    },
+                    "horizon_days": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": TRADING_DAYS,
+                        "description": "Number of trading days to forecast. Defaults to 10.",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "History the model is fitted on (e.g., '1y', '2y'). Defaults to '2y'.",
+                    },
+                },
+            }
+    ),
+    types.Tool(
+            name="forecast-price",
+            description=(
+                "Forecasts the closing price of a stock over the coming trading days with an autoregressive model "
+                "of its daily log returns, with a 95% interval, and reports fit and predict times."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["symbol"],
+                "properties": {
+                    "symbol": {
+                        "type": "string",
+                        "description": "The stock symbol to forecast (e.g., 'AAPL')",
+                    },
+                    "model": {
+                        "type": "string",
+                        "enum": PRICE_MODELS,
+                        "description": "'ar' for an autoregressive model of log returns. Defaults to 'ar'.",
+                    },
+                    "lags": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 20,
+                        "description": "Number of autoregressive lags. Defaults to 5.",
+                    },
+                    "horizon_days": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": TRADING_DAYS,
+                        "description": "Number of trading days to forecast. Defaults to 5.",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "History the model is fitted on (e.g., '1y', '2y'). Defaults to '2y'.",
+                    },
+                },
+            }
+    ),
+]
+
+async def tool_call_router(name: str, args: dict, app: Server) -> list[types.ContentBlock]:
+    for tool in tools:
+        if tool.name == name:
+            return await globals()[tool.name.replace("-", "_")](app, args)
+    raise ValueError(f"Tool {name} not found")
+
+def nelder_mead(objective, start, step, max_iterations: int = 400, tolerance: float = 1e-9):
+    """Minimizes objective with the Nelder-Mead simplex method.
+    Args:
+        objective: Callable taking a (k, dim) batch of points and returning (k,) values.
+        start (np.ndarray): (dim,) starting point.
+        step (float): Size of the initial simplex; small when warm started near the optimum.
+        max_iterations (int): Iteration limit.
+        tolerance (float): Relative spread of the simplex values at which to stop.
+    Returns:
+        tuple[np.ndarray, float, int]: Best point, its value and the number of iterations used.
+    """
+    start = np.asarray(start, dtype=float)
+    simplex = np.vstack([start, start + step * np.eye(len(start))])
+    values = objective(simplex)
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        order = np.argsort(values)
+        simplex, values = simplex[order], values[order]
+        if abs(values[-1] - values[0]) <= tolerance * (abs(values[0]) + tolerance):
+            break
+        centroid = simplex[:-1].mean(axis=0)
+        worst = simplex[-1]
+        reflected = 2.0 * centroid - worst
+        reflected_value = objective(reflected[np.newaxis])[0]
+        if reflected_value < values[0]:
+            expanded = 3.0 * centroid - 2.0 * worst
+            expanded_value = objective(expanded[np.newaxis])[0]
+            if expanded_value < reflected_value:
+                simplex[-1], values[-1] = expanded, expanded_value
+            else:
+                simplex[-1], values[-1] = reflected, reflected_value
+        elif reflected_value < values[-2]:
+            simplex[-1], values[-1] = reflected, reflected_value
+        else:
+            outside = reflected_value < values[-1]
+            contracted = centroid + 0.5 * ((reflected if outside else worst) - centroid)
+            contracted_value = objective(contracted[np.newaxis])[0]
+            if contracted_value < min(reflected_value, values[-1]):
+                simplex[-1], values[-1] = contracted, contracted_value
+            else:
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = objective(simplex[1:])
+    best = int(np.argmin(values))
+    return simplex[best], float(values[best]), iteration
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def conditional_variances(omega, alpha, beta, returns):
+    """GARCH(1,1) conditional variances of many parameter sets in one vectorized pass.
+
+    sigma2_t = omega + alpha * r_{t-1}^2 + beta * sigma2_{t-1}, started at the
+    sample variance. The recursion is an EMA with decay beta, so it runs on
+    indicators.ema_rows instead of a Python loop.
+    Args:
+        omega, alpha, beta (np.ndarray): (k,) parameters.
+        returns (np.ndarray): (T,) demeaned returns.
+    Returns:
+        np.ndarray: (k, T) conditional variances.
+    """
+    omega, alpha, beta = (v.reshape(-1, 1) for v in np.broadcast_arrays(*(np.asarray(v, dtype=float).ravel() for v in (omega, alpha, beta))))
+    squared = returns[np.newaxis, :-1] ** 2
+    beta = np.minimum(beta, 1.0 - 1e-9)
+    shocks = (omega + alpha * squared) / (1.0 - beta)
+    initial = np.full((len(omega), 1), returns.var())
+    return indicator_engine.ema_rows(np.hstack([initial, shocks]), (1.0 - beta).ravel())
+
+def _negative_log_likelihood(omega, alpha, beta, returns):
+    variances = conditional_variances(omega, alpha, beta, returns)[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        values = 0.5 * np.sum(np.log(variances) + returns[1:] ** 2 / variances, axis=1)
+    return np.where(np.isfinite(values), values, np.inf)
+
+def _garch_parameters(points):
+    # Unconstrained (log omega, logit persistence, logit share) -> omega > 0, alpha, beta >= 0, alpha + beta < 1
+    persistence = 0.9999 * _sigmoid(points[:, 1])
+    share = _sigmoid(points[:, 2])
+    return np.exp(points[:, 0]), persistence * share, persistence * (1.0 - share)
+
+def scale_returns(returns):
+    """Demeaned percent returns, which keep the likelihood well scaled for the optimizer.
+
+    GARCH and EWMA parameters are in these units. Models are cached with the
+    raw returns, whose overlap with the next window does not change.
+    """
+    return 100.0 * (returns - returns.mean())
+
+def fit_garch(returns, previous: dict | None = None) -> dict:
+    """Maximum likelihood GARCH(1,1) fit of raw returns, warm started from previous parameters when given."""
+    returns = scale_returns(returns)
+    objective = lambda points: _negative_log_likelihood(*_garch_parameters(points), returns)
+    if previous is None:
+        # Coarse grid evaluated in one batch, with variance targeting for omega
+        persistence, share = np.meshgrid([0.9, 0.95, 0.98, 0.995], [0.03, 0.06, 0.1, 0.2])
+        grid = np.column_stack([
+            np.log(returns.var() * (1.0 - persistence.ravel())),
+            np.log(persistence.ravel() / 0.9999 / (1.0 - persistence.ravel() / 0.9999)),
+            np.log(share.ravel() / (1.0 - share.ravel())),
+        ])
+        start = grid[int(np.argmin(objective(grid)))]
+        point, value, iterations = nelder_mead(objective, start, 0.5)
+    else:
+        point, value, iterations = nelder_mead(objective, previous["point"], 0.05, max_iterations=60)
+    omega, alpha, beta = (float(v[0]) for v in _garch_parameters(point[np.newaxis]))
+    return {"point": point, "omega": omega, "alpha": alpha, "beta": beta, "log_likelihood": -value, "iterations": iterations}
+
+def fit_ewma(returns, previous: dict | None = None) -> dict:
+    """Maximum likelihood decay factor of an EWMA (RiskMetrics style) variance model of raw returns."""
+    returns = scale_returns(returns)
+    objective = lambda points: _negative_log_likelihood(0.0, 1.0 - _sigmoid(points[:, 0]), _sigmoid(points[:, 0]), returns)
+    if previous is None:
+        grid = np.log(np.linspace(0.8, 0.995, 40) / (1.0 - np.linspace(0.8, 0.995, 40)))[:, np.newaxis]
+        point, value, iterations = nelder_mead(objective, grid[int(np.argmin(objective(grid)))], 0.2)
+    else:
+        point, value, iterations = nelder_mead(objective, previous["point"], 0.02, max_iterations=30)
+    decay = float(_sigmoid(point[0]))
+    return {"point": point, "omega": 0.0, "alpha": 1.0 - decay, "beta": decay, "log_likelihood": -value, "iterations": iterations}
+
+def _ar_statistics(returns, lags: int, start: int, stop: int):
+    """Sums of the normal equations for AR targets returns[start:stop] with an intercept."""
+    targets = np.arange(max(start, lags), stop)
+    design = np.column_stack([np.ones(len(targets))] + [returns[targets - lag] for lag in range(1, lags + 1)])
+    values = returns[targets]
+    return {"xtx": design.T @ design, "xty": design.T @ values, "yy": float(values @ values), "n": len(targets)}
+
+def fit_ar(returns, lags: int, previous: dict | None = None, dropped: int = 0, added: int = 0) -> dict:
+    """Least squares AR(lags) fit from sufficient statistics.
+
+    A warm update adds the normal equation rows of the new bars and removes
+    the rows of the bars that left the front of the window, instead of
+    rebuilding them from the whole history.
+    """
+    if previous is None:
+        stats = _ar_statistics(returns, lags, lags, len(returns))
+    else:
+        stats = {key: value for key, value in previous["stats"].items()}
+        old = previous["returns"]
+        if dropped:
+            removed = _ar_statistics(old, lags, lags, lags + dropped)
+            for key in stats:
+                stats[key] = stats[key] - removed[key]
+        if added:
+            new_rows = _ar_statistics(returns, lags, len(returns) - added, len(returns))
+            for key in stats:
+                stats[key] = stats[key] + new_rows[key]
+    coefficients = np.linalg.solve(stats["xtx"] + 1e-12 * np.eye(lags + 1), stats["xty"])
+    residual = stats["yy"] - 2.0 * coefficients @ stats["xty"] + coefficients @ stats["xtx"] @ coefficients
+    return {"stats": stats, "coefficients": coefficients, "variance": max(residual, 0.0) / max(stats["n"] - lags - 1, 1), "lags": lags}
+
+def fit_model(arrays: dict, model: str, returns, config: dict, previous: dict | None, dropped: int, added: int) -> dict:
+    """Fits one model. Runs in a worker process through run_job."""
+    if model == "garch":
+        return fit_garch(returns, previous)
+    if model == "ewma":
+        return fit_ewma(returns, previous)
+    if model == "ar":
+        return fit_ar(returns, config["lags"], previous, dropped, added)
+    raise ValueError(f"Unknown model {model}")
+
+def forecast_variances(params: dict, returns, horizon: int):
+    """Daily variances of the next `horizon` days under a fitted GARCH or EWMA model."""
+    omega, alpha, beta = params["omega"], params["alpha"], params["beta"]
+    last = conditional_variances(omega, alpha, beta, returns)[0, -1]
+    following = omega + alpha * returns[-1] ** 2 + beta * last
+    persistence = alpha + beta
+    if omega == 0.0 or persistence >= 1.0:
+        return np.full(horizon, following)
+    long_run = omega / (1.0 - persistence)
+    return long_run + persistence ** np.arange(horizon) * (following - long_run)
+
+def forecast_returns(params: dict, returns, horizon: int):
+    """Mean log returns of the next `horizon` days and the variance of their running sum under an AR fit."""
+    coefficients, lags = params["coefficients"], params["lags"]
+    history = list(returns[-lags:])
+    means = []
+    for _ in range(horizon):
+        means.append(coefficients[0] + sum(coefficients[lag] * history[-lag] for lag in range(1, lags + 1)))
+        history.append(means[-1])
+    # The running sum h days out carries shock m with weight psi_0 + ... + psi_(h-m)
+    psi = [1.0]
+    for step in range(1, horizon):
+        psi.append(sum(coefficients[lag] * psi[step - lag] for lag in range(1, min(step, lags) + 1)))
+    return np.array(means), params["variance"] * np.cumsum(np.cumsum(psi) ** 2)
+
+class FittedModel:
+    """A fitted model and the returns it was fitted on."""
+    __slots__ = ("params", "dates", "returns")
+
+    def __init__(self, params: dict, dates, returns):
+        self.params = params
+        self.dates = dates
+        self.returns = returns
+
+
+class ModelCache:
+    """Fitted models per (symbol, model, config), least recently used first out.
+
+    A model is reused as is while the last bar date is unchanged. When new bars
+    arrive, the model is updated from its previous fit (warm started) instead of
+    being refitted from scratch, unless the overlapping history was revised.
+    """
+
+    def __init__(self, max_models: int = MAX_MODELS):
+        self.max_models = max_models
+        self.models: OrderedDict[tuple, FittedModel] = OrderedDict()
+        self.locks: dict[tuple, asyncio.Lock] = {}
+
+    def invalidate(self, symbol: str | None = None) -> None:
+        for key in list(self.models):
+            if symbol is None or key[0] == symbol:
+                del self.models[key]
+
+    async def fitted(self, symbol: str, model: str, config: dict, dates, returns) -> tuple[FittedModel, str]:
+        """The fitted model for returns ending at dates[-1].
+        Args:
+            symbol (str): The stock symbol.
+            model (str): Model name, e.g. "garch".
+            config (dict): Model settings that change the fit, e.g. lags and period.
+            dates (pd.Index): Bar dates of the returns.
+            returns (np.ndarray): Returns the model is fitted on.
+        Returns:
+            tuple[FittedModel, str]: The model and how it was obtained: "cached", "warm start" or "full fit".
+        """
+        key = (symbol, model, tuple(sorted(config.items())))
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            entry = self.models.get(key)
+            if entry is not None and entry.dates[-1] == dates[-1] and len(entry.dates) == len(dates):
+                self.models.move_to_end(key)
+                return entry, "cached"
+            previous, dropped, added, mode = None, 0, 0, "full fit"
+            if entry is not None and dates[0] in entry.dates and entry.dates[-1] in dates:
+                dropped = int(entry.dates.get_loc(dates[0]))
+                added = len(dates) - int(dates.get_loc(entry.dates[-1])) - 1
+                overlap = entry.returns[dropped:]
+                if added > 0 and np.allclose(overlap, returns[:len(overlap)], rtol=1e-9, atol=1e-12):
+                    previous, mode = {**entry.params, "returns": entry.returns}, "warm start"
+            params = await run_job(fit_model, model, returns, config, previous, dropped, added)
+            entry = FittedModel(params, dates, returns)
+            self.models[key] = entry
+            self.models.move_to_end(key)
+            while len(self.models) > self.max_models:
+                evicted, _ = self.models.popitem(last=False)
+                self.locks.pop(evicted, None)
+            return entry, mode
+
+
+model_cache = ModelCache()
+
+async def fetch_returns(symbol: str, period: str):
+    """Daily log returns of a symbol, their dates and the last close."""
+    history = await fetch_history(symbol, period=period)
+    closes = history["Close"].dropna()
+    returns = np.diff(np.log(closes.to_numpy(dtype=float)))
+    return closes.index[1:], returns, float(closes.iloc[-1])
+
+def timing_line(started: float, fetched: float, fitted: float, predicted: float, mode: str) -> str:
+    return (
+        f"Timing: fetch={(fetched - started) * 1000:.0f}ms fit={(fitted - fetched) * 1000:.1f}ms ({mode}) "
+        f"predict={(predicted - fitted) * 1000:.1f}ms total={(predicted - started) * 1000:.0f}ms\n"
+    )
+
+async def forecast_volatility(app, args: dict) -> list[types.ContentBlock]:
+    """Forecasts the volatility of a stock with a GARCH(1,1) or EWMA model.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - symbol (str): The stock symbol (e.g., "AAPL").
+            - model (str, optional): "garch" or "ewma". Defaults to "garch".
+            - horizon_days (int, optional): Number of trading days to forecast. Defaults to 10.
+            - period (str, optional): History the model is fitted on. Defaults to "2y".
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with the forecast, parameters and timings.
+    """
+    ctx = app.request_context
+    symbol = args.get("symbol", "").upper()
+    model = args.get("model", "garch").lower()
+    horizon = int(args.get("horizon_days", 10))
+    period = args.get("period", "2y")
+    if not symbol:
+        return [types.TextContent(type="text", text="Please provide a valid stock symbol.")]
+
+    try:
+        if model not in VOLATILITY_MODELS:
+            raise ValueError(f"Unsupported model {model}. Models: {', '.join(VOLATILITY_MODELS)}")
+        started = time.perf_counter()
+        dates, returns, _ = await fetch_returns(symbol, period)
+        if len(returns) < 30:
+            raise ValueError(f"Only {len(returns)} returns over {period}, at least 30 are needed")
+        fetched = time.perf_counter()
+        entry, mode = await model_cache.fitted(symbol, model, {"period": period}, dates, returns)
+        fitted = time.perf_counter()
+        returns = scale_returns(returns)
+        variances = forecast_variances(entry.params, returns, horizon)
+        predicted = time.perf_counter()
+
+        params = entry.params
+        annualized = np.sqrt(variances * TRADING_DAYS)
+        current = math.sqrt(conditional_variances(params["omega"], params["alpha"], params["beta"], returns)[0, -1] * TRADING_DAYS)
+        if model == "garch":
+            description = f"GARCH(1,1) omega={params['omega']:.4f}, alpha={params['alpha']:.4f}, beta={params['beta']:.4f}"
+        else:
+            description = f"EWMA decay={params['beta']:.4f}"
+        response_msg = (
+            f"Volatility forecast for {symbol} ({description}, fitted on {len(returns)} daily returns over {period}):\n"
+            f"Current annualized volatility: {current:.2f}%\n"
+            f"Next day annualized volatility: {annualized[0]:.2f}%\n"
+            f"{horizon}-day annualized volatility: {math.sqrt(variances.mean() * TRADING_DAYS):.2f}%\n"
+            f"{horizon}-day volatility: {math.sqrt(variances.sum()):.2f}%\n"
+            f"Daily annualized forecast (%): {[round(float(v), 2) for v in annualized]}\n"
+        )
+        response_msg += timing_line(started, fetched, fitted, predicted, mode)
+    except Exception as e:
+        error_msg = f"Error forecasting volatility for {symbol}: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="forecast_volatility",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
+
+async def forecast_price(app, args: dict) -> list[types.ContentBlock]:
+    """Forecasts the closing price of a stock with an autoregressive model of log returns.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - symbol (str): The stock symbol (e.g., "AAPL").
+            - model (str, optional): "ar". Defaults to "ar".
+            - lags (int, optional): Number of autoregressive lags. Defaults to 5.
+            - horizon_days (int, optional): Number of trading days to forecast. Defaults to 5.
+            - period (str, optional): History the model is fitted on. Defaults to "2y".
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with the forecast, parameters and timings.
+    """
+    ctx = app.request_context
+    symbol = args.get("symbol", "").upper()
+    model = args.get("model", "ar").lower()
+    lags = int(args.get("lags", 5))
+    horizon = int(args.get("horizon_days", 5))
+    period = args.get("period", "2y")
+    if not symbol:
+        return [types.TextContent(type="text", text="Please provide a valid stock symbol.")]
+
+    try:
+        if model not in PRICE_MODELS:
+            raise ValueError(f"Unsupported model {model}. Models: {', '.join(PRICE_MODELS)}")
+        started = time.perf_counter()
+        dates, returns, last_close = await fetch_returns(symbol, period)
+        if len(returns) < 10 * (lags + 1):
+            raise ValueError(f"Only {len(returns)} returns over {period}, too few for {lags} lags")
+        fetched = time.perf_counter()
+        entry, mode = await model_cache.fitted(symbol, model, {"period": period, "lags": lags}, dates, returns)
+        fitted = time.perf_counter()
+        means, variances = forecast_returns(entry.params, returns, horizon)
+        cumulative = np.cumsum(means)
+        prices = last_close * np.exp(cumulative)
+        lower = last_close * np.exp(cumulative - 1.96 * np.sqrt(variances))
+        upper = last_close * np.exp(cumulative + 1.96 * np.sqrt(variances))
+        predicted = time.perf_counter()
+
+        forecast = [
+            {"day": day + 1, "price": round(float(price), 2), "lower_95": round(float(low), 2), "upper_95": round(float(high), 2)}
+            for day, (price, low, high) in enumerate(zip(prices, lower, upper))
+        ]
+        response_msg = (
+            f"Price forecast for {symbol} (AR({lags}) of daily log returns, fitted on {len(returns)} returns over {period}):\n"
+            f"Last close: ${last_close:.2f}\n"
+            f"{horizon}-day forecast: ${prices[-1]:.2f} (95% interval ${lower[-1]:.2f} - ${upper[-1]:.2f})\n"
+            f"Daily forecast: {forecast}\n"
+        )
+        response_msg += timing_line(started, fetched, fitted, predicted, mode)
+    except Exception as e:
+        error_msg = f"Error forecasting price for {symbol}: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="forecast_price",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
@@ -0,0 +1,331 @@
+import asyncio
+import contextlib
+import contextvars
+import cProfile
+import dataclasses
+import datetime
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from mcp.server.lowlevel.server import request_ctx
+from .sessions import current_session
+
+# Directory of the captures, and how many are kept there (oldest are deleted first)
+PROFILE_DIR = os.getenv("MCP_PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("MCP_PROFILE_MAX_FILES", "200"))
+# Fraction of tool calls profiled without being asked, 0 profiles only requested calls
+PROFILE_SAMPLE_RATE = float(os.getenv("MCP_PROFILE_SAMPLE_RATE", "0"))
+# Milliseconds from which list-profiles reports a capture as slow
+PROFILE_SLOW_MS = float(os.getenv("MCP_PROFILE_SLOW_MS", "1000"))
+# Tool argument and HTTP header that request a capture of one call
+PROFILE_ARGUMENT = "_profile"
+PROFILE_HEADER = "x-mcp-profile"
+TOP_FUNCTIONS = 15
+# Seconds a finished capture waits for the transport to store the response event
+RESPONSE_WAIT = 2.0
+
+tools = [
+    types.Tool(
+            name="list-profiles",
+            description=(
+                "Lists recent profiled tool calls, slowest first, with their wall-clock breakdown (upstream fetch, "
+                "compute, serialization, event store, log notifications) and the functions that took the most time. "
+                "Profile a call by passing `_profile: true` in its arguments or the `x-mcp-profile: 1` header."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "min_ms": {
+                        "type": "number",
+                        "minimum": 0,
+                        "description": f"Only captures that took at least this many milliseconds. Defaults to MCP_PROFILE_SLOW_MS ({PROFILE_SLOW_MS:g}).",
+                    },
+                    "tool": {
+                        "type": "string",
+                        "description": "Only captures of this tool (e.g., 'get-options-chains').",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 100,
+                        "description": "Number of captures to list. Defaults to 10.",
+                    },
+                },
+            },
+        ),
+]
+
+async def tool_call_router(name: str, args: dict, app: Server) -> list[types.ContentBlock]:
+    for tool in tools:
+        if tool.name == name:
+            return await globals()[tool.name.replace("-", "_")](app, args)
+    raise ValueError(f"Tool {name} not found")
+
+
+class Capture:
+    """Wall-clock spans of one profiled tool call, by stage."""
+    __slots__ = ("tool", "request_id", "arguments", "started", "spans", "counts", "finished", "timer")
+
+    def __init__(self, tool: str, request_id, arguments: dict):
+        self.tool = tool
+        self.request_id = request_id
+        self.arguments = {key: value for key, value in arguments.items() if key != PROFILE_ARGUMENT}
+        self.started = time.time()
+        self.spans: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        # (total, profiler, error) once the call returned, until the capture is written
+        self.finished: tuple | None = None
+        self.timer: asyncio.TimerHandle | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def measure_serialization(self, content: list) -> None:
+        """Times the JSON encoding of the result, which the transport repeats after the call returns."""
+        with span("serialization"):
+            types.CallToolResult(content=list(content), isError=False).model_dump_json(by_alias=True, exclude_none=True)
+
+
+# Capture of the tool call being served; set by profile_call
+current_capture: contextvars.ContextVar[Capture | None] = contextvars.ContextVar("current_capture", default=None)
+# Captures by (session, request id), for event store writes which run outside the
+# request's context, kept from the start of the call until its response event is stored
+_by_stream: dict[tuple[str, str], Capture] = {}
+# Captures being written on a thread
+_writes: set[asyncio.Task] = set()
+# cProfile allows one active profiler per process, and all calls on the event loop share it
+_cpu_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def span(name: str):
+    """Adds the time spent in the block to `name` of the current capture, if any."""
+    capture = current_capture.get()
+    if capture is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        capture.add(name, time.perf_counter() - start)
+
+
+def record_span(stream_id: str, name: str, seconds: float, response: bool = False) -> None:
+    """Adds time spent for the request of the current session whose events go to stream_id.
+
+    The transport stores the response event after the tool call returned, so
+    pass response=True for it: the capture is written then, with that time.
+    """
+    key = (current_session.get(), str(stream_id))
+    capture = _by_stream.get(key)
+    if capture is not None:
+        capture.add(name, seconds)
+        if response and capture.finished is not None:
+            finish(key, capture)
+
+
+def finish(key: tuple[str, str], capture: Capture) -> None:
+    """Stops tracking a capture of a call that returned and writes it on a thread."""
+    if _by_stream.get(key) is capture:
+        del _by_stream[key]
+    if capture.timer is not None:
+        capture.timer.cancel()
+        capture.timer = None
+    if capture.finished is None:
+        return
+    finished, capture.finished = capture.finished, None
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(_write, capture, *finished))
+    _writes.add(task)
+    task.add_done_callback(_writes.discard)
+
+
+def _write(capture: Capture, total: float, profiler: cProfile.Profile | None, error: str | None) -> None:
+    try:
+        write_capture(capture, total, profiler, error)
+    except Exception as e:
+        print(f"Writing the profile of {capture.tool} failed: {e}")
+
+
+def wants_profile(args: dict, request) -> bool:
+    """True when the call asks for a capture, or is sampled at PROFILE_SAMPLE_RATE."""
+    if args.get(PROFILE_ARGUMENT):
+        return True
+    headers = getattr(request, "headers", None)
+    if headers is not None and str(headers.get(PROFILE_HEADER, "")).strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class TimedSession:
+    """Session of a profiled call that times its log notifications."""
+
+    def __init__(self, session, capture: Capture):
+        self._session = session
+        self._capture = capture
+
+    def __getattr__(self, name: str):
+        return getattr(self._session, name)
+
+    async def send_log_message(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self._session.send_log_message(*args, **kwargs)
+        finally:
+            self._capture.add("log notifications", time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def profile_call(app: Server, name: str, args: dict):
+    """Profiles the tool call in the block when wants_profile says so.
+
+    Records the wall-clock spans of the call and, unless another call is being
+    profiled at the same time, a CPU profile. The CPU profile covers the event
+    loop, so work of concurrent requests shows up in it too, and from Python
+    3.12 also the threads running upstream fetches.
+    Both are written to PROFILE_DIR once the transport stored the response
+    event, so the "event store" span includes that write, or RESPONSE_WAIT
+    seconds after the block exits when the event store does not report it.
+    Yields:
+        Capture | None: The capture, None when the call is not profiled.
+    """
+    ctx = app.request_context
+    if not wants_profile(args, ctx.request):
+        yield None
+        return
+    capture = Capture(name, ctx.request_id, args)
+    capture_token = current_capture.set(capture)
+    ctx_token = request_ctx.set(dataclasses.replace(ctx, session=TimedSession(ctx.session, capture)))
+    key = (current_session.get(), str(ctx.request_id))
+    _by_stream[key] = capture
+    profiler = cProfile.Profile() if _cpu_lock.acquire(blocking=False) else None
+    start = time.perf_counter()
+    error = None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield capture
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _cpu_lock.release()
+        total = time.perf_counter() - start
+        request_ctx.reset(ctx_token)
+        current_capture.reset(capture_token)
+        capture.finished = (total, profiler, error)
+        capture.timer = asyncio.get_running_loop().call_later(RESPONSE_WAIT, finish, key, capture)
+
+
+def top_functions(profiler: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> list[dict]:
+    """Functions with the most cumulative time."""
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in pstats.Stats(profiler).stats.items():
+        # The profiler, span blocks and the generators behind them wrap every stage
+        if "_lsprof" in function or "builtins.next" in function or filename.endswith(("profiling.py", "contextlib.py")):
+            continue
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({function})" if line else function,
+            "calls": calls,
+            "cumulative_ms": round(cumulative * 1000, 2),
+            "own_ms": round(own * 1000, 2),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def write_capture(capture: Capture, total: float, profiler: cProfile.Profile | None, error: str | None) -> str:
+    """Writes the summary (.json) and CPU profile (.prof, for pstats or snakeviz) of a capture.
+    Returns:
+        str: Path of the summary.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.datetime.fromtimestamp(capture.started).strftime("%Y%m%d-%H%M%S-%f")
+    base = os.path.join(PROFILE_DIR, f"{stamp}-{re.sub(r'[^A-Za-z0-9_-]', '_', capture.tool)}-{int(total * 1000)}ms")
+    if profiler is not None:
+        profiler.dump_stats(base + ".prof")
+    summary = {
+        "tool": capture.tool,
+        "request_id": str(capture.request_id),
+        "arguments": capture.arguments,
+        "started": datetime.datetime.fromtimestamp(capture.started).isoformat(timespec="milliseconds"),
+        "total_ms": round(total * 1000, 2),
+        "error": error,
+        # Concurrent work overlaps, so spans can add up to more than total_ms
+        "spans": {name: {"ms": round(seconds * 1000, 2), "count": capture.counts[name]} for name, seconds in capture.spans.items()},
+        "cpu_profile": base + ".prof" if profiler is not None else None,
+        "top_functions": top_functions(profiler) if profiler is not None else [],
+    }
+    with open(base + ".json", "w") as file:
+        json.dump(summary, file, indent=1, default=str)
+    rotate()
+    return base + ".json"
+
+
+def rotate(max_files: int = PROFILE_MAX_FILES) -> None:
+    """Deletes the oldest captures beyond max_files."""
+    summaries = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in summaries[:max(0, len(summaries) - max_files)]:
+        for path in (name, name[:-len(".json")] + ".prof"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(PROFILE_DIR, path))
+
+
+def read_captures() -> list[dict]:
+    """Summaries of the captures in PROFILE_DIR, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    captures = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as file:
+                captures.append(json.load(file))
+        except (OSError, ValueError):
+            continue # Deleted by rotation or being written
+    return captures
+
+
+async def list_profiles(app: Server, args: dict) -> list[types.ContentBlock]:
+    """Lists recent slow captures.
+    Args:
+        app (Server): The MCP server instance.
+        args (dict): min_ms, tool and limit.
+    Returns:
+        list[types.ContentBlock]: One entry per capture, slowest first.
+    """
+    min_ms = float(args.get("min_ms", PROFILE_SLOW_MS))
+    tool = args.get("tool")
+    limit = int(args.get("limit", 10))
+    captures = [
+        capture for capture in await asyncio.to_thread(read_captures)
+        if capture["total_ms"] >= min_ms and (tool is None or capture["tool"] == tool)
+    ]
+    captures = sorted(captures, key=lambda capture: capture["total_ms"], reverse=True)[:limit]
+    if not captures:
+        return [types.TextContent(type="text", text=f"No profiled calls of at least {min_ms:g}ms in {PROFILE_DIR}")]
+    entries = []
+    for capture in captures:
+        spans = ", ".join(f"{name} {span['ms']:.0f}ms ({span['count']}x)" for name, span in sorted(capture["spans"].items(), key=lambda item: -item[1]["ms"]))
+        lines = [
+            f"{capture['started']} {capture['tool']} {capture['total_ms']:.0f}ms" + (f" failed: {capture['error']}" if capture["error"] else ""),
+            f"  Arguments: {json.dumps(capture['arguments'], default=str)}",
+            f"  Spans: {spans or 'none'}",
+        ]
+        if capture["top_functions"]:
+            lines.append("  Top functions (cumulative): " + ", ".join(f"{row['function']} {row['cumulative_ms']:.0f}ms" for row in capture["top_functions"][:5]))
+            lines.append(f"  CPU profile: {capture['cpu_profile']}")
+        else:
+            lines.append("  CPU profile: not captured, another call was being profiled")
+        entries.append("\n".join(lines))
+    return [types.TextContent(type="text", text="\n\n".join(entries))]
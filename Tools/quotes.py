@@ -0,0 +1,76 @@
+from .lazy import lazy_import
+from .upstream import is_throttled
+yf = lazy_import("yfinance")
+
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+# Yahoo quote field behind each QuoteRecord field
+QUOTE_FIELDS = {
+    "price": "regularMarketPrice",
+    "market_cap": "marketCap",
+    "volume": "regularMarketVolume",
+    "currency": "currency",
+    "market": "market",
+    "market_time": "regularMarketTime",
+}
+
+
+class QuoteRecord:
+    """The quote fields the tools report, without the rest of the `.info` summary."""
+    __slots__ = ("symbol", "price", "market_cap", "volume", "currency", "market", "market_time")
+
+    def __init__(self, symbol: str, price=None, market_cap=None, volume=None, currency=None, market=None, market_time=None):
+        self.symbol = symbol
+        self.price = price
+        self.market_cap = market_cap
+        self.volume = volume
+        self.currency = currency
+        self.market = market
+        self.market_time = market_time
+
+    @classmethod
+    def from_quote(cls, symbol: str, quote: dict) -> "QuoteRecord":
+        return cls(symbol, *(quote.get(field) for field in QUOTE_FIELDS.values()))
+
+    @classmethod
+    def from_info(cls, symbol: str, info: dict) -> "QuoteRecord":
+        return cls(
+            symbol,
+            info.get("currentPrice", info.get("regularMarketPrice")),
+            info.get("marketCap"),
+            info.get("volume", info.get("regularMarketVolume")),
+            info.get("currency"),
+            info.get("market"),
+            info.get("regularMarketTime"),
+        )
+
+
+def fetch_quotes(symbols: list[str]) -> dict[str, QuoteRecord]:
+    """Requests only the QUOTE_FIELDS of several symbols in one upstream call.
+
+    `.info` requests five quoteSummary modules plus the full quote, about 180
+    fields, to report three of them. Blocking; run it through the upstream scheduler.
+    Args:
+        symbols (list[str]): Stock symbols.
+    Returns:
+        dict[str, QuoteRecord]: Records keyed by symbol, missing for unknown symbols.
+    """
+    params = {"symbols": ",".join(symbols), "fields": ",".join(QUOTE_FIELDS.values()), "formatted": "false"}
+    # YfData is yfinance's shared session, which holds the cookie and crumb Yahoo requires
+    result = yf.data.YfData().get_raw_json(QUOTE_URL, params=params)
+    return {
+        quote["symbol"]: QuoteRecord.from_quote(quote["symbol"], quote)
+        for quote in (result.get("quoteResponse") or {}).get("result") or []
+    }
+
+
+def fetch_quote(symbol: str) -> QuoteRecord:
+    """The quote of one symbol, from the full `.info` summary if the quote endpoint fails."""
+    try:
+        record = fetch_quotes([symbol]).get(symbol)
+    except Exception as e:
+        if is_throttled(e):
+            raise
+        record = QuoteRecord.from_info(symbol, yf.Ticker(symbol).info or {})
+    if record is None or record.price is None:
+        raise ValueError(f"No data found for ticker: {symbol}")
+    return record
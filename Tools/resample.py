@@ -0,0 +1,152 @@
+import datetime
+import math
+import numpy as np
+import pandas as pd
+from .trading_calendar import TradingCalendar
+
+# Minutes per bar of the intraday intervals that can be derived from finer bars
+INTRADAY_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "1h": 60, "90m": 90}
+DAILY = "1d"
+# Days back Yahoo serves each intraday interval
+MAX_INTRADAY_DAYS = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 730, "1h": 730, "90m": 60}
+# Intervals downloaded as the source of coarser bars, finest first
+BASE_INTERVALS = ["1m", "5m", "15m", "30m", "60m"]
+AGGREGATIONS = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum", "Dividends": "sum", "Stock Splits": "max"}
+
+
+def period_days(period: str, sessions_as_calendar: bool = True) -> float:
+    """Calendar days spanned by a yfinance period.
+    Args:
+        period (str): e.g. "5d", "1mo", "2y", "ytd", "max".
+        sessions_as_calendar (bool): "Nd" periods count trading sessions. True returns
+            an upper bound of the calendar days they span, False a lower bound.
+    """
+    if period == "max":
+        return math.inf
+    if period == "ytd":
+        return float(datetime.date.today().timetuple().tm_yday)
+    if period.endswith("mo"):
+        return int(period[:-2]) * 31.0 if sessions_as_calendar else int(period[:-2]) * 28.0
+    if period.endswith("y"):
+        return int(period[:-1]) * 366.0 if sessions_as_calendar else int(period[:-1]) * 365.0
+    if period.endswith("d"):
+        # Weekends and up to a few holidays fall between sessions
+        return int(period[:-1]) * 7 / 5 + 4 if sessions_as_calendar else float(int(period[:-1]))
+    raise ValueError(f"Unknown period {period}")
+
+
+def covers(source_period: str, period: str) -> bool:
+    """True when bars of source_period always include every bar of period."""
+    if source_period == period:
+        return True
+    if source_period.endswith("d") and period.endswith("d") and "ytd" not in (source_period, period):
+        return int(source_period[:-1]) >= int(period[:-1])
+    return period_days(source_period, sessions_as_calendar=False) >= period_days(period)
+
+
+def can_derive(source_interval: str, interval: str) -> bool:
+    """True when bars of interval can be aggregated from bars of source_interval.
+
+    Daily bars are only derived from daily bars, by slicing the period: Yahoo's
+    daily bars include auction and off-exchange prints that its intraday bars
+    miss, so daily bars aggregated from intraday ones would not match them.
+    """
+    if interval == DAILY:
+        return source_interval == DAILY
+    if interval not in INTRADAY_MINUTES or source_interval not in INTRADAY_MINUTES:
+        return False
+    return INTRADAY_MINUTES[interval] % INTRADAY_MINUTES[source_interval] == 0
+
+
+def base_interval(period: str, interval: str) -> str:
+    """Finest interval Yahoo serves for period that interval can be derived from.
+
+    Intraday bars are downloaded at this interval so that the other intraday
+    intervals of the same window are derived without another download. Daily
+    and longer intervals are downloaded as requested, since Yahoo's daily bars
+    include prints that intraday bars do not.
+    """
+    if interval not in INTRADAY_MINUTES:
+        return interval
+    days = period_days(period, sessions_as_calendar=False) # Yahoo counts "Nd" in sessions too
+    for base in BASE_INTERVALS:
+        if can_derive(base, interval) and days <= MAX_INTRADAY_DAYS[base]:
+            return base
+    return interval
+
+
+def slice_period(bars: pd.DataFrame, period: str) -> pd.DataFrame:
+    """The bars a yfinance request for period would return, from bars that cover it."""
+    if bars.empty or period == "max":
+        return bars
+    dates = bars.index.tz_localize(None).normalize() if bars.index.tz is not None else bars.index.normalize()
+    if period.endswith("d") and period != "ytd":
+        sessions = np.unique(dates.to_numpy())
+        return bars[dates >= sessions[max(0, len(sessions) - int(period[:-1]))]]
+    last = dates[-1]
+    if period == "ytd":
+        start = pd.Timestamp(last.year, 1, 1)
+    elif period.endswith("mo"):
+        start = last - pd.DateOffset(months=int(period[:-2]))
+    else:
+        start = last - pd.DateOffset(years=int(period[:-1]))
+    return bars[dates > start]
+
+
+def resample_bars(bars: pd.DataFrame, interval: str, calendar: TradingCalendar | None = None) -> pd.DataFrame:
+    """Aggregates OHLCV bars into coarser bars.
+
+    Intraday buckets are anchored at the session open of `calendar`, as
+    Yahoo's own 60m bars start at the 9:30 open, so a missing opening bar
+    does not shift the session's buckets. Without a calendar, or on a day it
+    has no session, they are anchored at the day's first bar. Buckets never
+    span two sessions. Daily
+    bars are indexed at local midnight like Yahoo's. Open is the first open,
+    High the highest high, Low the lowest low, Close the last close and Volume
+    the sum; bars without trades are skipped for Open and Close.
+    Args:
+        bars (pd.DataFrame): OHLCV bars indexed by timestamp in the exchange time zone.
+        interval (str): Target interval, e.g. "15m", "60m" or "1d".
+        calendar (TradingCalendar, optional): Calendar of the symbol's exchange.
+    Returns:
+        pd.DataFrame: One row per bucket with at least one bar.
+    """
+    if bars.empty:
+        return bars
+    index = bars.index
+    local = (index.tz_localize(None) if index.tz is not None else index).as_unit("ns")
+    days = local.normalize()
+    if interval == DAILY:
+        keys, name = days, "Date"
+    else:
+        step = pd.Timedelta(minutes=INTRADAY_MINUTES[interval]).value
+        ticks = local.asi8
+        session = days.asi8
+        # First bar of each session, broadcast to all its bars
+        starts = pd.Series(ticks).groupby(session).transform("min").to_numpy()
+        if calendar is not None:
+            sessions, position = np.unique(session, return_inverse=True)
+            opens = np.array([session_open(calendar, tick) for tick in sessions], dtype=np.int64)
+            starts = np.where(opens[position] >= 0, opens[position], starts)
+        keys = pd.DatetimeIndex(starts + (ticks - starts) // step * step)
+        name = "Datetime"
+    columns = {column: how for column, how in AGGREGATIONS.items() if column in bars.columns}
+    result = bars.groupby(keys, sort=True).agg(columns)
+    index = pd.DatetimeIndex(result.index, name=name)
+    result.index = index.tz_localize(bars.index.tz, ambiguous="NaT", nonexistent="shift_forward") if bars.index.tz is not None else index
+    return result
+
+
+def session_open(calendar: TradingCalendar, day_tick: int) -> int:
+    """Local session open of the day starting at day_tick (ns), -1 when the calendar has no session."""
+    day = pd.Timestamp(day_tick).date()
+    session = calendar.session(day)
+    if session is None:
+        return -1
+    return pd.Timestamp(datetime.datetime.combine(day, session[0].time())).as_unit("ns").value
+
+
+def derive(bars: pd.DataFrame, period: str, interval: str, source_interval: str, calendar: TradingCalendar | None = None) -> pd.DataFrame:
+    """Bars of (period, interval) from covering bars of source_interval."""
+    bars = slice_period(bars, period)
+    return bars if source_interval == interval else resample_bars(bars, interval, calendar)
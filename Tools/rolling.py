@@ -0,0 +1,85 @@
+import numpy as np
+
+ROLLING_STATS = ["corr", "cov", "beta"]
+DEFAULT_WINDOWS = [20, 60, 252]
+
+
+def rolling_comoments(x: np.ndarray, y: np.ndarray, window: int, min_periods: int | None = None) -> dict[str, np.ndarray]:
+    """Rolling correlation, covariance and beta of many pairs of series at once.
+
+    The co-moments of every pair are updated in O(1) per step as the window
+    slides: the newest row is added and the row leaving the window is removed
+    with Welford's update and its inverse, which avoids the cancellation of raw
+    sums of products. Rows where either side is NaN are skipped, so results
+    match pandas `x.rolling(window).corr(y)`, `.cov(y)` and `cov / var(y)`.
+    Args:
+        x (np.ndarray): (T,) or (T, P) values, e.g. returns of the first series of each pair.
+        y (np.ndarray): Same shape as x, the second series. Beta is the slope of x on y.
+        window (int): Number of rows in each window.
+        min_periods (int, optional): Valid rows needed for a value. Defaults to window.
+    Returns:
+        dict[str, np.ndarray]: "corr", "cov" and "beta" with the shape of x, NaN where not enough data.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    single = x.ndim == 1
+    if single:
+        x, y = x[:, np.newaxis], y[:, np.newaxis]
+    if x.shape != y.shape:
+        raise ValueError(f"x and y must have the same shape, got {x.shape} and {y.shape}")
+    min_periods = max(2, window if min_periods is None else min_periods)
+    rows, pairs = x.shape
+    valid = ~(np.isnan(x) | np.isnan(y))
+
+    count = np.zeros(pairs)
+    mean_x, mean_y = np.zeros(pairs), np.zeros(pairs)
+    sxx, syy, sxy = np.zeros(pairs), np.zeros(pairs), np.zeros(pairs)
+    result = {name: np.full((rows, pairs), np.nan) for name in ROLLING_STATS}
+
+    for t in range(rows):
+        if t >= window:
+            # Remove the row leaving the window. Invalid entries are replaced by
+            # the current mean so their update terms vanish.
+            old = valid[t - window]
+            xo = np.where(old, x[t - window], mean_x)
+            yo = np.where(old, y[t - window], mean_y)
+            count -= old
+            scale = 1.0 / np.maximum(count, 1.0)
+            new_mean_x = mean_x - (xo - mean_x) * scale
+            new_mean_y = mean_y - (yo - mean_y) * scale
+            sxx -= (xo - new_mean_x) * (xo - mean_x)
+            syy -= (yo - new_mean_y) * (yo - mean_y)
+            sxy -= (xo - new_mean_x) * (yo - mean_y)
+            mean_x, mean_y = new_mean_x, new_mean_y
+            empty = count == 0
+            if empty.any():
+                for moment in (mean_x, mean_y, sxx, syy, sxy):
+                    moment[empty] = 0.0
+
+        new = valid[t]
+        xn = np.where(new, x[t], mean_x)
+        yn = np.where(new, y[t], mean_y)
+        count += new
+        scale = 1.0 / np.maximum(count, 1.0)
+        dx, dy = xn - mean_x, yn - mean_y
+        mean_x = mean_x + dx * scale
+        mean_y = mean_y + dy * scale
+        sxx += dx * (xn - mean_x)
+        syy += dy * (yn - mean_y)
+        sxy += dx * (yn - mean_y)
+        np.maximum(sxx, 0.0, out=sxx)
+        np.maximum(syy, 0.0, out=syy)
+
+        ready = count >= min_periods
+        if ready.any():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+                cov = sxy / (count - 1)
+                beta = sxy / syy
+            result["corr"][t] = np.where(ready & (sxx > 0) & (syy > 0), corr, np.nan)
+            result["cov"][t] = np.where(ready, cov, np.nan)
+            result["beta"][t] = np.where(ready & (syy > 0), beta, np.nan)
+
+    if single:
+        return {name: values[:, 0] for name, values in result.items()}
+    return result
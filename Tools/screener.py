@@ -0,0 +1,237 @@
+import json
+import os
+import time
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from .lazy import lazy_import
+from .history import fetch_histories, align_columns
+from .compute_pool import run_sharded, chunked, check_cancelled, COMPUTE_WORKERS
+np = lazy_import("numpy")
+indicator_engine = lazy_import(f"{__package__}.indicators")
+
+UNIVERSE_DIR = os.getenv("MCP_UNIVERSE_DIR", os.path.join(os.path.dirname(__file__), "universes"))
+
+# Screenable fields computed by the indicator engine: field -> (indicator, output)
+INDICATOR_FIELDS = {
+    "rsi": ("RSI", "RSI"),
+    "macd": ("MACD", "MACD"),
+    "macd_signal": ("MACD", "MACD_SIGNAL"),
+    "macd_hist": ("MACD", "MACD_HIST"),
+    "bb_high": ("BB", "BB_HIGH"),
+    "bb_mid": ("BB", "BB_MID"),
+    "bb_low": ("BB", "BB_LOW"),
+    "sma": ("SMA", "SMA"),
+    "ema": ("EMA", "EMA"),
+    "atr": ("ATR", "ATR"),
+    "stoch_k": ("STOCH", "STOCH_K"),
+    "stoch_d": ("STOCH", "STOCH_D"),
+}
+# Screenable fields computed from prices and volume
+PRICE_FIELDS = ["price", "change_pct", "volume", "avg_volume", "volatility"]
+OPERATORS = ["<", "<=", ">", ">=", "==", "!="]
+
+tools = [
+    types.Tool(
+            name="screen-universe",
+            description=(
+                "Screens a universe of stock symbols and returns only those matching all filter conditions "
+                "on price, volume, volatility and technical indicator values."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["conditions"],
+                "properties": {
+                    "symbols": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Inline list of stock symbols to screen (e.g., ['AAPL', 'MSFT']).",
+                    },
+                    "universe_file": {
+                        "type": "string",
+                        "description": (
+                            "Name of a locally stored symbol list (one symbol per line), e.g. 'dow30'. "
+                            "Combined with 'symbols' when both are given."
+                        ),
+                    },
+                    "conditions": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "required": ["field", "op", "value"],
+                            "properties": {
+                                "field": {"type": "string"},
+                                "op": {"type": "string", "enum": OPERATORS},
+                                "value": {"type": ["number", "string"]},
+                            },
+                        },
+                        "description": (
+                            "Conditions that must all hold, e.g. [{'field': 'rsi', 'op': '<', 'value': 30}, "
+                            "{'field': 'price', 'op': '<', 'value': 'bb_low'}]. 'value' is a number or another field. "
+                            f"Fields: {', '.join(PRICE_FIELDS + list(INDICATOR_FIELDS))}."
+                        ),
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "History used for the calculation (e.g., '6mo', '1y'). Defaults to '1y'.",
+                    },
+                    "params": {
+                        "type": "object",
+                        "description": "Optional indicator window overrides, as for get-technical-indicators.",
+                    },
+                },
+            }
+    ),
+]
+
+async def tool_call_router(name: str, args: dict, app: Server) -> list[types.ContentBlock]:
+    for tool in tools:
+        if tool.name == name:
+            return await globals()[tool.name.replace("-", "_")](app, args)
+    raise ValueError(f"Tool {name} not found")
+
+def load_universe(name: str) -> list[str]:
+    """Reads a symbol list from the universe directory.
+    Args:
+        name (str): File name, with or without the .txt extension.
+    Returns:
+        list[str]: Upper-cased symbols in file order.
+    """
+    file_name = os.path.basename(name)
+    if not file_name.endswith(".txt"):
+        file_name += ".txt"
+    path = os.path.join(UNIVERSE_DIR, file_name)
+    if not os.path.isfile(path):
+        available = sorted(f[:-4] for f in os.listdir(UNIVERSE_DIR) if f.endswith(".txt")) if os.path.isdir(UNIVERSE_DIR) else []
+        raise ValueError(f"Universe '{name}' not found. Available universes: {', '.join(available)}")
+    with open(path) as f:
+        return [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+
+def validate_conditions(conditions) -> list[dict]:
+    fields = set(PRICE_FIELDS) | set(INDICATOR_FIELDS)
+    if not conditions or not isinstance(conditions, list):
+        raise ValueError("Please provide at least one condition.")
+    for condition in conditions:
+        if condition.get("field") not in fields:
+            raise ValueError(f"Unknown field {condition.get('field')}. Fields: {', '.join(sorted(fields))}")
+        if condition.get("op") not in OPERATORS:
+            raise ValueError(f"Unknown operator {condition.get('op')}. Operators: {', '.join(OPERATORS)}")
+        value = condition.get("value")
+        if isinstance(value, str) and value not in fields:
+            raise ValueError(f"Unknown comparison field {value}")
+        if not isinstance(value, (int, float, str)):
+            raise ValueError(f"Condition value must be a number or a field name, got {value!r}")
+    return conditions
+
+def screen_chunk(arrays: dict, symbols: list[str], row_start: int, row_end: int, conditions: list[dict], params: dict | None) -> list[dict]:
+    """Evaluates the screen for one chunk of symbols. Runs in a worker process.
+    Args:
+        arrays (dict): "close", "high", "low" and "volume" as (symbols, T) aligned bars.
+        symbols (list[str]): Symbols of rows [row_start, row_end).
+        row_start (int): First row screened by this job.
+        row_end (int): Row after the last one screened by this job.
+        conditions (list[dict]): Validated filter conditions.
+        params (dict | None): Indicator window overrides.
+    Returns:
+        list[dict]: Matching symbols with the values of the fields used.
+    """
+    check_cancelled()
+    close, high, low, volume = (arrays[name][row_start:row_end] for name in ("close", "high", "low", "volume"))
+    used = {c["field"] for c in conditions} | {c["value"] for c in conditions if isinstance(c["value"], str)}
+    wanted = sorted({INDICATOR_FIELDS[field][0] for field in used if field in INDICATOR_FIELDS})
+    latest = {}
+    if wanted:
+        values = indicator_engine.compute_indicators(close, high, low, indicators=wanted, params=params)
+        for field in used & set(INDICATOR_FIELDS):
+            latest[field] = indicator_engine.last_valid(values[INDICATOR_FIELDS[field][1]])
+    window = (params or {}).get("volatility_window", 20)
+    if "price" in used or "change_pct" in used:
+        latest["price"] = indicator_engine.last_valid(close)
+    if "change_pct" in used:
+        previous = indicator_engine.last_valid(close[:, :-1])
+        latest["change_pct"] = (latest["price"] / previous - 1.0) * 100.0
+    if "volume" in used:
+        latest["volume"] = indicator_engine.last_valid(volume)
+    if "avg_volume" in used:
+        latest["avg_volume"] = np.nanmean(volume[:, -window:], axis=1)
+    if "volatility" in used:
+        returns = np.diff(np.log(close[:, -(window + 1):]), axis=1)
+        latest["volatility"] = np.nanstd(returns, axis=1, ddof=1) * np.sqrt(252) * 100.0
+
+    comparisons = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal}
+    mask = np.ones(len(symbols), dtype=bool)
+    for condition in conditions:
+        value = condition["value"]
+        right = latest[value] if isinstance(value, str) else float(value)
+        # Comparisons with NaN (not enough history) are False, so those rows drop out
+        mask &= comparisons[condition["op"]](latest[condition["field"]], right)
+
+    return [
+        {"symbol": symbol, **{field: round(float(latest[field][row]), 4) for field in sorted(latest)}}
+        for row, symbol in enumerate(symbols) if mask[row]
+    ]
+
+async def screen_universe(app, args: dict) -> list[types.ContentBlock]:
+    """Screens a universe of symbols against filter conditions.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - symbols (list, optional): Inline list of stock symbols.
+            - universe_file (str, optional): Name of a stored symbol list, e.g. "dow30".
+            - conditions (list): Conditions with field, op and value that must all hold.
+            - period (str, optional): The history used for the calculation. Defaults to "1y".
+            - params (dict, optional): Indicator window overrides.
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with the matches and stage timings.
+    """
+    ctx = app.request_context
+    period = args.get("period", "1y")
+    params = args.get("params")
+    started = time.perf_counter()
+    try:
+        symbols = [symbol.upper() for symbol in args.get("symbols") or []]
+        if args.get("universe_file"):
+            symbols += load_universe(args["universe_file"])
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return [types.TextContent(type="text", text="Please provide symbols or a universe_file to screen.")]
+        conditions = validate_conditions(args.get("conditions"))
+
+        histories, errors = await fetch_histories(symbols, period=period, max_concurrency=16)
+        fetched = time.perf_counter()
+        if not histories:
+            raise ValueError(f"No price history could be fetched for {len(symbols)} symbols")
+        ordered = [symbol for symbol in symbols if symbol in histories]
+        arrays = {column.lower(): align_columns(histories, column)[ordered].to_numpy(dtype=float).T for column in ("Close", "High", "Low", "Volume")}
+        aligned = time.perf_counter()
+
+        shards = [
+            ([ordered[i] for i in part], part[0], part[-1] + 1, conditions, params)
+            for part in chunked(list(range(len(ordered))), COMPUTE_WORKERS)
+        ]
+        results, _ = await run_sharded(screen_chunk, shards, inputs=arrays)
+        matches = [match for result in results for match in result]
+        computed = time.perf_counter()
+
+        response_msg = (
+            f"Screened {len(ordered)} symbols, {len(matches)} matches:\n"
+            f"{json.dumps(matches)}\n"
+            f"Timing: fetch={(fetched - started) * 1000:.0f}ms align={(aligned - fetched) * 1000:.0f}ms "
+            f"compute={(computed - aligned) * 1000:.0f}ms total={(computed - started) * 1000:.0f}ms\n"
+        )
+        if errors:
+            response_msg += f"Failed to fetch {len(errors)} symbols: {', '.join(sorted(errors))}\n"
+        await ctx.session.send_log_message(
+            level="info",
+            data=f"Screened {len(ordered)} symbols in {(computed - started) * 1000:.0f}ms",
+            logger="screen_universe",
+            related_request_id=ctx.request_id,
+        )
+    except Exception as e:
+        error_msg = f"Error screening universe: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="screen_universe",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
@@ -0,0 +1,17 @@
+import contextvars
+import uuid
+
+# Key of the MCP session being served, unique across workers and nodes. Request
+# ids are only unique within a session, so per-request state shared by sessions
+# (profile captures, event streams) is keyed by this plus the request id.
+current_session: contextvars.ContextVar[str] = contextvars.ContextVar("current_session", default="")
+
+
+def open_session() -> contextvars.Token:
+    """Gives the request that opens a session a fresh key.
+
+    Call it around the handling of a request without an mcp-session-id header.
+    The session manager starts the session's server task and transport from
+    that request, so they and every tool call of the session inherit the key.
+    """
+    return current_session.set(uuid.uuid4().hex)
@@ -0,0 +1,222 @@
+import time
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from .lazy import lazy_import
+from .history import fetch_histories, align_columns
+from .screener import load_universe
+from .compute_pool import run_sharded, chunked, check_cancelled, COMPUTE_WORKERS
+np = lazy_import("numpy")
+backtest_engine = lazy_import(f"{__package__}.backtest")
+
+STRATEGY_NAMES = ["sma_cross", "ema_cross", "rsi", "bollinger"]
+SORT_KEYS = {"sharpe": True, "total_return": True, "max_drawdown": False} # metric -> higher is better
+
+tools = [
+    types.Tool(
+            name="backtest-strategy",
+            description=(
+                "Backtests a grid of strategy parameters on the daily bars of one or many symbols in one vectorized pass "
+                "and ranks the combinations. Strategies: SMA or EMA crossover (fast, slow), RSI thresholds (window, lower, "
+                "upper) and Bollinger band mean reversion (window, num_std). Reports total return, maximum drawdown, "
+                "Sharpe ratio, trades and time in the market per combination."
+            ),
+            inputSchema={
+                "type": "object",
+                "required": ["strategy"],
+                "anyOf": [{"required": ["symbols"]}, {"required": ["universe_file"]}],
+                "properties": {
+                    "symbols": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Stock symbols to backtest (e.g., ['AAPL', 'MSFT']).",
+                    },
+                    "universe_file": {
+                        "type": "string",
+                        "description": "Name of a stored symbol list to backtest (e.g., 'dow30').",
+                    },
+                    "strategy": {
+                        "type": "string",
+                        "enum": STRATEGY_NAMES,
+                        "description": (
+                            "'sma_cross' or 'ema_cross': long while the fast average is above the slow one. "
+                            "'rsi': buy when RSI falls below lower, sell when it rises above upper. "
+                            "'bollinger': buy below the lower band, sell at the middle band."
+                        ),
+                    },
+                    "grid": {
+                        "type": "object",
+                        "additionalProperties": {"type": "array", "items": {"type": "number"}},
+                        "description": (
+                            "Values to try per parameter; every combination is tested. Defaults: crossovers "
+                            "{'fast': [5, 10, 20], 'slow': [50, 100, 200]}, rsi {'window': [14], 'lower': [20, 25, 30], "
+                            "'upper': [65, 70, 75, 80]}, bollinger {'window': [10, 20, 50], 'num_std': [1.5, 2.0, 2.5]}."
+                        ),
+                    },
+                    "allow_short": {
+                        "type": "boolean",
+                        "description": "Also take short positions on the opposite signals. Defaults to false.",
+                    },
+                    "cost_bps": {
+                        "type": "number",
+                        "minimum": 0,
+                        "description": "Transaction cost per unit traded in basis points. Defaults to 0.",
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "enum": list(SORT_KEYS),
+                        "description": "Metric, averaged over the symbols, that ranks the combinations. Defaults to 'sharpe'.",
+                    },
+                    "top": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 100,
+                        "description": "Number of combinations to report. Defaults to 10.",
+                    },
+                    "output": {
+                        "type": "string",
+                        "enum": ["summary", "per_symbol"],
+                        "description": "'summary' for metrics averaged over the symbols, 'per_symbol' to add each symbol's metrics. Defaults to 'summary'.",
+                    },
+                    "period": {
+                        "type": "string",
+                        "description": "The history to backtest on (e.g., '1y', '5y'). Defaults to '2y'.",
+                    },
+                },
+            }
+    ),
+]
+
+async def tool_call_router(name: str, args: dict, app: Server) -> list[types.ContentBlock]:
+    for tool in tools:
+        if tool.name == name:
+            return await globals()[tool.name.replace("-", "_")](app, args)
+    raise ValueError(f"Tool {name} not found")
+
+def backtest_kernel(arrays: dict, combo_start: int, combo_end: int, strategy: str, names: list[str], allow_short: bool, cost: float, chunk: int) -> None:
+    """Backtests combinations [combo_start, combo_end) of the parameter grid.
+
+    Runs in a worker process for large grids and writes into arrays["metrics"].
+    Only one chunk of combinations is held in memory at a time.
+    Args:
+        arrays (dict): "close" and "returns" (symbols, T), "combos" (P, parameters),
+            the indicator stacks and the "metrics" (P, symbols, metrics) output.
+        combo_start (int): First combination tested by this job.
+        combo_end (int): Combination after the last one tested by this job.
+        strategy (str): The strategy name.
+        names (list[str]): Parameter names, the columns of arrays["combos"].
+        allow_short (bool): Take short positions on the opposite signals.
+        cost (float): Cost per unit traded as a fraction.
+        chunk (int): Combinations per chunk.
+    """
+    for start in range(combo_start, combo_end, chunk):
+        check_cancelled()
+        end = min(start + chunk, combo_end)
+        position = backtest_engine.positions(strategy, arrays, names, arrays["combos"][start:end], allow_short)
+        arrays["metrics"][start:end] = backtest_engine.evaluate(position, arrays["returns"], cost)
+
+async def backtest_strategy(app, args: dict) -> list[types.ContentBlock]:
+    """
+    Backtests every combination of a strategy's parameter grid on several symbols.
+    Args:
+        args (dict): A dictionary containing the following keys:
+            - symbols (list, optional): Stock symbols to backtest.
+            - universe_file (str, optional): Name of a stored symbol list.
+            - strategy (str): "sma_cross", "ema_cross", "rsi" or "bollinger".
+            - grid (dict, optional): Values to try per parameter.
+            - allow_short (bool, optional): Also take short positions. Defaults to False.
+            - cost_bps (float, optional): Transaction cost in basis points. Defaults to 0.
+            - sort_by (str, optional): "sharpe", "total_return" or "max_drawdown". Defaults to "sharpe".
+            - top (int, optional): Number of combinations to report. Defaults to 10.
+            - output (str, optional): "summary" or "per_symbol". Defaults to "summary".
+            - period (str, optional): The history to backtest on. Defaults to "2y".
+    Returns:
+        list[types.ContentBlock]: A list containing a single TextContent block with the ranked combinations.
+    """
+    ctx = app.request_context
+    started = time.perf_counter()
+    strategy = args.get("strategy", "")
+    allow_short = bool(args.get("allow_short", False))
+    cost = float(args.get("cost_bps", 0)) / 10000.0
+    sort_by = args.get("sort_by", "sharpe")
+    top = int(args.get("top", 10))
+    output = args.get("output", "summary")
+    period = args.get("period", "2y")
+    symbols = [symbol.upper() for symbol in args.get("symbols") or [] if symbol]
+
+    try:
+        if args.get("universe_file"):
+            symbols += load_universe(args["universe_file"])
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return [types.TextContent(type="text", text="Please provide symbols or a universe_file to backtest.")]
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort_by {sort_by}. Options: {', '.join(SORT_KEYS)}")
+        names, combos = backtest_engine.parameter_grid(strategy, args.get("grid"))
+
+        histories, errors = await fetch_histories(symbols, period=period)
+        fetched = time.perf_counter()
+        if not histories:
+            raise ValueError("; ".join(f"{symbol}: {error}" for symbol, error in errors.items()))
+        ordered = [symbol for symbol in symbols if symbol in histories]
+        close = align_columns(histories, "Close")[ordered].to_numpy(dtype=float).T
+        returns = np.full_like(close, np.nan)
+        returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1.0
+        arrays = {"close": close, "returns": returns, "combos": combos}
+        arrays.update(backtest_engine.indicator_stacks(close, strategy, names, combos))
+        prepared = time.perf_counter()
+
+        chunk = backtest_engine.chunk_combinations(len(ordered), close.shape[1])
+        shards = [(part[0], part[-1] + 1, strategy, names, allow_short, cost, chunk) for part in chunked(list(range(len(combos))), COMPUTE_WORKERS)]
+        _, outputs = await run_sharded(
+            backtest_kernel, shards,
+            inputs=arrays,
+            outputs={"metrics": ((len(combos), len(ordered), len(backtest_engine.METRICS)), "float64")},
+            work=len(combos) * close.size,
+        )
+        computed = time.perf_counter()
+
+        metrics = outputs["metrics"]
+        column = {name: index for index, name in enumerate(backtest_engine.METRICS)}
+        # Averages over the symbols, except the drawdown which is the worst one
+        summary = metrics.mean(axis=1)
+        summary[:, column["max_drawdown"]] = metrics[:, :, column["max_drawdown"]].max(axis=1)
+        key = summary[:, column[sort_by]]
+        order = np.argsort(-key if SORT_KEYS[sort_by] else key, kind="stable")[:top]
+        first = np.argmax(~np.isnan(close), axis=1)
+        buy_and_hold = close[:, -1] / close[np.arange(len(ordered)), first] - 1.0
+
+        def describe(values) -> str:
+            return (
+                f"return {values[column['total_return']]:.2%}, max drawdown {values[column['max_drawdown']]:.2%}, "
+                f"Sharpe {values[column['sharpe']]:.2f}, {values[column['trades']]:.1f} trades, "
+                f"in market {values[column['exposure']]:.0%}"
+            )
+
+        universe = ", ".join(ordered) if len(ordered) <= 10 else f"{len(ordered)} symbols"
+        response_msg = (
+            f"Backtest of {strategy}{' long/short' if allow_short else ''} on {universe} over {period}, "
+            f"{len(combos)} parameter combinations, ranked by {sort_by}:\n"
+        )
+        for rank, index in enumerate(order, start=1):
+            parameters = ", ".join(f"{name}={value:g}" for name, value in zip(names, combos[index]))
+            response_msg += f"{rank}. {parameters}: {describe(summary[index])}\n"
+            if output == "per_symbol":
+                for row, symbol in enumerate(ordered):
+                    response_msg += f"   {symbol}: {describe(metrics[index, row])}\n"
+        response_msg += f"Buy and hold: mean return {np.nanmean(buy_and_hold):.2%}\n"
+        response_msg += (
+            f"Timing: fetch={(fetched - started) * 1000:.0f}ms indicators={(prepared - fetched) * 1000:.0f}ms "
+            f"backtest={(computed - prepared) * 1000:.0f}ms total={(computed - started) * 1000:.0f}ms\n"
+        )
+        if errors:
+            response_msg += f"Failed to fetch {len(errors)} symbols: {', '.join(sorted(errors))}\n"
+    except Exception as e:
+        error_msg = f"Error backtesting {strategy} on {', '.join(symbols) or 'no symbols'}: {str(e)}"
+        await ctx.session.send_log_message(
+            level="error",
+            data=error_msg,
+            logger="backtest_strategy",
+            related_request_id=ctx.request_id
+        )
+        return [types.TextContent(type="text", text=error_msg)]
+    return [types.TextContent(type="text", text=response_msg)]
@@ -0,0 +1,98 @@
+import datetime
+import os
+from zoneinfo import ZoneInfo
+
+CALENDAR_DIR = os.getenv("MCP_CALENDAR_DIR", os.path.join(os.path.dirname(__file__), "calendars"))
+NEW_YORK = ZoneInfo("America/New_York")
+MARKET_OPEN = datetime.time(9, 30)
+MARKET_CLOSE = datetime.time(16, 0)
+# Longest run of days without a session: a holiday next to a weekend, or two in a row
+MAX_CLOSED_DAYS = 10
+
+
+class TradingCalendar:
+    """Regular sessions of an exchange, less its holidays, with its early closes.
+
+    Holidays and early closes are read from a local file per exchange, one
+    date per line. Years the file does not list are treated as having no
+    holidays, i.e. every weekday is a full session, with a warning the first
+    time each one is used: add the year to the file.
+    """
+
+    def __init__(self, name: str, zone: ZoneInfo = NEW_YORK, open_time: datetime.time = MARKET_OPEN, close_time: datetime.time = MARKET_CLOSE):
+        self.name = name
+        self.zone = zone
+        self.open_time = open_time
+        self.close_time = close_time
+        # date -> early close time, or None when the exchange is closed all day
+        self.exceptions: dict[datetime.date, datetime.time | None] = {}
+        # Years the file lists, and the missing years already warned about
+        self.years: set[int] = set()
+        self._warned: set[int] = set()
+
+    @classmethod
+    def load(cls, name: str, **kwargs) -> "TradingCalendar":
+        """Reads the holidays and early closes of `name` from CALENDAR_DIR.
+        Args:
+            name (str): File name without the .txt extension, e.g. "nyse".
+        Returns:
+            TradingCalendar: The calendar.
+        """
+        calendar = cls(name, **kwargs)
+        with open(os.path.join(CALENDAR_DIR, f"{name}.txt")) as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                day, status = line.split()[:2]
+                day = datetime.date.fromisoformat(day)
+                calendar.exceptions[day] = None if status == "closed" else datetime.time.fromisoformat(status)
+                calendar.years.add(day.year)
+        return calendar
+
+    def session(self, day: datetime.date) -> tuple[datetime.datetime, datetime.datetime] | None:
+        """Open and close of the session on day, None on weekends and holidays."""
+        if day.year not in self.years and day.year not in self._warned:
+            self._warned.add(day.year)
+            print(f"The {self.name} calendar does not list {day.year}: its holidays are treated as sessions")
+        if day.weekday() >= 5:
+            return None
+        close_time = self.close_time
+        if day in self.exceptions:
+            close_time = self.exceptions[day]
+            if close_time is None:
+                return None
+        return (
+            datetime.datetime.combine(day, self.open_time, self.zone),
+            datetime.datetime.combine(day, close_time, self.zone),
+        )
+
+    def next_session(self, day: datetime.date) -> tuple[datetime.datetime, datetime.datetime]:
+        """The first session on or after day."""
+        for offset in range(MAX_CLOSED_DAYS):
+            session = self.session(day + datetime.timedelta(days=offset))
+            if session is not None:
+                return session
+        raise ValueError(f"No {self.name} session within {MAX_CLOSED_DAYS} days of {day}")
+
+
+nyse = TradingCalendar.load("nyse")
+
+# Yahoo index symbols of US markets; other "^" symbols are foreign indices
+US_INDICES = {"^GSPC", "^DJI", "^IXIC", "^NDX", "^RUT", "^VIX", "^NYA", "^SOX", "^XAX", "^TNX", "^IRX", "^FVX", "^TYX"}
+
+
+def calendar_for(symbol: str) -> TradingCalendar | None:
+    """Calendar of the exchange a Yahoo symbol trades on, None when no calendar is known.
+
+    Yahoo marks foreign listings with an exchange suffix (7203.T, VOD.L),
+    currencies with =X, futures with =F and crypto pairs with a currency
+    (BTC-USD). US share classes use a one or two letter suffix (BRK-B).
+    """
+    symbol = symbol.upper()
+    if symbol.startswith("^"):
+        return nyse if symbol in US_INDICES else None
+    if "." in symbol or "=" in symbol:
+        return None
+    if "-" in symbol and len(symbol.rsplit("-", 1)[1]) > 2:
+        return None
+    return nyse
@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+from .profiling import span
+
+# Priority classes, lower runs first
+INTERACTIVE = 0 # single-ticker lookups a user is waiting on
+BULK = 1        # multi-symbol analytics and screening
+BACKGROUND = 2  # scheduled refreshes and prefetching
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", BACKGROUND: "background"}
+
+# Sustained upstream requests per second, and how many may be sent at once after a quiet period
+UPSTREAM_RATE = float(os.getenv("MCP_UPSTREAM_RATE", "8"))
+UPSTREAM_BURST = float(os.getenv("MCP_UPSTREAM_BURST", "16"))
+# Bounds of the adaptive number of requests in flight
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = int(os.getenv("MCP_UPSTREAM_MAX_CONCURRENCY", "16"))
+# Attempts per call for throttled or timed out requests, and the backoff before retry n: up to base * 2^n seconds
+MAX_ATTEMPTS = int(os.getenv("MCP_UPSTREAM_ATTEMPTS", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+
+class RequestStats:
+    """Upstream usage of one tool call, collected across the tasks and threads it spawns."""
+    __slots__ = ("calls", "queued", "retries", "throttled")
+
+    def __init__(self):
+        self.calls = 0
+        self.queued = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    def summary(self) -> str:
+        return (
+            f"Upstream: {self.calls} calls, queued {self.queued * 1000:.0f}ms, "
+            f"{self.retries} retries, {self.throttled} throttled"
+        )
+
+
+# Stats of the tool call being served; set by main.call_tool
+request_stats: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+
+def is_throttled(error: Exception) -> bool:
+    """True for Yahoo rate limiting (HTTP 429)."""
+    message = str(error).lower()
+    return type(error).__name__ == "YFRateLimitError" or "429" in message or "too many requests" in message
+
+
+def is_timeout(error: Exception) -> bool:
+    return isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower() or "timed out" in str(error).lower()
+
+
+class UpstreamScheduler:
+    """Coordinates all requests to Yahoo Finance.
+
+    A token bucket caps the request rate. The number of requests in flight is
+    adaptive (AIMD): it grows by one per window of successes and halves on a
+    429 or timeout, which are retried after an exponential backoff with full
+    jitter. Waiting requests are served by priority class, then in arrival
+    order, so bulk work cannot starve interactive lookups.
+    """
+
+    def __init__(self, rate: float = UPSTREAM_RATE, burst: float = UPSTREAM_BURST, max_concurrency: int = MAX_CONCURRENCY):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(MIN_CONCURRENCY, max_concurrency // 2))
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self.order = itertools.count()
+        self.timer: asyncio.TimerHandle | None = None
+        self.throttled = 0
+        self.completed = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _dispatch(self) -> None:
+        """Hands free slots and tokens to the highest priority waiters."""
+        self.timer = None
+        self._refill()
+        while self.waiters and self.in_flight < int(self.limit):
+            _, _, cost, future = self.waiters[0]
+            if future.done():
+                heapq.heappop(self.waiters) # Cancelled while waiting
+                continue
+            if self.tokens < cost:
+                delay = (cost - self.tokens) / self.rate
+                self.timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self.waiters)
+            self.tokens -= cost
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def _acquire(self, priority: int, cost: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.order), min(cost, self.burst), future))
+        if self.timer is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release() # Granted just as the caller was cancelled
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        if self.timer is None:
+            self._dispatch()
+
+    def _succeeded(self) -> None:
+        self.completed += 1
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    def _backed_off(self) -> None:
+        self.throttled += 1
+        self.limit = max(float(MIN_CONCURRENCY), self.limit / 2.0)
+        # Stop sending at the full rate until the bucket refills
+        self.tokens = min(self.tokens, 0.0)
+
+    async def call(self, fn, *args, priority: int = INTERACTIVE, cost: float = 1.0, **kwargs):
+        """Runs a blocking upstream call in a thread once the scheduler admits it.
+        Args:
+            fn: Blocking callable, e.g. yf.Ticker(symbol).history.
+            *args: Positional arguments for fn.
+            priority (int): INTERACTIVE, BULK or BACKGROUND.
+            cost (float): Number of upstream requests fn makes, taken from the token bucket.
+            **kwargs: Keyword arguments for fn.
+        Returns:
+            The return value of fn.
+        """
+        stats = request_stats.get()
+        for attempt in range(MAX_ATTEMPTS):
+            queued = time.monotonic()
+            with span("upstream queue"):
+                await self._acquire(priority, cost)
+            if stats is not None:
+                stats.calls += 1
+                stats.queued += time.monotonic() - queued
+            try:
+                with span("upstream fetch"):
+                    result = await asyncio.to_thread(fn, *args, **kwargs)
+            except Exception as e:
+                retry = is_throttled(e) or is_timeout(e)
+                if retry:
+                    self._backed_off()
+                    if stats is not None:
+                        stats.throttled += 1
+                if not retry or attempt == MAX_ATTEMPTS - 1:
+                    raise
+            else:
+                self._succeeded()
+                return result
+            finally:
+                self._release()
+            if stats is not None:
+                stats.retries += 1
+            await asyncio.sleep(random.uniform(0.0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": {name: sum(1 for p, _, _, f in self.waiters if p == priority and not f.done()) for priority, name in PRIORITY_NAMES.items()},
+            "completed": self.completed,
+            "throttled": self.throttled,
+        }
+
+
+upstream = UpstreamScheduler()
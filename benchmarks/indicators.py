@@ -0,0 +1,73 @@
+"""Indicator engine benchmark against the per-indicator `ta` objects.
+
+    python benchmarks/indicators.py --symbols 1 500 --bars 252
+
+Runs on synthetic random-walk prices so no network access is needed. The `ta`
+path builds RSIIndicator, MACD and BollingerBands per symbol, as
+get_technical_indicators used to; the engine computes all symbols at once.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import MACD
+from ta.volatility import BollingerBands
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.indicators import compute_indicators  # noqa: E402
+
+
+def synthetic_closes(symbols: int, bars: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(symbols, bars)), axis=1))
+
+
+def ta_path(closes: np.ndarray) -> dict[str, np.ndarray]:
+    result = {"RSI": [], "MACD": [], "MACD_SIGNAL": [], "BB_HIGH": [], "BB_LOW": []}
+    for row in closes:
+        close = pd.Series(row)
+        macd = MACD(close)
+        bands = BollingerBands(close, window=20, window_dev=2)
+        result["RSI"].append(RSIIndicator(close, window=14).rsi().to_numpy())
+        result["MACD"].append(macd.macd().to_numpy())
+        result["MACD_SIGNAL"].append(macd.macd_signal().to_numpy())
+        result["BB_HIGH"].append(bands.bollinger_hband().to_numpy())
+        result["BB_LOW"].append(bands.bollinger_lband().to_numpy())
+    return {name: np.vstack(rows) for name, rows in result.items()}
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--bars", type=int, default=252)
+    parser.add_argument("--repeats", type=int, default=5)
+    cli_args = parser.parse_args()
+
+    for symbols in cli_args.symbols:
+        closes = synthetic_closes(symbols, cli_args.bars)
+        reference = ta_path(closes)
+        engine = compute_indicators(closes, indicators=["RSI", "MACD", "BB"])
+        error = max(float(np.nanmax(np.abs(reference[name] - engine[name]))) for name in reference)
+        ta_time = best_of(lambda: ta_path(closes), cli_args.repeats)
+        engine_time = best_of(lambda: compute_indicators(closes, indicators=["RSI", "MACD", "BB"]), cli_args.repeats)
+        print(
+            f"symbols={symbols} bars={cli_args.bars} ta={ta_time * 1000:.2f}ms "
+            f"engine={engine_time * 1000:.2f}ms speedup={ta_time / engine_time:.1f}x max_abs_diff={error:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Quote path benchmark: the lean quote request against `yf.Ticker(...).info`.
+
+    python benchmarks/quotes.py --symbols AAPL MSFT NVDA SPY --repeats 3
+
+Needs network access. For each path it reports the median fetch time per
+symbol and the memory retained per ticker when results are kept, i.e. the
+deep size of an `.info` dict against a QuoteRecord. The batched row fetches
+all symbols in one quote request.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import yfinance as yf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Tools.quotes import fetch_quote, fetch_quotes  # noqa: E402
+
+
+def deep_size(value, seen: set | None = None) -> int:
+    """Bytes held by an object and everything it references, counting shared objects once."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(deep_size(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(deep_size(getattr(value, name), seen) for name in value.__slots__ if hasattr(value, name))
+    return size
+
+
+def measure(fetch, symbols: list[str], repeats: int) -> tuple[float, float]:
+    """Median seconds per fetch and mean retained bytes per ticker."""
+    timings, sizes = [], []
+    for _ in range(repeats):
+        for symbol in symbols:
+            start = time.perf_counter()
+            result = fetch(symbol)
+            timings.append(time.perf_counter() - start)
+            sizes.append(deep_size(result))
+    return statistics.median(timings), statistics.mean(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="+", default=["AAPL", "MSFT", "NVDA", "SPY"])
+    parser.add_argument("--repeats", type=int, default=3)
+    cli_args = parser.parse_args()
+    symbols = [symbol.upper() for symbol in cli_args.symbols]
+
+    fetch_quote(symbols[0]) # Obtain the session cookie and crumb outside the timings
+    info_time, info_size = measure(lambda symbol: yf.Ticker(symbol).info, symbols, cli_args.repeats)
+    lean_time, lean_size = measure(fetch_quote, symbols, cli_args.repeats)
+    start = time.perf_counter()
+    for _ in range(cli_args.repeats):
+        fetch_quotes(symbols)
+    batch_time = (time.perf_counter() - start) / cli_args.repeats / len(symbols)
+
+    print(f"symbols={len(symbols)} repeats={cli_args.repeats}")
+    print(f"info:    {info_time * 1000:.1f}ms/symbol  {info_size / 1024:.1f}KB/ticker")
+    print(f"lean:    {lean_time * 1000:.1f}ms/symbol  {lean_size / 1024:.2f}KB/ticker  ({info_time / lean_time:.1f}x faster, {info_size / lean_size:.0f}x smaller)")
+    print(f"batched: {batch_time * 1000:.1f}ms/symbol")
+
+
+if __name__ == "__main__":
+    main()
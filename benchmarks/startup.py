@@ -0,0 +1,96 @@
+"""Cold start benchmark: import time of `main` and first-request latency.
+
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --runs 5 --tool get-stock-price-data --args '{"ticker": "AAPL"}'
+
+Import time is measured in a fresh interpreter per run. First-request latency
+starts a server process and measures the time until the first `list_tools`
+response, then the first call of `--tool` (which pays for the lazy imports).
+Set MCP_WARMUP=1 in the environment to measure the warm-up hook.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import() -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def first_requests(url: str, tool: str, tool_args: dict, started: float, timeout: float) -> tuple[float, float | None]:
+    while True:
+        try:
+            async with streamablehttp_client(url=url) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    await session.list_tools()
+                    list_latency = time.perf_counter() - started
+                    call_latency = None
+                    if tool:
+                        call_started = time.perf_counter()
+                        await session.call_tool(tool, tool_args)
+                        call_latency = time.perf_counter() - call_started
+                    return list_latency, call_latency
+        except Exception:
+            if time.perf_counter() - started > timeout:
+                raise
+            await asyncio.sleep(0.02)
+
+
+def measure_first_request(tool: str, tool_args: dict, timeout: float) -> tuple[float, float | None]:
+    port = free_port()
+    env = dict(os.environ, MCP_PORT=str(port), MCP_EVENT_STORE=os.getenv("MCP_EVENT_STORE", "memory"))
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return asyncio.run(first_requests(f"http://127.0.0.1:{port}/mcp", tool, tool_args, started, timeout))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(name: str, values: list[float]):
+    print(f"{name}: median={statistics.median(values) * 1000:.0f}ms min={min(values) * 1000:.0f}ms max={max(values) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tool", default="", help="Tool called after list_tools")
+    parser.add_argument("--args", default="{}", help="JSON encoded tool arguments")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    cli_args = parser.parse_args()
+
+    summary("import main", [measure_import() for _ in range(cli_args.runs)])
+    list_latencies, call_latencies = [], []
+    for _ in range(cli_args.runs):
+        list_latency, call_latency = measure_first_request(cli_args.tool, json.loads(cli_args.args), cli_args.timeout)
+        list_latencies.append(list_latency)
+        if call_latency is not None:
+            call_latencies.append(call_latency)
+    summary("process start to first list_tools", list_latencies)
+    if call_latencies:
+        summary(f"first {cli_args.tool} call", call_latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput benchmark for the streamable HTTP server.
+
+Start the server with the worker count under test, then point this script at it:
+
+    MCP_WORKERS=4 python main.py --host 0.0.0.0 --port 8000
+    python benchmarks/throughput.py --url http://localhost:8000/mcp --clients 32 --duration 30
+
+Each client opens its own MCP session and calls the tool in a loop; the script
+reports completed calls per second and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+async def run_client(url: str, tool: str, tool_args: dict, deadline: float, latencies: list[float], errors: list[str]):
+    async with streamablehttp_client(url=url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    if tool:
+                        await session.call_tool(tool, tool_args)
+                    else:
+                        await session.list_tools()
+                except Exception as e:
+                    errors.append(str(e))
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/mcp")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client sessions")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--tool", default="", help="Tool to call; defaults to list_tools so upstream latency is excluded")
+    parser.add_argument("--args", default="{}", help="JSON encoded tool arguments")
+    cli_args = parser.parse_args()
+
+    latencies: list[float] = []
+    errors: list[str] = []
+    deadline = time.perf_counter() + cli_args.duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(cli_args.url, cli_args.tool, json.loads(cli_args.args), deadline, latencies, errors)
+        for _ in range(cli_args.clients)
+    ])
+    elapsed = time.perf_counter() - started
+
+    print(f"clients={cli_args.clients} duration={elapsed:.1f}s calls={len(latencies)} errors={len(errors)}")
+    if latencies:
+        print(f"throughput={len(latencies) / elapsed:.1f} calls/s")
+        print(
+            f"latency p50={percentile(latencies, 50) * 1000:.1f}ms "
+            f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+            f"mean={statistics.mean(latencies) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
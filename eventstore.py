@@ -6,11 +6,14 @@ from mcp.server.streamable_http import (
     EventStore,
     StreamId
 )
-from mcp.types import JSONRPCMessage
+from mcp.types import JSONRPCMessage, JSONRPCResponse, JSONRPCError
 from collections import deque
 from uuid import uuid4
+import json
 import os
-import redis.asyncio as redis
+import time
+from Tools.profiling import record_span
+from Tools.sessions import current_session
 
 
 @dataclass
@@ -19,78 +22,107 @@ class EventEntry:
     stream_id: StreamId
     message: JSONRPCMessage
 
+def stream_key(stream_id: StreamId) -> str:
+    """Stream of the current session: stream ids are request ids, which repeat across sessions."""
+    return f"{current_session.get()}:{stream_id}"
+
 class InMemoryEventStore(EventStore):
     def __init__(self,max_events_per_stream=100):
         self.max_events_per_stream = max_events_per_stream
-        self.streams: dict[StreamId, deque[EventEntry]] = {}
-        self.event_index: dict[EventId, EventEntry] = {}
+        self.streams: dict[str, deque[EventEntry]] = {}
+        self.event_index: dict[EventId, tuple[str, EventEntry]] = {}
     async def store_event(self,stream_id: StreamId, message: JSONRPCMessage) -> EventId:
         event_id = str(uuid4())
         event_entry = EventEntry(
             event_id=event_id,stream_id=stream_id, message=message
         )
-        if stream_id not in self.streams:
-            self.streams[stream_id] = deque(maxlen=self.max_events_per_stream)
+        key = stream_key(stream_id)
+        if key not in self.streams:
+            self.streams[key] = deque(maxlen=self.max_events_per_stream)
         
-        if len(self.streams[stream_id]) ==self.max_events_per_stream:
-            oldest_event = self.streams[stream_id][0]
+        if len(self.streams[key]) ==self.max_events_per_stream:
+            oldest_event = self.streams[key][0]
             self.event_index.pop(oldest_event.event_id, None)
         
-        self.streams[stream_id].append(event_entry)
-        self.event_index[event_id] = event_entry
+        self.streams[key].append(event_entry)
+        self.event_index[event_id] = (key, event_entry)
         return event_id
 
     async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> None |StreamId:
         if last_event_id not in self.event_index:
             return None
-        last_event = self.event_index[last_event_id]
+        key, last_event = self.event_index[last_event_id]
         stream_id = last_event.stream_id
-        stream_events = self.streams.get(last_event.stream_id,deque())
+        stream_events = self.streams.get(key,deque())
 
         found_last = False
         for event in stream_events:
             if found_last:
-                await send_callback(EventMessage(event.event_id, event.message))
+                await send_callback(EventMessage(event.message, event.event_id))
             elif event.event_id == last_event_id:
                 found_last = True
         return stream_id
 
 class RedisEventStore(EventStore):
-    def __init__(self,max_events_per_stream=50):
+    """Event store shared by every worker and node pointing at the same Redis.
+
+    Events are kept per stream in a capped list and each event id is indexed
+    to its stream, so any worker can replay a stream written by another one.
+    Streams are namespaced by session, since every session numbers its
+    requests from 1.
+    """
+    def __init__(self,max_events_per_stream=50, ttl_seconds=60*30):
         self.max_events_per_stream = max_events_per_stream
-        redis_url = os.getenv("REDIS_ADDR")
-        redis_username = os.getenv("REDIS_USERNAME")
-        redis_password = os.getenv("REDIS_PASSWORD")
-        self.redis = redis.from_url(
-            f"redis://{redis_username}:{redis_password}@{redis_url}",
-            decode_responses=True
-        )
+        self.ttl_seconds = ttl_seconds
+        self._redis = None
+
+    @property
+    def redis(self):
+        # Import the client and open the connection pool on first use only
+        if self._redis is None:
+            import redis.asyncio as redis
+            redis_url = os.getenv("REDIS_ADDR")
+            redis_username = os.getenv("REDIS_USERNAME")
+            redis_password = os.getenv("REDIS_PASSWORD")
+            self._redis = redis.from_url(
+                f"redis://{redis_username}:{redis_password}@{redis_url}",
+                decode_responses=True
+            )
+        return self._redis
+
+    async def warm_up(self) -> None:
+        await self.redis.ping()
 
     async def store_event(self,stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+        start = time.perf_counter()
         event_id = str(uuid4())
-        event_key = f"stream:{stream_id}"
-        event_data = {
+        key = stream_key(stream_id)
+        event_key = f"stream:{key}"
+        event_data = json.dumps({
             "event_id": event_id,
-            "message": str(message)
-        }
-        # Check if key exists before setting TTL
-        key_exists = await self.redis.exists(event_key)
-        await self.redis.rpush(event_key, str(event_data))
-        await self.redis.expire(event_key, 60*30)  # TTL of half hour
-        await self.redis.ltrim(event_key, -self.max_events_per_stream, -1)
+            "message": message.model_dump(mode="json", by_alias=True, exclude_none=True),
+        })
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(event_key, event_data)
+            pipe.ltrim(event_key, -self.max_events_per_stream, -1)
+            pipe.expire(event_key, self.ttl_seconds)
+            pipe.set(f"event:{event_id}", key, ex=self.ttl_seconds)
+            await pipe.execute()
+        response = isinstance(getattr(message, "root", None), (JSONRPCResponse, JSONRPCError))
+        record_span(stream_id, "event store", time.perf_counter() - start, response=response)
         return event_id
     
     async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> None |StreamId:
-        keys = await self.redis.keys("stream:*")
-        for key in keys:
-            events = await self.redis.lrange(key, 0, -1)
-            found_last = False
-            for event_str in events:
-                event = eval(event_str)
-                if found_last:
-                    await send_callback(EventMessage(event["event_id"], eval(event["message"])))
-                elif event["event_id"] == last_event_id:
-                    found_last = True
+        key = await self.redis.get(f"event:{last_event_id}")
+        if key is None:
+            return None
+        stream_id = key.split(":", 1)[1]
+        events = await self.redis.lrange(f"stream:{key}", 0, -1)
+        found_last = False
+        for event_str in events:
+            event = json.loads(event_str)
             if found_last:
-                return key.split("stream:")[1]
-        return None
\ No newline at end of file
+                await send_callback(EventMessage(JSONRPCMessage.model_validate(event["message"]), event["event_id"]))
+            elif event["event_id"] == last_event_id:
+                found_last = True
+        return stream_id if found_last else None
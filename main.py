@@ -1,5 +1,8 @@
 from collections.abc import AsyncIterator
+import argparse
+import asyncio
 import contextlib
+import os
 from mcp.server.lowlevel import Server
 import mcp.types as types
 from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
@@ -7,26 +10,54 @@ from starlette.applications import Starlette
 from starlette.routing import Mount
 from pydantic import AnyUrl
 from starlette.types import Receive, Scope, Send
-from eventstore import InMemoryEventStore, RedisEventStore
-import uvicorn
 from dotenv import load_dotenv
-from Tools import market_data_tools,market_data_router,market_analysis_router,market_analysis_tools
-# from options_analysis import tools as options_tools  # Commented out as the module is unresolved
+# Before the local imports: Tools modules read their settings when imported
 load_dotenv()
+from eventstore import InMemoryEventStore, RedisEventStore
+import uvicorn
+from Tools import market_data_tools,market_data_router,market_analysis_router,market_analysis_tools,screener_tools,screener_router,predictions_tools,predictions_router,options_analysis_tools,options_analysis_router,strategies_tools,strategies_router,profiling_tools,profiling_router,warm_up
+from Tools.compute_pool import run_in_pool, shutdown_pool
+from Tools.corporate_actions import corporate_actions, REFRESH_INTERVAL
+from Tools.upstream import RequestStats, request_stats
+from Tools.cache import upstream_cache, PREFETCH_INTERVAL
+from Tools.profiling import profile_call
+from Tools.sessions import current_session, open_session
 
 app = Server("Finance MCP")
 
-@app.call_tool()
-async def call_tool(name: str, args:dict ) -> list[types.ContentBlock]:
-    # have multiple routers and try each one until one works: market_data_router, market_analysis_router
-    for router in [market_data_router, market_analysis_router]:
+async def route(name: str, args: dict) -> list[types.ContentBlock] | None:
+    # have multiple routers and try each one until one works: market_data_router, market_analysis_router, screener_router, predictions_router, options_analysis_router, strategies_router, profiling_router
+    for router in [market_data_router, market_analysis_router, screener_router, predictions_router, options_analysis_router, strategies_router, profiling_router]:
         try:
             return await router(name, args,app)
         except Exception as e:
             if not isinstance(e, ValueError):
                 raise
-            pass
-    return [types.TextContent(type="text", text=f"Tool {name} not found. Main router")]
+    return None
+
+@app.call_tool()
+async def call_tool(name: str, args:dict ) -> list[types.ContentBlock]:
+    # Collect the upstream calls made while serving this request, and profile it when asked to
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    try:
+        with profile_call(app, name, args) as capture:
+            result = await route(name, args)
+            if result is None:
+                return [types.TextContent(type="text", text=f"Tool {name} not found. Main router")]
+            if stats.calls:
+                ctx = app.request_context
+                await ctx.session.send_log_message(
+                    level="info",
+                    data=stats.summary(),
+                    logger="upstream",
+                    related_request_id=ctx.request_id,
+                )
+            if capture is not None:
+                capture.measure_serialization(result)
+            return result
+    finally:
+        request_stats.reset(token)
 
     
 @app.list_tools()
@@ -36,25 +67,92 @@ async def list_tools() ->list[types.Tool]:
         initial_list.extend(market_data_tools)
     if market_analysis_tools:
         initial_list.extend(market_analysis_tools)
+    if screener_tools:
+        initial_list.extend(screener_tools)
+    if predictions_tools:
+        initial_list.extend(predictions_tools)
+    if options_analysis_tools:
+        initial_list.extend(options_analysis_tools)
+    if strategies_tools:
+        initial_list.extend(strategies_tools)
+    if profiling_tools:
+        initial_list.extend(profiling_tools)
     return initial_list
 
-event_store = RedisEventStore() #Reliability for streamable HTTP 
+def env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Deployment settings. Several workers (or nodes behind a load balancer) can only
+# serve any request when no session state lives in a worker's memory, so
+# scale-out defaults to the stateless transport.
+HOST = os.getenv("MCP_HOST", "127.0.0.1")
+PORT = int(os.getenv("MCP_PORT", "8000"))
+WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+STATELESS = env_flag("MCP_STATELESS", WORKERS > 1)
+EVENT_STORE = os.getenv("MCP_EVENT_STORE", "redis").lower()
+WARMUP = env_flag("MCP_WARMUP", False)
+
+def build_event_store():
+    if STATELESS:
+        return None # Stateless requests are never resumed
+    if EVENT_STORE == "memory":
+        return InMemoryEventStore()
+    return RedisEventStore() #Reliability for streamable HTTP, shared across nodes
+
+event_store = build_event_store()
 
 session_manager = StreamableHTTPSessionManager(
     app=app,
     event_store = event_store,
     json_response=False, #Disable JSON response for streamable HTTP
+    stateless=STATELESS,
 )
 #ASGI handler 
 async def handle_streamable_http(scope: Scope, receive: Receive, send: Send) -> None:
-    await session_manager.handle_request(scope,receive,send)
+    if any(name == b"mcp-session-id" for name, _ in scope.get("headers", [])):
+        await session_manager.handle_request(scope,receive,send)
+        return
+    # Opens a session (or serves a stateless request): key what it starts
+    token = open_session()
+    try:
+        await session_manager.handle_request(scope,receive,send)
+    finally:
+        current_session.reset(token)
+
+async def run_warm_up() -> None:
+    try:
+        await asyncio.to_thread(warm_up)
+        await run_in_pool(warm_up) # Start a compute worker with the same modules loaded
+    except Exception as e:
+        print(f"Warm-up failed: {e}") # Modules load on first use instead
+    if isinstance(event_store, RedisEventStore):
+        try:
+            await event_store.warm_up()
+        except Exception as e:
+            print(f"Event store warm-up failed: {e}")
 
 @contextlib.asynccontextmanager
 async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    # Load heavy modules and connect in the background so startup is not delayed
+    warm_up_task = asyncio.create_task(run_warm_up()) if WARMUP else None
+    # Keep the stored dividends, splits and earnings dates of queried symbols fresh
+    refresh_task = asyncio.create_task(corporate_actions.refresh_loop()) if REFRESH_INTERVAL > 0 else None
+    # Refresh the most requested quotes, histories and option expiries before they expire
+    prefetch_task = asyncio.create_task(upstream_cache.prefetch_loop()) if PREFETCH_INTERVAL > 0 else None
     async with session_manager.run():
         try:
             yield
         finally:
+            background = [task for task in (warm_up_task, refresh_task, prefetch_task) if task is not None]
+            for task in background:
+                task.cancel()
+            # Wait for them to stop before the store and the pool they use are closed
+            await asyncio.gather(*background, return_exceptions=True)
+            corporate_actions.close()
+            shutdown_pool()
             print("Lifespan shutdown")
 
 starlette_app = Starlette(
@@ -67,6 +165,21 @@ starlette_app = Starlette(
 )
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Finance MCP streamable HTTP server")
+    parser.add_argument("--host", default=HOST, help="Interface to bind (MCP_HOST)")
+    parser.add_argument("--port", type=int, default=PORT, help="Port to bind (MCP_PORT)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Number of worker processes (MCP_WORKERS)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    uvicorn.run(starlette_app)
-    
+    cli_args = parse_args()
+    if cli_args.workers > 1:
+        # Workers re-import this module, so pass settings through the environment
+        os.environ["MCP_WORKERS"] = str(cli_args.workers)
+        if not env_flag("MCP_STATELESS", True):
+            raise SystemExit("MCP_STATELESS=false cannot be combined with multiple workers: sessions are held in worker memory.")
+        uvicorn.run("main:starlette_app", host=cli_args.host, port=cli_args.port, workers=cli_args.workers)
+    else:
+        uvicorn.run(starlette_app, host=cli_args.host, port=cli_args.port)
+
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from Tools import backtest
+from Tools.strategies import backtest_kernel
+
+COLUMN = {name: index for index, name in enumerate(backtest.METRICS)}
+
+
+def closes(symbols: int = 3, bars: int = 300, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (symbols, bars)), axis=1))
+    close[1, :40] = np.nan # Listed later than the others
+    return close
+
+
+def simple_returns(close: np.ndarray) -> np.ndarray:
+    returns = np.full_like(close, np.nan)
+    returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1.0
+    return returns
+
+
+def test_position_earns_the_next_bar_return():
+    returns = np.array([[np.nan, 0.01, 0.02, -0.03, 0.04, 0.05]])
+    position = np.zeros((1, 1, 6), dtype=np.int8)
+    position[..., 2] = 1 # Bought at the close of bar 2, sold at the close of bar 3
+    metrics = backtest.evaluate(position, returns)
+    assert metrics[0, 0, COLUMN["total_return"]] == pytest.approx(-0.03)
+    # The return of the bar a signal is taken on is never earned
+    changed = returns.copy()
+    changed[0, 2] = 0.5
+    assert backtest.evaluate(position, changed)[0, 0, COLUMN["total_return"]] == pytest.approx(-0.03)
+
+
+def test_positions_use_only_past_closes():
+    close = closes()
+    names, combos = backtest.parameter_grid("sma_cross", {"fast": [5], "slow": [20]})
+    arrays = {"close": close, **backtest.indicator_stacks(close, "sma_cross", names, combos)}
+    full = backtest.positions("sma_cross", arrays, names, combos)
+    cut = close[:, :200]
+    arrays = {"close": cut, **backtest.indicator_stacks(cut, "sma_cross", names, combos)}
+    assert np.array_equal(backtest.positions("sma_cross", arrays, names, combos), full[..., :200])
+
+
+def test_costs_are_charged_per_change_of_position():
+    returns = np.array([[np.nan, 0.01, 0.02, -0.01, 0.03]])
+    position = np.array([[[0, 1, 1, 0, 0]]], dtype=np.int8)
+    cost = 0.001
+    metrics = backtest.evaluate(position, returns, cost)
+    assert metrics[0, 0, COLUMN["total_return"]] == pytest.approx((1 - cost) * (1 + 0.02) * (1 - 0.01 - cost) - 1)
+    assert metrics[0, 0, COLUMN["trades"]] == 2
+    # Reversing a short into a long trades two units
+    flip = np.array([[[0, -1, 1, 1, 0]]], dtype=np.int8)
+    free = backtest.evaluate(flip, returns)[0, 0, COLUMN["total_return"]]
+    charged = backtest.evaluate(flip, returns, cost)[0, 0, COLUMN["total_return"]]
+    assert charged < free
+    assert (1 + free) - (1 + charged) == pytest.approx(4 * cost, rel=0.05)
+
+
+@pytest.mark.parametrize("strategy", list(backtest.STRATEGIES))
+def test_leading_nans_hold_no_position(strategy):
+    close = closes()
+    names, combos = backtest.parameter_grid(strategy)
+    arrays = {"close": close, **backtest.indicator_stacks(close, strategy, names, combos)}
+    position = backtest.positions(strategy, arrays, names, combos, allow_short=True)
+    assert not position[:, 1, :40].any()
+    metrics = backtest.evaluate(position, simple_returns(close))
+    assert np.isfinite(metrics).all()
+    # Exposure counts only the bars the late symbol traded
+    assert (metrics[:, :, COLUMN["exposure"]] <= 1.0).all()
+
+
+@pytest.mark.parametrize("strategy", list(backtest.STRATEGIES))
+def test_chunked_kernel_matches_one_chunk(strategy, monkeypatch):
+    close = closes()
+    names, combos = backtest.parameter_grid(strategy)
+    arrays = {"close": close, "returns": simple_returns(close), "combos": combos}
+    arrays.update(backtest.indicator_stacks(close, strategy, names, combos))
+
+    def run(chunk: int) -> np.ndarray:
+        out = {**arrays, "metrics": np.empty((len(combos), close.shape[0], len(backtest.METRICS)))}
+        # Two jobs, as shards of the pool would split the grid
+        middle = len(combos) // 2
+        backtest_kernel(out, 0, middle, strategy, names, True, 0.0005, chunk)
+        backtest_kernel(out, middle, len(combos), strategy, names, True, 0.0005, chunk)
+        return out["metrics"]
+
+    whole = run(len(combos))
+    monkeypatch.setattr(backtest, "MAX_CHUNK_ELEMENTS", 2 * close.size)
+    chunk = backtest.chunk_combinations(*close.shape)
+    assert chunk == 2
+    assert np.array_equal(run(chunk), whole)
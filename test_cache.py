@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+import pytest
+from Tools import cache as module
+from Tools.trading_calendar import NEW_YORK
+
+
+class SlowUpstream:
+    """Stands in for the upstream scheduler, with fetches that wait to be released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def call(self, fn, *args, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return f"value {self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_break_shared_fetch(monkeypatch):
+    upstream = SlowUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    cache = module.UpstreamCache()
+    fetching = asyncio.create_task(cache.get("quote", "AAPL"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(cache.get("quote", "AAPL"))
+    other = asyncio.create_task(cache.get("quote", "AAPL"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    assert await fetching == "value 1"
+    assert await other == "value 1"
+    assert waiting.cancelled()
+    assert upstream.calls == 1
+    assert cache.entries[("quote", "AAPL")].value == "value 1"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_initiator_does_not_fail_the_waiters(monkeypatch):
+    upstream = SlowUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    cache = module.UpstreamCache()
+    # The client that started the fetch disconnects
+    initiating = asyncio.create_task(cache.get("quote", "AAPL"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(cache.get("quote", "AAPL"))
+    await asyncio.sleep(0)
+    initiating.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    assert await waiting == "value 1"
+    assert initiating.cancelled()
+    assert upstream.calls == 1
+    assert cache.entries[("quote", "AAPL")].value == "value 1"
+    assert not cache._refreshing
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_break_revalidation(monkeypatch):
+    upstream = SlowUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    cache = module.UpstreamCache()
+    cache.entries[("quote", "AAPL")] = module.CacheEntry("old", 0.0, 0.0)
+    # An expired entry past its stale limit waits on the fetch, which the background revalidation shares
+    cache.revalidate(("quote", "AAPL"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(cache.serve("quote", "AAPL"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    await asyncio.gather(*cache._revalidations)
+    assert waiting.cancelled()
+    assert cache.entries[("quote", "AAPL")].value == "value 1"
+
+
+@pytest.mark.asyncio
+async def test_weekend_crypto_quote_lives_the_quote_ttl(monkeypatch):
+    upstream = SlowUpstream()
+    upstream.release.set()
+    monkeypatch.setattr(module, "upstream", upstream)
+    saturday = datetime.datetime(2025, 6, 14, 12, 0, tzinfo=NEW_YORK).timestamp()
+    monkeypatch.setattr(module.time, "time", lambda: saturday)
+    cache = module.UpstreamCache()
+    await cache.get("quote", "BTC-USD")
+    await cache.get("quote", "AAPL")
+    assert cache.entries[("quote", "BTC-USD")].expires_at == saturday + module.QUOTE_TTL
+    # US listings stay final until the Monday open
+    assert cache.entries[("quote", "AAPL")].expires_at == datetime.datetime(2025, 6, 16, 9, 30, tzinfo=NEW_YORK).timestamp()
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import threading
+import time
+import numpy as np
+import pytest
+from Tools import compute_pool
+
+
+def where_kernel(arrays: dict, row: int) -> tuple[int, int]:
+    """Records the process and thread each shard ran on."""
+    arrays["out"][row] = row
+    return os.getpid(), threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_small_job_runs_in_process_off_the_event_loop():
+    results, outputs = await compute_pool.run_sharded(where_kernel, [(0,), (1,)], inputs={"x": np.zeros(4)}, outputs={"out": ((2,), "float64")})
+    assert {pid for pid, _ in results} == {os.getpid()}
+    assert threading.get_ident() not in {thread for _, thread in results}
+    assert outputs["out"].tolist() == [0.0, 1.0]
+
+
+@pytest.mark.asyncio
+async def test_work_estimate_sends_small_arrays_to_the_pool():
+    try:
+        results, outputs = await compute_pool.run_sharded(
+            where_kernel, [(0,), (1,)], inputs={"x": np.zeros(4)}, outputs={"out": ((2,), "float64")},
+            work=compute_pool.INLINE_MAX_ELEMENTS + 1,
+        )
+    finally:
+        compute_pool.shutdown_pool()
+    assert os.getpid() not in {pid for pid, _ in results}
+    assert outputs["out"].tolist() == [0.0, 1.0]
+
+
+def slow_kernel(arrays: dict, stopped: threading.Event) -> None:
+    """Works in small steps until cancelled."""
+    try:
+        for _ in range(500):
+            compute_pool.check_cancelled()
+            time.sleep(0.01)
+    except compute_pool.JobCancelled:
+        stopped.set()
+        raise
+
+
+@pytest.mark.asyncio
+async def test_small_job_times_out_and_stops():
+    stopped = threading.Event()
+    with pytest.raises(TimeoutError):
+        await compute_pool.run_sharded(slow_kernel, [(stopped,)], inputs={"x": np.zeros(4)}, timeout=0.05)
+    assert await asyncio.to_thread(stopped.wait, 1.0)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_small_job_stops():
+    stopped = threading.Event()
+    job = asyncio.create_task(compute_pool.run_sharded(slow_kernel, [(stopped,)], inputs={"x": np.zeros(4)}))
+    await asyncio.sleep(0.05)
+    job.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await job
+    assert await asyncio.to_thread(stopped.wait, 1.0)
@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+import pytest
+from Tools import corporate_actions as module
+
+
+class SlowUpstream:
+    """Stands in for the upstream scheduler, with one fetch that waits to be released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def call(self, fn, *args, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return {"dividend": [("2024-05-10", 0.25, None)]}, []
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_break_shared_refresh(monkeypatch, tmp_path):
+    upstream = SlowUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    store = module.CorporateActionsStore(path=str(tmp_path / "actions.sqlite3"))
+    fetching = asyncio.create_task(store.refresh("AAPL"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(store.refresh("AAPL"))
+    other = asyncio.create_task(store.refresh("AAPL"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    await fetching
+    await other
+    assert waiting.cancelled()
+    assert upstream.calls == 1
+    assert [row["symbol"] for row in store.query(["dividend"], "2024-01-01", "2024-12-31", ["AAPL"])] == ["AAPL"]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_initiator_does_not_fail_the_waiters(monkeypatch, tmp_path):
+    upstream = SlowUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    store = module.CorporateActionsStore(path=str(tmp_path / "actions.sqlite3"))
+    initiating = asyncio.create_task(store.refresh("AAPL"))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(store.refresh("AAPL"))
+    await asyncio.sleep(0)
+    initiating.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    await waiting
+    assert initiating.cancelled()
+    assert upstream.calls == 1
+    assert [row["symbol"] for row in store.query(["dividend"], "2024-01-01", "2024-12-31", ["AAPL"])] == ["AAPL"]
+    store.close()
+
+
+class FailingUpstream:
+    def __init__(self):
+        self.calls = 0
+
+    async def call(self, fn, *args, **kwargs):
+        self.calls += 1
+        raise ValueError("No data found, symbol may be delisted")
+
+
+@pytest.mark.asyncio
+async def test_failed_symbol_waits_for_its_retry_time(monkeypatch, tmp_path):
+    upstream = FailingUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    now = 1_700_000_000.0
+    monkeypatch.setattr(module.time, "time", lambda: now)
+    store = module.CorporateActionsStore(path=str(tmp_path / "actions.sqlite3"), retry_after=300)
+    assert await store.ensure_fresh(["GONE"]) == {"GONE": "No data found, symbol may be delisted"}
+    # Reported from the store until the retry time, without another fetch
+    assert await store.ensure_fresh(["GONE"]) == {"GONE": "No data found, symbol may be delisted"}
+    assert upstream.calls == 1
+    now += 301
+    await store.ensure_fresh(["GONE"])
+    assert upstream.calls == 2
+    # The second failure in a row waits twice as long
+    now += 301
+    await store.ensure_fresh(["GONE"])
+    assert upstream.calls == 2
+    now += 300
+    await store.ensure_fresh(["GONE"])
+    assert upstream.calls == 3
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_success_clears_the_failure(monkeypatch, tmp_path):
+    upstream = FailingUpstream()
+    monkeypatch.setattr(module, "upstream", upstream)
+    store = module.CorporateActionsStore(path=str(tmp_path / "actions.sqlite3"), retry_after=0)
+    await store.ensure_fresh(["AAPL"])
+    upstream = SlowUpstream()
+    upstream.release.set()
+    monkeypatch.setattr(module, "upstream", upstream)
+    assert await store.ensure_fresh(["AAPL"]) == {}
+    assert store.failing_symbols(["AAPL"]) == {}
+    assert store.stale_symbols(["AAPL"]) == []
+    store.close()
+
+
+def test_query_with_more_symbols_than_sqlite_parameters(tmp_path):
+    store = module.CorporateActionsStore(path=str(tmp_path / "actions.sqlite3"))
+    # The limit of older SQLite builds; newer ones allow 32766
+    store.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    symbols = [f"S{number:05d}" for number in range(40_000)]
+    store._write("S39999", {"dividend": [("2024-05-10", 0.25, None)]}, [])
+    store._write("OTHER", {"dividend": [("2024-05-10", 0.5, None)]}, [])
+    rows = store.query(["dividend"], "2024-01-01", "2024-12-31", symbols)
+    assert [row["symbol"] for row in rows] == ["S39999"]
+    assert len(store.query(["dividend"], "2024-01-01", "2024-12-31")) == 2
+    store.close()
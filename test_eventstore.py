@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from mcp.types import JSONRPCMessage, JSONRPCNotification, JSONRPCResponse
+from eventstore import InMemoryEventStore, RedisEventStore
+from Tools.sessions import open_session
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args))
+
+    async def execute(self):
+        for name, args in self.commands:
+            await getattr(self.redis, name)(*args)
+
+
+class FakeRedis:
+    """The list and string commands of redis.asyncio the event store uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+
+    async def ltrim(self, key, start, end):
+        self.data[key] = self.data[key][start:] if end == -1 else self.data[key][start:end + 1]
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+
+def progress(text: str) -> JSONRPCMessage:
+    return JSONRPCMessage(JSONRPCNotification(jsonrpc="2.0", method="notifications/message", params={"data": text}))
+
+
+def response(text: str) -> JSONRPCMessage:
+    return JSONRPCMessage(JSONRPCResponse(jsonrpc="2.0", id=1, result={"text": text}))
+
+
+def redis_store() -> RedisEventStore:
+    store = RedisEventStore()
+    store._redis = FakeRedis()
+    return store
+
+
+@pytest.mark.parametrize("make_store", [InMemoryEventStore, redis_store])
+@pytest.mark.asyncio
+async def test_replay_stays_within_the_session(make_store):
+    store = make_store()
+
+    async def session(name: str) -> str:
+        # Both clients' first request is id 1, so both write to stream "1"
+        open_session()
+        first = await store.store_event("1", progress(f"{name} started"))
+        await asyncio.sleep(0)
+        await store.store_event("1", response(f"{name} done"))
+        return first
+
+    first_a, first_b = await asyncio.gather(session("a"), session("b"))
+    for first, name in ((first_a, "a"), (first_b, "b")):
+        replayed = []
+
+        async def send(event):
+            replayed.append(event.message.root.result["text"])
+
+        assert await store.replay_events_after(first, send) == "1"
+        assert replayed == [f"{name} done"]
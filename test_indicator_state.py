@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Tools.indicators import compute_indicators, INDICATOR_OUTPUTS
+from Tools.indicator_state import IndicatorState, IndicatorStateStore, RunningEMA, RunningWindow, RunningExtreme
+
+ALL = list(INDICATOR_OUTPUTS)
+
+
+def ohlc(length: int = 400, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.015, length)))
+    spread = np.abs(rng.normal(0, 0.01, length)) * close
+    index = pd.date_range("2024-01-02", periods=length, freq="B")
+    return pd.DataFrame({"High": close + spread, "Low": close - spread, "Close": close}, index=index)
+
+
+def full(bars: pd.DataFrame) -> dict[str, np.ndarray]:
+    return compute_indicators(bars["Close"].to_numpy(), bars["High"].to_numpy(), bars["Low"].to_numpy(), indicators=ALL)
+
+
+def assert_matches(incremental: dict[str, float], expected: dict[str, np.ndarray], row: int) -> None:
+    for name, series in expected.items():
+        assert incremental[name] == pytest.approx(series[row], rel=1e-10, abs=1e-10, nan_ok=True), (name, row)
+
+
+def test_running_accumulators_match_pandas():
+    values = ohlc()["Close"]
+    ema, window, highest, lowest = RunningEMA(2.0 / 21, 20), RunningWindow(20), RunningExtreme(14, True), RunningExtreme(14, False)
+    expected_ema = values.ewm(span=20, adjust=False, min_periods=20).mean().to_numpy()
+    expected_mean = values.rolling(20).mean().to_numpy()
+    expected_std = values.rolling(20).std(ddof=0).to_numpy()
+    expected_max = values.rolling(14).max().to_numpy()
+    expected_min = values.rolling(14).min().to_numpy()
+    for row, value in enumerate(values.to_numpy()):
+        assert ema.update(value) == pytest.approx(expected_ema[row], rel=1e-12, nan_ok=True)
+        window.update(value)
+        if window.ready():
+            assert window.mean == pytest.approx(expected_mean[row], rel=1e-12)
+            assert window.std() == pytest.approx(expected_std[row], rel=1e-9)
+        highest.update(value)
+        lowest.update(value)
+        assert highest.current() == pytest.approx(expected_max[row], nan_ok=True)
+        assert lowest.current() == pytest.approx(expected_min[row], nan_ok=True)
+
+
+@pytest.mark.parametrize("params", [None, {"rsi_window": 7, "bb_window": 10, "bb_dev": 1.5, "stoch_smooth": 5}])
+def test_state_matches_compute_indicators_on_every_bar(params):
+    bars = ohlc()
+    expected = compute_indicators(bars["Close"].to_numpy(), bars["High"].to_numpy(), bars["Low"].to_numpy(), indicators=ALL, params=params)
+    state = IndicatorState(params)
+    for row, (timestamp, high, low, close) in enumerate(zip(bars.index, bars["High"], bars["Low"], bars["Close"])):
+        assert_matches(state.update(timestamp, high, low, close), expected, row)
+
+
+@pytest.mark.asyncio
+async def test_latest_updates_incrementally():
+    bars = ohlc()
+    shown = {"rows": 300}
+
+    async def fetch(symbol, period, interval):
+        return bars.iloc[:shown["rows"]] if period == "2y" else bars.iloc[max(0, shown["rows"] - 21):shown["rows"]]
+
+    store = IndicatorStateStore()
+    values, recomputed = await store.latest("AAPL", "1d", "2y", None, fetch)
+    assert recomputed
+    assert_matches(values, full(bars.iloc[:300]), 299)
+    for rows in (301, 310, 325):
+        shown["rows"] = rows
+        values, recomputed = await store.latest("AAPL", "1d", "2y", None, fetch)
+        assert not recomputed
+        assert_matches(values, full(bars.iloc[:rows]), rows - 1)
+    # The recent bars no longer reach the committed state
+    shown["rows"] = 400
+    values, recomputed = await store.latest("AAPL", "1d", "2y", None, fetch)
+    assert recomputed
+    assert_matches(values, full(bars), 399)
+    assert (store.full_recomputes, store.incremental_updates) == (2, 3)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import ta
+from Tools.indicators import compute_indicators
+
+
+def closes(length: int = 300, seed: int = 9) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    values = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    return pd.Series(values, index=pd.date_range("2024-01-02", periods=length, freq="B"))
+
+
+def reference(close: pd.Series) -> dict[str, np.ndarray]:
+    macd = ta.trend.MACD(close, window_slow=26, window_fast=12, window_sign=9, fillna=False)
+    bands = ta.volatility.BollingerBands(close, window=20, window_dev=2, fillna=False)
+    series = {
+        "RSI": ta.momentum.RSIIndicator(close, window=14, fillna=False).rsi(),
+        "MACD": macd.macd(),
+        "MACD_SIGNAL": macd.macd_signal(),
+        "MACD_HIST": macd.macd_diff(),
+        "BB_HIGH": bands.bollinger_hband(),
+        "BB_MID": bands.bollinger_mavg(),
+        "BB_LOW": bands.bollinger_lband(),
+        "SMA": ta.trend.SMAIndicator(close, window=20, fillna=False).sma_indicator(),
+        "EMA": ta.trend.EMAIndicator(close, window=20, fillna=False).ema_indicator(),
+    }
+    return {name: values.to_numpy() for name, values in series.items()}
+
+
+def assert_matches(result: dict[str, np.ndarray], expected: dict[str, np.ndarray]) -> None:
+    for name, values in expected.items():
+        assert np.array_equal(np.isnan(result[name]), np.isnan(values)), name
+        assert np.allclose(result[name], values, rtol=1e-9, atol=1e-9, equal_nan=True), name
+
+
+def test_matches_ta():
+    close = closes()
+    result = compute_indicators(close.to_numpy(), indicators=("RSI", "MACD", "BB", "SMA", "EMA"))
+    assert_matches(result, reference(close))
+
+
+def test_stacked_symbols_with_shorter_histories_match_ta():
+    # The second symbol listed 80 bars later, the third has a flat stretch with no losses
+    full, late = closes(seed=1), closes(seed=2)
+    flat = closes(seed=3)
+    flat.iloc[100:140] = flat.iloc[100]
+    stacked = np.vstack([full.to_numpy(), np.r_[np.full(80, np.nan), late.to_numpy()[80:]], flat.to_numpy()])
+    result = compute_indicators(stacked, indicators=("RSI", "MACD", "BB", "SMA", "EMA"))
+    for row, close in enumerate([full, late.iloc[80:], flat]):
+        expected = reference(close)
+        offset = len(full) - len(close)
+        assert np.isnan(np.column_stack([result[name][row, :offset] for name in expected])).all()
+        assert_matches({name: result[name][row, offset:] for name in expected}, expected)
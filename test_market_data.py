@@ -0,0 +1,57 @@
+import datetime
+import numpy as np
+import pandas as pd
+from Tools.market_data import filter_contracts, select_expirations
+
+
+def chain(spot: float = 100.0) -> pd.DataFrame:
+    strikes = np.arange(70.0, 131.0, 5.0)
+    return pd.DataFrame({
+        "contractSymbol": [f"TEST240621C{int(strike * 1000):08d}" for strike in strikes],
+        "strike": strikes,
+        "lastPrice": np.maximum(spot - strikes, 0.0) + 1.0,
+        "bid": np.maximum(spot - strikes, 0.0) + 0.9,
+        "ask": np.maximum(spot - strikes, 0.0) + 1.1,
+        # Strike 95 never traded, strike 110 has no open interest reported
+        "volume": [10, 20, 30, 40, 50, np.nan, 70, 80, 90, 100, 110, 120, 130],
+        "openInterest": [100, 200, 300, 400, 500, 600, 700, 800, np.nan, 1000, 1100, 1200, 1300],
+        "impliedVolatility": 0.3,
+        "inTheMoney": strikes < spot,
+        "change": 0.0,
+    })
+
+
+def test_moneyness_bounds_are_inclusive():
+    contracts = filter_contracts(chain(), 100.0, 0.9, 1.1, 0, 0, 50)
+    assert [contract["strike"] for contract in contracts] == [90.0, 95.0, 100.0, 105.0, 110.0]
+    assert [contract["moneyness"] for contract in contracts] == [0.9, 0.95, 1.0, 1.05, 1.1]
+    assert set(contracts[0]) == {"contractSymbol", "strike", "lastPrice", "bid", "ask", "volume", "openInterest", "impliedVolatility", "inTheMoney", "moneyness"}
+
+
+def test_missing_volume_and_open_interest_count_as_zero():
+    contracts = filter_contracts(chain(), 100.0, 0.5, 1.5, 1, 1, 50)
+    assert 95.0 not in [contract["strike"] for contract in contracts]
+    assert 110.0 not in [contract["strike"] for contract in contracts]
+    contracts = filter_contracts(chain(), 100.0, 0.5, 1.5, 85, 1000, 50)
+    assert [contract["strike"] for contract in contracts] == [115.0, 120.0, 125.0, 130.0]
+
+
+def test_max_strikes_keeps_those_nearest_the_money_by_strike():
+    contracts = filter_contracts(chain(), 102.0, 0.5, 1.5, 0, 0, 3)
+    assert [contract["strike"] for contract in contracts] == [95.0, 100.0, 105.0]
+
+
+def test_empty_chain():
+    assert filter_contracts(None, 100.0, 0.9, 1.1, 0, 0, 10) == []
+    assert filter_contracts(chain().iloc[:0], 100.0, 0.9, 1.1, 0, 0, 10) == []
+
+
+def test_select_expirations():
+    today = datetime.date.today()
+    expirations = tuple((today + datetime.timedelta(days=days)).isoformat() for days in (-7, 0, 7, 14, 45, 90))
+    assert select_expirations(expirations, 2, None, None) == list(expirations[1:3])
+    assert select_expirations(expirations, 10, None, None) == list(expirations[1:])
+    # A range ignores nearest; without an end it covers 30 days from the start
+    assert select_expirations(expirations, 1, today + datetime.timedelta(days=1), None) == list(expirations[2:4])
+    assert select_expirations(expirations, 1, today - datetime.timedelta(days=10), today + datetime.timedelta(days=45)) == list(expirations[:5])
+    assert select_expirations(expirations, 1, None, today + datetime.timedelta(days=7)) == list(expirations[1:3])
@@ -0,0 +1,62 @@
+import math
+import numpy as np
+import pytest
+from Tools import options_analysis as module
+
+COLUMN = {name: index for index, name in enumerate(module.GREEK_COLUMNS)}
+
+
+def greeks(strike, volatility, spot, years, rate, dividend_yield, is_call):
+    strike = np.atleast_1d(np.asarray(strike, dtype=float))
+    arrays = {
+        "strike": strike,
+        "volatility": np.broadcast_to(np.asarray(volatility, dtype=float), strike.shape).copy(),
+        "greeks": np.empty((len(strike), len(module.GREEK_COLUMNS))),
+    }
+    module.greeks_kernel(arrays, 0, len(strike), spot, years, rate, dividend_yield, is_call)
+    return arrays["greeks"]
+
+
+def price(spot=42.0, years=0.5, rate=0.1, volatility=0.2, dividend_yield=0.0, is_call=True, strike=40.0):
+    return greeks(strike, volatility, spot, years, rate, dividend_yield, is_call)[0, COLUMN["theoretical_price"]]
+
+
+def test_normal_cdf_matches_erf():
+    x = np.linspace(-8, 8, 2001)
+    exact = np.array([0.5 * math.erfc(-value / math.sqrt(2.0)) for value in x])
+    assert np.abs(module._normal_cdf(x) - exact).max() < 1e-7
+
+
+def test_textbook_prices():
+    # Hull, Options, Futures and Other Derivatives, example 15.6
+    assert price(is_call=True) == pytest.approx(4.76, abs=0.005)
+    assert price(is_call=False) == pytest.approx(0.81, abs=0.005)
+
+
+@pytest.mark.parametrize("dividend_yield", [0.0, 0.03])
+def test_put_call_parity(dividend_yield):
+    strikes = np.linspace(50, 150, 21)
+    spot, years, rate = 100.0, 0.75, 0.04
+    calls = greeks(strikes, 0.3, spot, years, rate, dividend_yield, True)
+    puts = greeks(strikes, 0.3, spot, years, rate, dividend_yield, False)
+    forward = spot * math.exp(-dividend_yield * years) - strikes * math.exp(-rate * years)
+    assert np.allclose(calls[:, COLUMN["theoretical_price"]] - puts[:, COLUMN["theoretical_price"]], forward, atol=1e-5)
+    assert np.allclose(calls[:, COLUMN["delta"]] - puts[:, COLUMN["delta"]], math.exp(-dividend_yield * years))
+    assert np.allclose(calls[:, COLUMN["gamma"]], puts[:, COLUMN["gamma"]])
+    assert np.allclose(calls[:, COLUMN["vega"]], puts[:, COLUMN["vega"]])
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+def test_greeks_match_finite_differences(is_call):
+    base = {"spot": 100.0, "years": 0.5, "rate": 0.05, "volatility": 0.25, "dividend_yield": 0.02, "is_call": is_call, "strike": 105.0}
+    row = greeks(base["strike"], base["volatility"], base["spot"], base["years"], base["rate"], base["dividend_yield"], is_call)[0]
+
+    def bump(name, step):
+        return (price(**{**base, name: base[name] + step}) - price(**{**base, name: base[name] - step})) / (2 * step)
+
+    assert row[COLUMN["delta"]] == pytest.approx(bump("spot", 0.01), abs=1e-4)
+    assert row[COLUMN["gamma"]] == pytest.approx((price(**{**base, "spot": 100.5}) - 2 * price(**base) + price(**{**base, "spot": 99.5})) / 0.25, abs=1e-4)
+    # Per one percentage point, and per calendar day of time passing
+    assert row[COLUMN["vega"]] == pytest.approx(bump("volatility", 1e-3) / 100, abs=1e-4)
+    assert row[COLUMN["rho"]] == pytest.approx(bump("rate", 1e-3) / 100, abs=1e-4)
+    assert row[COLUMN["theta"]] == pytest.approx(-bump("years", 1e-3) / 365, abs=1e-4)
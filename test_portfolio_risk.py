@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Tools import market_analysis
+from Tools import portfolio_risk
+
+
+def daily_returns(days: int = 250, assets: int = 3, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0005, 0.015, (days, assets))
+
+
+def simulation(paths: int, jobs: list[tuple[int, int]], chunk_paths: int, seed: int = 42) -> np.ndarray:
+    returns = daily_returns()
+    log_returns = np.log1p(returns)
+    arrays = {
+        "mean": log_returns.mean(axis=0),
+        "factor": portfolio_risk.covariance_factor(np.cov(log_returns, rowvar=False)),
+        "weights": np.array([0.5, 0.3, 0.2]),
+    }
+    tail = portfolio_risk.tail_size(paths, [0.95, 0.99])
+    arrays["worst"] = np.empty((len(jobs), tail))
+    for row, (chunk_start, chunk_end) in enumerate(jobs):
+        market_analysis.monte_carlo_kernel(arrays, row, chunk_start, chunk_end, chunk_paths, paths, 5, seed)
+    return arrays["worst"]
+
+
+def all_returns(paths: int, chunk_paths: int, seed: int = 42) -> np.ndarray:
+    returns = daily_returns()
+    log_returns = np.log1p(returns)
+    mean, factor = log_returns.mean(axis=0), portfolio_risk.covariance_factor(np.cov(log_returns, rowvar=False))
+    chunks = [
+        portfolio_risk.simulate_chunk(mean, factor, np.array([0.5, 0.3, 0.2]), 5, min(chunk_paths, paths - start), seed, chunk)
+        for chunk, start in enumerate(range(0, paths, chunk_paths))
+    ]
+    return np.concatenate(chunks)
+
+
+def test_seeded_simulation_is_reproducible_across_job_splits():
+    paths, chunk_paths = 10_000, 1_000
+    one_job = simulation(paths, [(0, 10)], chunk_paths)
+    three_jobs = simulation(paths, [(0, 3), (3, 7), (7, 10)], chunk_paths)
+    risks = portfolio_risk.tail_risk(-one_job.ravel(), [0.95, 0.99], scenarios=paths)
+    assert risks == portfolio_risk.tail_risk(-three_jobs.ravel(), [0.95, 0.99], scenarios=paths)
+    assert risks == portfolio_risk.tail_risk(-simulation(paths, [(0, 10)], chunk_paths).ravel(), [0.95, 0.99], scenarios=paths)
+    assert risks != portfolio_risk.tail_risk(-simulation(paths, [(0, 10)], chunk_paths, seed=7).ravel(), [0.95, 0.99], scenarios=paths)
+    # The kept tail gives the same VaR and CVaR as all simulated returns
+    full = portfolio_risk.tail_risk(all_returns(paths, chunk_paths), [0.95, 0.99])
+    assert risks == pytest.approx(full, rel=1e-12)
+
+
+def test_historical_var_matches_np_quantile():
+    returns = daily_returns()
+    weights = np.array([0.5, 0.3, 0.2])
+    scenarios = portfolio_risk.horizon_returns(returns, weights)
+    assert np.allclose(scenarios, returns @ weights)
+    losses = -scenarios
+    for confidence, (var, cvar) in zip([0.9, 0.95, 0.99], portfolio_risk.tail_risk(scenarios, [0.9, 0.95, 0.99])):
+        assert var == pytest.approx(np.quantile(losses, confidence), rel=1e-12)
+        assert cvar == pytest.approx(losses[losses >= var].mean(), rel=1e-12)
+
+
+@pytest.mark.parametrize("scenarios", [50, 1001, 5000])
+def test_tail_of_losses_matches_all_losses(scenarios):
+    returns = np.random.default_rng(3).normal(0, 0.02, scenarios)
+    confidences = [0.9, 0.975, 0.99]
+    tail = portfolio_risk.tail_size(scenarios, confidences)
+    worst = portfolio_risk.keep_worst(np.empty(0), -returns[: scenarios // 2], tail)
+    worst = portfolio_risk.keep_worst(worst, -returns[scenarios // 2:], tail)
+    assert len(worst) == tail
+    expected = portfolio_risk.tail_risk(returns, confidences)
+    assert portfolio_risk.tail_risk(-worst, confidences, scenarios=scenarios) == pytest.approx(expected, rel=1e-12)
+
+
+def test_horizon_returns_compound_each_asset():
+    returns = np.array([[0.1, 0.0], [0.1, -0.5], [0.0, 1.0]])
+    weights = np.array([0.5, 0.5])
+    assert np.allclose(portfolio_risk.horizon_returns(returns, weights, 2), [0.5 * 0.21 + 0.5 * -0.5, 0.5 * 0.1 + 0.5 * 0.0])
+
+
+class FakeSession:
+    async def send_log_message(self, **kwargs):
+        pass
+
+
+class FakeApp:
+    class request_context:
+        session = FakeSession()
+        request_id = 1
+
+
+@pytest.fixture
+def histories(monkeypatch):
+    returns = daily_returns()
+    dates = pd.bdate_range("2024-01-02", periods=len(returns) + 1)
+    closes = 100 * np.vstack([np.ones(3), np.cumprod(1 + returns, axis=0)])
+    frames = {symbol: pd.DataFrame({"Close": closes[:, column]}, index=dates) for column, symbol in enumerate(["AAA", "BBB", "CCC"])}
+
+    async def fetch_histories(symbols, period):
+        return {symbol: frames[symbol] for symbol in symbols}, {}
+
+    monkeypatch.setattr(market_analysis, "fetch_histories", fetch_histories)
+
+
+@pytest.mark.asyncio
+async def test_portfolio_var_is_reproducible(histories):
+    args = {"holdings": {"AAA": 0.5, "BBB": 0.3, "CCC": 0.2}, "method": "monte_carlo", "paths": 5000, "seed": 3}
+    first = await market_analysis.calculate_portfolio_var(FakeApp, args)
+    second = await market_analysis.calculate_portfolio_var(FakeApp, args)
+    assert "Monte Carlo simulation (5000 paths, seed 3)" in first[0].text
+    assert first[0].text == second[0].text
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("args, error", [
+    ({"method": "bootstrap"}, "Unknown method bootstrap"),
+    ({"seed": -1}, "Seed must be a non-negative integer"),
+])
+async def test_portfolio_var_rejects_invalid_arguments(histories, args, error):
+    result = await market_analysis.calculate_portfolio_var(FakeApp, {"holdings": {"AAA": 1.0}, **args})
+    assert error in result[0].text
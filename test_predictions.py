@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Tools.predictions import ModelCache
+
+
+def garch_returns(length: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    variance, returns = 1e-4, []
+    for _ in range(length):
+        returns.append(np.sqrt(variance) * rng.standard_normal())
+        variance = 2e-6 + 0.08 * returns[-1] ** 2 + 0.9 * variance
+    return 0.0005 + np.array(returns)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model, config", [
+    ("garch", {"period": "2y"}),
+    ("ewma", {"period": "2y"}),
+    ("ar", {"period": "2y", "lags": 5}),
+])
+async def test_new_bar_warm_starts(model, config):
+    returns = garch_returns(505)
+    dates = pd.bdate_range("2024-01-02", periods=len(returns))
+    cache = ModelCache()
+    _, first = await cache.fitted("TEST", model, config, dates[:-1], returns[:-1])
+    _, again = await cache.fitted("TEST", model, config, dates[:-1], returns[:-1])
+    # One bar later the window drops its first bar and adds one, as a rolling period does
+    entry, second = await cache.fitted("TEST", model, config, dates[1:], returns[1:])
+    assert (first, again, second) == ("full fit", "cached", "warm start")
+    if model != "ar":
+        # The warm started fit reaches the optimum of a fit from scratch
+        cold, mode = await ModelCache().fitted("TEST", model, config, dates[1:], returns[1:])
+        assert mode == "full fit"
+        assert entry.params["log_likelihood"] == pytest.approx(cold.params["log_likelihood"], abs=1e-3)
+
+
+class FakeSession:
+    async def send_log_message(self, **kwargs):
+        pass
+
+
+class FakeApp:
+    class request_context:
+        session = FakeSession()
+        request_id = 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model", ["garch", "ewma"])
+async def test_forecast_volatility_warm_starts_on_next_bar(monkeypatch, model):
+    from Tools import predictions
+    returns = garch_returns(505)
+    dates = pd.bdate_range("2024-01-02", periods=len(returns))
+    windows = iter([(dates[:-1], returns[:-1]), (dates[1:], returns[1:])])
+
+    async def fetch_returns(symbol, period):
+        window_dates, window_returns = next(windows)
+        return window_dates, window_returns, 100.0
+
+    monkeypatch.setattr(predictions, "fetch_returns", fetch_returns)
+    monkeypatch.setattr(predictions, "model_cache", ModelCache())
+    first = await predictions.forecast_volatility(FakeApp, {"symbol": "TEST", "model": model})
+    second = await predictions.forecast_volatility(FakeApp, {"symbol": "TEST", "model": model})
+    assert "(full fit)" in first[0].text
+    assert "(warm start)" in second[0].text
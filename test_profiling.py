@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import pytest
+from mcp.shared.context import RequestContext
+from Tools import profiling
+from Tools.sessions import current_session, open_session
+
+
+class FakeApp:
+    def __init__(self, request_id):
+        self.request_context = RequestContext(request_id=request_id, meta=None, session=object(), lifespan_context=None)
+
+
+async def summaries(directory) -> list[dict]:
+    await asyncio.gather(*profiling._writes)
+    found = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as file:
+                found.append(json.load(file))
+    return found
+
+
+@pytest.mark.asyncio
+async def test_capture_includes_the_response_event_write(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    with profiling.profile_call(FakeApp(7), "get-stock-price", {"symbol": "AAPL", "_profile": True}):
+        profiling.record_span("7", "event store", 0.001)
+    assert await summaries(tmp_path) == []
+    # The transport stores the response after the call returned
+    profiling.record_span("7", "event store", 0.002, response=True)
+    [summary] = await summaries(tmp_path)
+    assert summary["spans"]["event store"]["count"] == 2
+    assert summary["arguments"] == {"symbol": "AAPL"}
+    assert not profiling._by_stream
+
+
+@pytest.mark.asyncio
+async def test_capture_is_written_without_a_response_event(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "RESPONSE_WAIT", 0.01)
+    with profiling.profile_call(FakeApp(8), "get-stock-price", {"_profile": True}):
+        pass
+    await asyncio.sleep(0.05)
+    [summary] = await summaries(tmp_path)
+    assert summary["spans"] == {}
+    assert not profiling._by_stream
+
+
+@pytest.mark.asyncio
+async def test_sessions_with_the_same_request_id_keep_their_captures(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "RESPONSE_WAIT", 0.05)
+    # Every client numbers its requests from 1
+    first_returned, second_started = asyncio.Event(), asyncio.Event()
+
+    async def first_session():
+        open_session()
+        with profiling.profile_call(FakeApp(1), "get-stock-price", {"_profile": True}):
+            await second_started.wait()
+            profiling.record_span("1", "event store", 0.001)
+        first_returned.set()
+
+    async def second_session():
+        open_session()
+        with profiling.profile_call(FakeApp(1), "get-stock-history", {"_profile": True}):
+            second_started.set()
+            await first_returned.wait()
+            # The first call's capture expires without touching this one
+            await asyncio.sleep(0.1)
+            assert list(profiling._by_stream) == [(current_session.get(), "1")]
+        profiling.record_span("1", "event store", 0.002, response=True)
+
+    await asyncio.gather(first_session(), second_session())
+    captures = {summary["tool"]: summary for summary in await summaries(tmp_path)}
+    assert captures["get-stock-price"]["spans"]["event store"]["ms"] == 1.0
+    assert captures["get-stock-history"]["spans"]["event store"]["ms"] == 2.0
+    assert not profiling._by_stream
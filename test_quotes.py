@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+import pytest
+from Tools import quotes
+from Tools.quotes import QuoteRecord, QUOTE_FIELDS
+
+QUOTE_RESPONSE = {
+    "quoteResponse": {
+        "result": [
+            {
+                "symbol": "AAPL", "regularMarketPrice": 212.5, "marketCap": 3_200_000_000_000, "regularMarketVolume": 51_000_000,
+                "currency": "USD", "market": "us_market", "regularMarketTime": 1_718_000_000, "language": "en-US",
+            },
+            {"symbol": "MSFT", "regularMarketPrice": 441.0, "currency": "USD"},
+        ],
+        "error": None,
+    }
+}
+
+
+class FakeYf:
+    """Stands in for yfinance: YfData().get_raw_json returns or raises `response`, Ticker(symbol).info returns `info`."""
+
+    def __init__(self, response, info=None):
+        self.requests = []
+        self.tickers = []
+        fake = self
+
+        class YfData:
+            def get_raw_json(self, url, params=None):
+                fake.requests.append((url, params))
+                if isinstance(response, Exception):
+                    raise response
+                return response
+
+        def Ticker(symbol):
+            fake.tickers.append(symbol)
+            return SimpleNamespace(info=info)
+
+        self.data = SimpleNamespace(YfData=YfData)
+        self.Ticker = Ticker
+
+
+def test_batch_quote_is_parsed_into_records(monkeypatch):
+    fake = FakeYf(QUOTE_RESPONSE)
+    monkeypatch.setattr(quotes, "yf", fake)
+    records = quotes.fetch_quotes(["AAPL", "MSFT", "NOPE"])
+    assert fake.requests == [(quotes.QUOTE_URL, {"symbols": "AAPL,MSFT,NOPE", "fields": ",".join(QUOTE_FIELDS.values()), "formatted": "false"})]
+    assert sorted(records) == ["AAPL", "MSFT"]
+    apple = records["AAPL"]
+    assert (apple.symbol, apple.price, apple.market_cap, apple.volume, apple.currency, apple.market, apple.market_time) == (
+        "AAPL", 212.5, 3_200_000_000_000, 51_000_000, "USD", "us_market", 1_718_000_000
+    )
+    assert records["MSFT"].market_cap is None
+    assert not hasattr(apple, "__dict__")
+
+
+def test_empty_quote_response(monkeypatch):
+    monkeypatch.setattr(quotes, "yf", FakeYf({"quoteResponse": {"result": None, "error": None}}))
+    assert quotes.fetch_quotes(["AAPL"]) == {}
+    monkeypatch.setattr(quotes, "yf", FakeYf({}))
+    assert quotes.fetch_quotes(["AAPL"]) == {}
+
+
+def test_rejected_quote_request_falls_back_to_info(monkeypatch):
+    info = {"currentPrice": 212.4, "regularMarketPrice": 212.5, "marketCap": 3_200_000_000_000, "volume": 51_000_000, "currency": "USD"}
+    fake = FakeYf(RuntimeError("401 Unauthorized: Invalid Crumb"), info)
+    monkeypatch.setattr(quotes, "yf", fake)
+    record = quotes.fetch_quote("AAPL")
+    assert fake.tickers == ["AAPL"]
+    assert (record.price, record.market_cap, record.volume, record.currency) == (212.4, 3_200_000_000_000, 51_000_000, "USD")
+
+
+def test_throttled_quote_request_is_not_retried_through_info(monkeypatch):
+    fake = FakeYf(RuntimeError("429 Too Many Requests"), {"currentPrice": 1.0})
+    monkeypatch.setattr(quotes, "yf", fake)
+    with pytest.raises(RuntimeError, match="429"):
+        quotes.fetch_quote("AAPL")
+    assert fake.tickers == []
+
+
+def test_unknown_symbol_raises(monkeypatch):
+    monkeypatch.setattr(quotes, "yf", FakeYf(QUOTE_RESPONSE))
+    with pytest.raises(ValueError, match="No data found for ticker: NOPE"):
+        quotes.fetch_quote("NOPE")
+    monkeypatch.setattr(quotes, "yf", FakeYf(RuntimeError("500"), {}))
+    with pytest.raises(ValueError, match="No data found for ticker: NOPE"):
+        quotes.fetch_quote("NOPE")
+
+
+def test_info_record_falls_back_to_market_fields():
+    record = QuoteRecord.from_info("AAPL", {"regularMarketPrice": 212.5, "regularMarketVolume": 10})
+    assert (record.price, record.volume) == (212.5, 10)
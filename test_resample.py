@@ -0,0 +1,59 @@
+import time
+import pandas as pd
+import pytest
+from Tools import history
+from Tools import resample
+from Tools.cache import CacheEntry, UpstreamCache
+from Tools.trading_calendar import nyse
+
+
+@pytest.mark.parametrize("source, interval, expected", [
+    ("1m", "5m", True),
+    ("5m", "60m", True),
+    ("15m", "1h", True),
+    ("5m", "2m", False),
+    ("1d", "1d", True),
+    ("1m", "1d", False),
+    ("60m", "1d", False),
+    ("1d", "60m", False),
+    ("1d", "1wk", False),
+])
+def test_can_derive(source, interval, expected):
+    assert resample.can_derive(source, interval) is expected
+
+
+def test_daily_bars_are_not_derived_from_intraday_bars(monkeypatch):
+    cache = UpstreamCache()
+    monkeypatch.setattr(history, "upstream_cache", cache)
+    expires = time.time() + 3600
+    cache.entries[("history", "AAPL", "5d", "1m")] = CacheEntry(pd.DataFrame(), time.time(), expires)
+    assert history.bar_source("AAPL", "5d", "1d") == ("5d", "1d")
+    cache.entries[("history", "AAPL", "1y", "1d")] = CacheEntry(pd.DataFrame(), time.time(), expires)
+    assert history.bar_source("AAPL", "5d", "1d") == ("1y", "1d")
+    assert history.bar_source("AAPL", "5d", "15m") == ("5d", "1m")
+
+
+def test_daily_bars_are_sliced_from_longer_daily_bars():
+    index = pd.date_range("2024-01-02", periods=300, freq="B", tz="America/New_York")
+    bars = pd.DataFrame({"Close": range(300)}, index=index, dtype=float)
+    derived = resample.derive(bars, "1mo", "1d", "1d")
+    assert derived.index[-1] == index[-1]
+    assert (derived["Close"].to_numpy() == bars["Close"].to_numpy()[-len(derived):]).all()
+    assert 19 <= len(derived) <= 23
+
+
+def test_missing_opening_bar_does_not_shift_buckets():
+    # An illiquid symbol with no trades in its first 17 minutes
+    index = pd.date_range("2025-06-12 09:47", "2025-06-12 15:59", freq="1min", tz="America/New_York")
+    bars = pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 10}, index=index)
+    hourly = resample.resample_bars(bars, "60m", nyse)
+    assert [stamp.strftime("%H:%M") for stamp in hourly.index] == ["09:30", "10:30", "11:30", "12:30", "13:30", "14:30", "15:30"]
+    assert hourly["Volume"].iloc[0] == 43 * 10
+    # Without a calendar the first bar is the anchor
+    assert resample.resample_bars(bars, "60m").index[0].strftime("%H:%M") == "09:47"
+
+
+def test_early_close_session_is_anchored_at_the_open():
+    index = pd.date_range("2025-07-03 09:35", "2025-07-03 12:59", freq="5min", tz="America/New_York")
+    bars = pd.DataFrame({"Close": 1.0, "Volume": 1}, index=index)
+    assert resample.resample_bars(bars, "15m", nyse).index[0].strftime("%H:%M") == "09:30"
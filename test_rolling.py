@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Tools.rolling import rolling_comoments
+
+
+def returns_with_gaps(rows: int = 400, pairs: int = 6, seed: int = 11) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    y = rng.normal(0, 0.01, (rows, pairs))
+    x = 0.8 * y + rng.normal(0, 0.01, (rows, pairs))
+    # Scattered missing days, a long halt and a later listing
+    x[rng.random((rows, pairs)) < 0.05] = np.nan
+    y[rng.random((rows, pairs)) < 0.05] = np.nan
+    x[150:230, 1] = np.nan
+    y[:120, 2] = np.nan
+    return x, y
+
+
+def expected(x: np.ndarray, y: np.ndarray, window: int, min_periods: int | None) -> dict[str, np.ndarray]:
+    columns = {"corr": [], "cov": [], "beta": []}
+    for pair in range(x.shape[1]):
+        left, right = pd.Series(x[:, pair]), pd.Series(y[:, pair])
+        # pandas counts the rows where both sides have values
+        right_paired = right.where(left.notna())
+        cov = left.rolling(window, min_periods=min_periods).cov(right)
+        columns["corr"].append(left.rolling(window, min_periods=min_periods).corr(right).to_numpy())
+        columns["cov"].append(cov.to_numpy())
+        columns["beta"].append((cov / right_paired.rolling(window, min_periods=min_periods).var()).to_numpy())
+    return {name: np.column_stack(values) for name, values in columns.items()}
+
+
+@pytest.mark.parametrize("window, min_periods", [(20, None), (60, None), (60, 30)])
+def test_matches_pandas_with_nan_gaps(window, min_periods):
+    x, y = returns_with_gaps()
+    result = rolling_comoments(x, y, window, min_periods)
+    reference = expected(x, y, window, min_periods)
+    for name in reference:
+        assert np.array_equal(np.isnan(result[name]), np.isnan(reference[name])), name
+        assert np.allclose(result[name], reference[name], rtol=1e-9, atol=1e-12, equal_nan=True), name
+
+
+def test_single_pair_and_large_offsets():
+    # Prices rather than returns: raw sums of products would lose most digits here
+    x, y = returns_with_gaps(pairs=3)
+    x, y = 1e6 + x[:, 0], 1e6 + 2.0 * y[:, 0]
+    result = rolling_comoments(x, y, 40)
+    reference = expected(x[:, np.newaxis], y[:, np.newaxis], 40, None)
+    assert result["cov"].shape == x.shape
+    assert np.allclose(result["cov"], reference["cov"][:, 0], rtol=1e-6, equal_nan=True)
+    assert np.allclose(result["corr"], reference["corr"][:, 0], rtol=1e-6, atol=1e-9, equal_nan=True)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from Tools import screener
+from Tools.indicators import compute_indicators
+
+
+def aligned_bars(length: int = 120) -> dict[str, np.ndarray]:
+    steps = np.arange(length, dtype=float)
+    noise = 0.3 * np.sin(steps)
+    close = np.vstack([
+        100.0 + steps + noise,  # rising
+        200.0 - steps + noise,  # falling
+        np.r_[np.full(length - 10, np.nan), 50.0 + steps[:10]],  # listed 10 bars ago
+    ])
+    volume = np.vstack([np.full(length, 1e6), np.full(length, 5e5), np.r_[np.full(length - 10, np.nan), np.full(10, 2e6)]])
+    return {"close": close, "high": close + 1.0, "low": close - 1.0, "volume": volume}
+
+
+def test_screen_chunk_filters_on_indicators_and_prices():
+    arrays = aligned_bars()
+    symbols = ["UP", "DOWN", "NEW"]
+    conditions = screener.validate_conditions([{"field": "rsi", "op": ">", "value": 70}])
+    matches = screener.screen_chunk(arrays, symbols, 0, 3, conditions, None)
+    assert [match["symbol"] for match in matches] == ["UP"]
+    expected = compute_indicators(arrays["close"][0], indicators=["RSI"])["RSI"][-1]
+    assert matches[0]["rsi"] == round(expected, 4)
+
+    # A field compared with another field; the new listing has no 20 bar average yet
+    conditions = screener.validate_conditions([{"field": "price", "op": "<", "value": "sma"}])
+    assert [match["symbol"] for match in screener.screen_chunk(arrays, symbols, 0, 3, conditions, None)] == ["DOWN"]
+    conditions = screener.validate_conditions([{"field": "avg_volume", "op": ">=", "value": 1e6}])
+    matches = screener.screen_chunk(arrays, symbols, 0, 3, conditions, None)
+    assert [(match["symbol"], match["avg_volume"]) for match in matches] == [("UP", 1e6), ("NEW", 2e6)]
+
+
+def test_screen_chunk_screens_only_its_rows():
+    arrays = aligned_bars()
+    conditions = screener.validate_conditions([{"field": "change_pct", "op": "<", "value": 0}])
+    matches = screener.screen_chunk(arrays, ["DOWN", "NEW"], 1, 3, conditions, None)
+    change = (arrays["close"][1, -1] / arrays["close"][1, -2] - 1.0) * 100.0
+    assert matches == [{"symbol": "DOWN", "change_pct": round(change, 4), "price": round(arrays["close"][1, -1], 4)}]
+
+
+def test_universe_names_cannot_leave_the_universe_directory(monkeypatch, tmp_path):
+    universes = tmp_path / "universes"
+    universes.mkdir()
+    (universes / "watchlist.txt").write_text("# Watchlist\naapl\n\nmsft\n")
+    (tmp_path / "secret.txt").write_text("SECRET\n")
+    monkeypatch.setattr(screener, "UNIVERSE_DIR", str(universes))
+    assert screener.load_universe("watchlist") == ["AAPL", "MSFT"]
+    for name in ["../secret", "../secret.txt", str(tmp_path / "secret.txt"), "subdir/../../secret"]:
+        with pytest.raises(ValueError, match="not found. Available universes: watchlist"):
+            screener.load_universe(name)
@@ -69,8 +69,21 @@ async def startup():
     ("get-stock-price-data",{"ticker":"AAPL"}),
     ("get-options-dates", {"ticker": "AAPL"}),
     ("get-stock-price-data", {"ticker": "AAPL","timeframe":"30d"}),
+    ("get-stock-price-period", {"ticker": "MSFT", "timeframe": "5d", "require_fresh": True}),
+    ("calculate-all-volatility", {"symbol": "AAPL", "_profile": True}),
+    ("list-profiles", {"min_ms": 0, "tool": "calculate-all-volatility"}),
+    ("get-options-chains", {"tickers": ["AAPL", "MSFT"], "nearest_expirations": 1, "max_strikes": 3}),
     ("get-dividend-history", {"ticker": "AAPL","years_back":"2"}),
     ("get-earnings-calendar", {"ticker": "AAPL"}),
+    ("get-technical-indicators", {"symbols": ["AAPL", "MSFT"], "indicators": ["RSI", "ATR"]}),
+    ("calculate-correlations", {"symbols_list": ["AAPL", "MSFT", "GOOGL"]}),
+    ("get-risk-metrics", {"symbols": ["AAPL", "MSFT"]}),
+    ("get-rolling-beta", {"symbols": ["AAPL", "MSFT"], "windows": [20, 60], "output": "last"}),
+    ("calculate-portfolio-var", {"holdings": {"AAPL": 0.6, "MSFT": 0.4}, "portfolio_value": 100000}),
+    ("forecast-volatility", {"symbol": "AAPL", "model": "garch", "horizon_days": 5}),
+    ("get-corporate-actions", {"tickers": ["AAPL", "MSFT"], "start_date": "2024-01-01", "end_date": "2024-12-31"}),
+    ("screen-universe", {"universe_file": "dow30", "conditions": [{"field": "rsi", "op": ">", "value": 0}]}),
+    ("backtest-strategy", {"symbols": ["AAPL", "MSFT"], "strategy": "sma_cross", "grid": {"fast": [10, 20], "slow": [50, 100]}, "top": 2}),
 ])
 async def test_tool_call( tool_name, args):
     # Always create a fresh connection for each test
@@ -88,10 +101,48 @@ async def test_tool_call( tool_name, args):
     elif tool_name=="get-stock-price-data":
          assert "AAPL" in str(response)
          assert "30d" in str(response)
+    elif tool_name=="get-stock-price-period":
+        assert "MSFT" in str(response)
+        assert "Data age: 0s" in str(response)
+    elif tool_name=="calculate-all-volatility":
+        assert "AAPL" in str(response)
+        assert "5 Days (60 minute intervals)" in str(response)
+    elif tool_name=="list-profiles":
+        assert "calculate-all-volatility" in str(response)
+        assert "upstream fetch" in str(response)
+    elif tool_name=="get-options-chains":
+        assert "MSFT" in str(response)
+        assert "puts" in str(response)
     elif tool_name=="get-dividend-history":
          assert "AAPL" in str(response)
          assert "dividend" in str(response).lower()
     elif tool_name=="get-earnings-calendar":
         assert "AAPL" in str(response)
         assert "earnings" in str(response).lower()
+    elif tool_name=="get-technical-indicators":
+        assert "MSFT" in str(response)
+        assert "ATR" in str(response)
+    elif tool_name=="calculate-correlations":
+        assert "GOOGL" in str(response)
+    elif tool_name=="get-risk-metrics":
+        assert "MSFT" in str(response)
+        assert "Beta" in str(response)
+    elif tool_name=="get-rolling-beta":
+        assert "AAPL/SPY" in str(response)
+        assert "60-day Beta" in str(response)
+    elif tool_name=="calculate-portfolio-var":
+        assert "Historical simulation" in str(response)
+        assert "Monte Carlo simulation (100000 paths, seed 42)" in str(response)
+    elif tool_name=="forecast-volatility":
+        assert "GARCH(1,1)" in str(response)
+        assert "Timing: fetch=" in str(response)
+    elif tool_name=="get-corporate-actions":
+        assert "corporate actions" in str(response)
+        assert "AAPL" in str(response)
+    elif tool_name=="screen-universe":
+        assert "AAPL" in str(response)
+        assert "Timing" in str(response)
+    elif tool_name=="backtest-strategy":
+        assert "4 parameter combinations" in str(response)
+        assert "Sharpe" in str(response)
 
@@ -0,0 +1,75 @@
+import datetime
+from Tools import cache
+from Tools.trading_calendar import TradingCalendar, calendar_for, nyse, NEW_YORK
+
+
+def at(*args) -> float:
+    return datetime.datetime(*args, tzinfo=NEW_YORK).timestamp()
+
+
+def test_holiday_has_no_session():
+    # Independence Day falls on a Saturday in 2026 and is observed on Friday
+    assert nyse.session(datetime.date(2026, 7, 3)) is None
+    open_at, close_at = nyse.next_session(datetime.date(2026, 7, 3))
+    assert open_at == datetime.datetime(2026, 7, 6, 9, 30, tzinfo=NEW_YORK)
+    assert close_at == datetime.datetime(2026, 7, 6, 16, 0, tzinfo=NEW_YORK)
+
+
+def test_early_close():
+    open_at, close_at = nyse.session(datetime.date(2025, 7, 3))
+    assert open_at == datetime.datetime(2025, 7, 3, 9, 30, tzinfo=NEW_YORK)
+    assert close_at == datetime.datetime(2025, 7, 3, 13, 0, tzinfo=NEW_YORK)
+
+
+def test_market_expiry_during_a_session():
+    assert cache.market_expiry(at(2025, 6, 12, 11, 0), 60, "AAPL") == at(2025, 6, 12, 11, 1)
+    # Settles 15 minutes after the early close instead of living the full TTL
+    assert cache.market_expiry(at(2025, 7, 3, 12, 55), 3600, "AAPL") == at(2025, 7, 3, 13, 15)
+    assert cache.market_expiry(at(2025, 6, 12, 8, 0), 60, "AAPL") == at(2025, 6, 12, 9, 30)
+
+
+def test_market_expiry_across_a_weekend():
+    assert cache.market_expiry(at(2025, 6, 13, 17, 0), 60, "AAPL") == at(2025, 6, 16, 9, 30)
+    assert cache.market_expiry(at(2025, 6, 14, 12, 0), 60, "AAPL") == at(2025, 6, 16, 9, 30)
+
+
+def test_market_expiry_across_a_holiday():
+    assert cache.market_expiry(at(2026, 7, 2, 18, 0), 60, "AAPL") == at(2026, 7, 6, 9, 30)
+    assert cache.market_expiry(at(2026, 7, 3, 10, 0), 60, "AAPL") == at(2026, 7, 6, 9, 30)
+
+
+def test_morning_expiry():
+    refresh = cache.OPTIONS_REFRESH
+    assert cache.morning_expiry(at(2025, 6, 12, 0, 30), "AAPL") == datetime.datetime.combine(datetime.date(2025, 6, 12), refresh, NEW_YORK).timestamp()
+    assert cache.morning_expiry(at(2025, 6, 12, 12, 0), "AAPL") == datetime.datetime.combine(datetime.date(2025, 6, 13), refresh, NEW_YORK).timestamp()
+    assert cache.morning_expiry(at(2026, 7, 2, 12, 0), "AAPL") == datetime.datetime.combine(datetime.date(2026, 7, 6), refresh, NEW_YORK).timestamp()
+
+
+def test_missing_year_warns_once(capsys):
+    calendar = TradingCalendar("test")
+    calendar.years.add(2025)
+    assert calendar.session(datetime.date(2025, 6, 12)) is not None
+    assert capsys.readouterr().out == ""
+    assert calendar.session(datetime.date(2030, 6, 12)) is not None
+    assert calendar.session(datetime.date(2030, 6, 13)) is not None
+    assert capsys.readouterr().out.count("does not list 2030") == 1
+    assert nyse.years >= {2024, 2025, 2026, 2027}
+
+
+def test_calendar_for():
+    for symbol in ("AAPL", "BRK-B", "^GSPC", "spy"):
+        assert calendar_for(symbol) is nyse, symbol
+    for symbol in ("BTC-USD", "EURUSD=X", "ES=F", "7203.T", "VOD.L", "^N225"):
+        assert calendar_for(symbol) is None, symbol
+
+
+def test_weekend_crypto_and_overnight_foreign_quotes_use_the_live_ttl():
+    saturday = at(2025, 6, 14, 12, 0)
+    assert cache.market_expiry(saturday, 60, "BTC-USD") == saturday + 60
+    assert cache.market_expiry(saturday, 60, "EURUSD=X") == saturday + 60
+    # Tokyo is open while New York sleeps
+    night = at(2025, 6, 12, 22, 0)
+    assert cache.market_expiry(night, 60, "7203.T") == night + 60
+    assert cache.market_expiry(night, 60, "AAPL") == at(2025, 6, 13, 9, 30)
+    refresh = cache.OPTIONS_REFRESH
+    assert cache.morning_expiry(saturday, "BTC-USD") == datetime.datetime.combine(datetime.date(2025, 6, 15), refresh, NEW_YORK).timestamp()
@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from Tools import upstream as module
+from Tools.upstream import UpstreamScheduler, INTERACTIVE, BULK, BACKGROUND
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_admits_the_burst_then_the_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(module.time, "monotonic", clock.monotonic)
+    scheduler = UpstreamScheduler(rate=2.0, burst=2.0, max_concurrency=16)
+    waiters = [asyncio.create_task(scheduler._acquire(INTERACTIVE, 1.0)) for _ in range(4)]
+    await asyncio.sleep(0)
+    assert [waiter.done() for waiter in waiters] == [True, True, False, False]
+    # The dispatcher waits for the next token; run it by hand at fake times
+    assert scheduler.timer is not None
+    scheduler.timer.cancel()
+    clock.now += 0.25
+    scheduler._dispatch()
+    await asyncio.sleep(0)
+    assert [waiter.done() for waiter in waiters] == [True, True, False, False]
+    scheduler.timer.cancel()
+    clock.now += 0.25
+    scheduler._dispatch()
+    await asyncio.sleep(0)
+    assert [waiter.done() for waiter in waiters] == [True, True, True, False]
+    # Tokens never accumulate beyond the burst
+    scheduler.timer.cancel()
+    clock.now += 60
+    scheduler._dispatch()
+    assert scheduler.tokens == 1.0
+    assert scheduler.in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_waiters_run_by_priority_then_arrival():
+    # One request in flight at a time
+    scheduler = UpstreamScheduler(rate=1000.0, burst=100.0, max_concurrency=2)
+    started = []
+    await scheduler._acquire(INTERACTIVE, 1.0)
+    calls = [
+        asyncio.create_task(scheduler.call(started.append, name, priority=priority))
+        for name, priority in [("background", BACKGROUND), ("bulk 1", BULK), ("interactive", INTERACTIVE), ("bulk 2", BULK)]
+    ]
+    await asyncio.sleep(0)
+    assert started == []
+    scheduler._release()
+    await asyncio.gather(*calls)
+    assert started == ["interactive", "bulk 1", "bulk 2", "background"]
+
+
+class FlakyFetch:
+    """Raises the given errors in turn, then returns "ok"."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(module.random, "uniform", uniform)
+    return bounds
+
+
+@pytest.mark.asyncio
+async def test_throttling_halves_the_limit_and_retries_with_jitter(backoffs):
+    scheduler = UpstreamScheduler(rate=1000.0, burst=100.0, max_concurrency=16)
+    assert scheduler.limit == 8
+    fetch = FlakyFetch(RuntimeError("429 Too Many Requests"), TimeoutError("read timed out"), RuntimeError("Too Many Requests"))
+    assert await scheduler.call(fetch) == "ok"
+    assert fetch.calls == 4
+    # Full jitter: uniform over [0, base * 2^attempt)
+    assert backoffs == [(0.0, 0.5), (0.0, 1.0), (0.0, 2.0)]
+    # Halved three times, then one success adds 1 / limit
+    assert scheduler.limit == pytest.approx(1.0 + 1.0 / 1.0)
+    assert scheduler.throttled == 3
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_by_one_per_window_of_successes(backoffs):
+    scheduler = UpstreamScheduler(rate=1000.0, burst=100.0, max_concurrency=16)
+    for _ in range(8):
+        await scheduler.call(lambda: None)
+    assert scheduler.limit == pytest.approx(9.0, abs=0.1)
+    for _ in range(200):
+        await scheduler.call(lambda: None)
+    assert scheduler.limit == 16
+    assert backoffs == []
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_max_attempts_and_other_errors_are_not_retried(backoffs):
+    scheduler = UpstreamScheduler(rate=1000.0, burst=100.0, max_concurrency=16)
+    fetch = FlakyFetch(*[RuntimeError("429")] * module.MAX_ATTEMPTS)
+    with pytest.raises(RuntimeError, match="429"):
+        await scheduler.call(fetch)
+    assert fetch.calls == module.MAX_ATTEMPTS
+    assert len(backoffs) == module.MAX_ATTEMPTS - 1
+    fetch = FlakyFetch(KeyError("regularMarketPrice"))
+    with pytest.raises(KeyError):
+        await scheduler.call(fetch)
+    assert fetch.calls == 1
+    assert len(backoffs) == module.MAX_ATTEMPTS - 1
+    assert scheduler.in_flight == 0